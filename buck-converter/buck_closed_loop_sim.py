@@ -3,7 +3,13 @@ Closed-loop Buck Converter Model v1
 Author: Gautam
 Date: June 2025
 """
-import math
+import os
+import sys
+
+# make the pesim package importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pesim.buck import BuckParams, PIController, simulate_closed_loop
 
 # params
 Vin = 24            # input voltage
@@ -44,161 +50,19 @@ num_steps = int(sim_time/time_step)
 
 dt = time_step
 
-#initializing the state variables
-iL = 0
-Vc = 0
-error = 0           # PI controller error term
-integral_error = 0  # PI controller integral error term
-pi_output = 0
-duty_cycle = nominal_duty
-
-# Low pass filter parameters
-# fc = 5000           # Filter cutoff frequency (Hz)
-# alpha = 0.0         # Filter coefficient (calculated below)
-
-# Low pass filter initialization
-# wc = 2 * math.pi * fc                # Cutoff frequency in rad/s
-# alpha = (Tsw * wc) / (1 + Tsw * wc)  # Filter coefficient
-# Vc_filtered = 0.0                    # Filtered output voltage
-
-# initializing arrays for data storage
-time = []
-inductor_current = []
-capacitor_voltage = []
-switching_state = []
-controller_output = []
-error_term = []
-
-# simulation loop
-for i in range(num_steps):
-    t = i * time_step
-
-    # dividing the 't' value, which increments in units of 'time_step', with switching time period. 
-    # The remainder (t_mod) keeps increasing until we hit the end of one cycle. 
-    # After that the remainder (t_mod) is reset. This way we can track the switching time period with time steps.
-    t_mod = t % Tsw
-
-    # PI controller - operating at switching frequency
-    controller_step = int(Tsw/time_step)
-    if (i % controller_step == 0):    # will execute once every cycle
-        
-        # Low pass filter for output voltage feedback
-        # First-order discrete filter: y[n] = α*x[n] + (1-α)*y[n-1]
-        # Vc_filtered = alpha * Vc + (1 - alpha) * Vc_filtered
-        
-        #calculate error
-        error = Vref - Vc
-
-        # update integral term
-        integral_error = integral_error + (error * Tsw)     
-        # because we are updating this term once every cycle not every time-step
-
-        # PI controller output
-        pi_output = Kp*error + Ki*integral_error
-        # print(pi_output)
-
-        # duty cycle with feed forward term 'nominal_duty'
-        duty_cycle = nominal_duty + pi_output
-
-        # Clamp duty cycle to limits
-        if duty_cycle > duty_max:
-            duty_cycle = duty_max
-        
-        elif duty_cycle < duty_min:
-            duty_cycle = duty_min
-
-    # deciding whether switch is ON or OFF based on duty cycle
-    if (t_mod < (duty_cycle*Tsw)):
-        switch_state = True
-    else:
-        switch_state = False
-
-    # calculating the
-    if (switch_state):
-        # when switch is ON
-        # VL = L * diL/dt = Vin - Vc  
-        diL_dt = (Vin - Vc) / L
-        
-        # iL = iC + iR
-        # iC = C * dVc/dt
-        # dVc_dt = (Tsw * diL_dt)/(8*C)     # another eqn which will give slightly different initial behaviour
-        dVc_dt = (iL - (Vc/R)) / C              
-    
-    else:
-    # when switch is OFF
-        # VL = L * diL/dt = -Vc
-        diL_dt = (-Vc)/L
-        
-        # dVc_dt = (Tsw * diL_dt)/(8*C)
-        dVc_dt = (iL - (Vc/R)) / C
-                  
-    # calculating the state variables by integrating them
-    # discrete integration is done using Euler method
-    iL = iL + (diL_dt * time_step)
-    Vc = Vc + (dVc_dt * time_step)
-
-    # Ensure physical constraints
-    # if iL < 0 and not switch_state:
-    #     # Discontinuous conduction mode
-    #     iL = 0
-    #     dVc_dt = -Vc / (R * C)
-    #     Vc = Vc + (dVc_dt * time_step)
-
-    time.append(t)
-    inductor_current.append(iL)
-    capacitor_voltage.append(Vc)
-    if switch_state:
-        switching_state.append(1)
-    else:
-        switching_state.append(0)
-
-    # Only append when controller actually updates
-    if (i % controller_step == 0):
-        controller_output.append(pi_output)
-        error_term.append(error)   
-
-#plotting the data
-import matplotlib.pyplot as plt
-
-# Inductor Current plot
-plt.subplot(3, 2, 1)
-plt.plot(time, inductor_current, label='Inductor Current (iL)', color='b')
-plt.ylabel('Current (A)')
-plt.title('Inductor Current vs Time')
-plt.grid(True)
-plt.legend()
-
-# Cap voltage plot
-plt.subplot(3, 2, 5)
-plt.plot(time, capacitor_voltage, label='Capacitor Voltage (Vc)', color='r')
-plt.ylabel('Voltage (V)')
-plt.title('Capacitor Voltage vs Time')
-plt.grid(True)
-plt.legend()
-
-# Switch state plot
-plt.subplot(3, 2, 3)
-plt.plot(time, switching_state, label='Switching State', color='g')
-plt.ylabel('State')
-plt.title('Switching State vs Time')
-plt.grid(True)
-plt.legend()
-
-# error plot
-plt.subplot(3, 2, 2)
-plt.plot(error_term, label='Error', color='r')
-plt.ylabel('error')
-plt.title('error vs Time')
-plt.grid(True)
-plt.legend()
-
-# controller output plot
-plt.subplot(3, 2, 4)
-plt.plot(controller_output, label='Controller Output', color='b')
-plt.ylabel('PI output')
-plt.title('PI Output vs Time')
-plt.grid(True)
-plt.legend()
-
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+params = BuckParams(Vin=Vin, L=L, C=C, R=R, fsw=fsw)
+ctrl = PIController(Vref=Vref, Kp=Kp, Ki=Ki, duty_min=duty_min, duty_max=duty_max)
+
+# DCM (iL clamped at zero while the switch is OFF) is handled by the
+# event-driven solver, see pesim.buck.simulate_events
+
+
+if __name__ == '__main__':
+    # simulation
+    # The PI controller runs once every switching cycle and each cycle is
+    # propagated with the exact state-transition matrices, see pesim/buck/engine.py
+    res = simulate_closed_loop(params, ctrl, sim_time, time_step)
+
+    # plotting the data, matplotlib is only imported here
+    from pesim.plotting import plot_buck_closed_loop
+    plot_buck_closed_loop(res)
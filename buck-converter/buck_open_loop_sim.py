@@ -3,6 +3,13 @@ Open-loop Buck Converter Model v1
 Author: Gautam
 Date: June 2025
 """
+import os
+import sys
+
+# make the pesim package importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pesim.buck import BuckParams, simulate_open_loop
 
 # params
 Vin = 24            # input voltage
@@ -37,90 +44,16 @@ num_steps = int(sim_time/time_step)
 dt = time_step
 duty_cycle = D
 
-#initializing the state variables
-iL = 0
-Vc = 0
-
-# initializing arrays for data storage
-time = []
-inductor_current = []
-capacitor_voltage = []
-switching_state = []
-
-# simulation loop
-for i in range(num_steps):
-    t = i * time_step
-
-    # dividing the 't' value, which increments in units of 'time_step', with switching time period. 
-    # The remainder (t_mod) keeps increasing until we hit the end of one cycle. 
-    # After that the remainder (t_mod) is reset. This way we can track the switching time period with time steps.
-    t_mod = t % Tsw
-
-    # deciding whether switch is ON or OFF based on duty cycle
-    if (t_mod < (duty_cycle*Tsw)):
-        switch_state = True
-    else:
-        switch_state = False
-
-    # calculating the
-    if (switch_state):
-        # when switch is ON
-        # VL = L * diL/dt = Vin - Vout  
-        # Vout=Vc but I have defined Vout as a constant for other purpose.
-        diL_dt = (Vin - Vc) / L
-        
-        # iL = iC + iR
-        # iC = C * dVc/dt
-        # dVc_dt = (Tsw * diL_dt)/(8*C)     # another eqn which will give slightly different initial behaviour
-        dVc_dt = (iL - (Vc/R)) / C              
-    
-    else:
-    # when switch is OFF
-        # VL = L * diL/dt = -Vc
-        diL_dt = (-Vc)/L
-        
-        # dVc_dt = (Tsw * diL_dt)/(8*C)
-        dVc_dt = (iL - (Vc/R)) / C
-                  
-    # calculating the state variables by integrating them
-    # discrete integration is done using Euler method
-    iL = iL + (diL_dt * time_step)
-    Vc = Vc + (dVc_dt * time_step)
-
-    time.append(t)
-    inductor_current.append(iL)
-    capacitor_voltage.append(Vc)
-    if switch_state:
-        switching_state.append(1)
-    else:
-        switching_state.append(0)
-
-
-#plotting the data
-import matplotlib.pyplot as plt
-
-# Inductor Current plot
-plt.subplot(3, 1, 1)
-plt.plot(time, inductor_current, label='Inductor Current (iL)', color='b')
-plt.ylabel('Current (A)')
-plt.title('Inductor Current vs Time')
-plt.grid(True)
-plt.legend()
+params = BuckParams(Vin=Vin, L=L, C=C, R=R, fsw=fsw)
 
-# Cap voltage plot
-plt.subplot(3, 1, 2)
-plt.plot(time, capacitor_voltage, label='Capacitor Voltage (Vc)', color='r')
-plt.ylabel('Voltage (V)')
-plt.title('Capacitor Voltage vs Time')
-plt.grid(True)
-plt.legend()
 
-# Switch state plot
-plt.subplot(3, 1, 3)
-plt.plot(time, switching_state, label='Switching State', color='g')
-plt.ylabel('State')
-plt.title('Switching State vs Time')
-plt.grid(True)
-plt.legend()
+if __name__ == '__main__':
+    # simulation
+    # The switching pattern is precomputed for all steps and the state (iL, Vc) is
+    # propagated with the exact state-transition matrix of each topology in one
+    # array pass, see pesim/buck/engine.py. Results land in preallocated arrays.
+    res = simulate_open_loop(params, duty_cycle, sim_time, time_step, x0=(0.0, 0.0))
 
-plt.show()
\ No newline at end of file
+    # plotting the data, matplotlib is only imported here
+    from pesim.plotting import plot_buck_open_loop
+    plot_buck_open_loop(res)
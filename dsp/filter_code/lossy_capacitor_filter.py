@@ -1,5 +1,10 @@
-import numpy as np
-import matplotlib.pyplot as plt
+import os
+import sys
+
+# make the pesim package importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from pesim.dsp import Source, lossy_capacitor_coefficients, run_filter
 
 # deciding time-step
 # typical power converter switching frequency ~5kHz
@@ -10,64 +15,27 @@ import matplotlib.pyplot as plt
 
 t_duration = 1.0
 t_step = 1.0e-6
-
-num_samples = int(t_duration/t_step)
-
-# generate an array from 0 to (10^6 - 1)
-# mult t_step to get each time instant
-time_array = np.arange(num_samples)*t_step
+t_sample = 200.0e-6
 
 freq = 50.0     # 50Hz
-omega = 2*np.pi*freq    # rad/s
 mag = 5.0
 C = 100.0e-6    # 100uF capacitor
 R = 1.0e+3     # large resistor in parallel drawing minimal current
 # time constant R*C will decide the settling time
 # settling time = 4*R*C
 
-# sinusoidal input signal generation
-current_signal = mag*np.sin(omega*time_array)
-
-t_sample = 200.0e-6
-num_skip = int(t_sample/t_step)
-
-tsample_array = time_array[::num_skip]
-current_samples = current_signal[::num_skip]
+# Tustin coefficients, run by the SOS filter engine (pesim/dsp/sos.py)
+num, den = lossy_capacitor_coefficients(t_sample, C, R)
 
-# initialize our output
-voltage_samples = np.zeros(current_samples.size)
+# input evaluated only at the t_sample instants, the oversampled trace is
+# built just for the 'input' plot
+source = Source(freq, mag)
 
-# filter input
-u = np.zeros(2)     # present value u[0]=i(n) and past value u[1]=i(n-1)
-y = np.zeros(2)     # present value y[0]=v(n) and past value y[1]=v(n-1)
 
-# ISR with hardware here
-# calculate the output
-for current_idx, current_val in np.ndenumerate(current_samples):
-    
-    # capacitor filter
-    u[0] = current_val
-    
-    # v(n) = (T*i(n) + T*i(n-1) + 2*C*v(n-1))/(2*C)
-    # y[0] = (t_sample*u[0] + t_sample*u[1] + 2*C*y[1])/(2*C)
-    
+if __name__ == '__main__':
     # v(n) = (T*i(n) + T*i(n-1) + 2*C*v(n-1) - (T/R)*v(n-1)) / (2*C + (T/R))
-    y[0] = (t_sample*u[0] + t_sample*u[1] + 2*C*y[1] - (t_sample/R)*y[1])/(2*C + (t_sample/R))
-
-    u[1] = u[0]     # u(n-1) = u(n)
-    y[1] = y[0]     # y(n-1) = y(n)
-
-    voltage_samples[current_idx] = y[0]
-    # end of filter
-
-
-plt.plot(time_array,current_signal,label='full signal',ds='steps')
-plt.plot(tsample_array,current_samples,label='input signal',ds='steps')
-plt.legend()
-plt.show()
+    res = run_filter(num, den, source, t_duration, t_step, t_sample)
 
-plt.figure()
-# following plot has dc offset dying out b/c lossy cap
-plt.plot(tsample_array,voltage_samples,label='output signal',ds='steps')
-plt.legend()
-plt.show()
+    # output has dc offset dying out b/c lossy cap
+    from pesim.plotting import plot_filter
+    plot_filter(res)
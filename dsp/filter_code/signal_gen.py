@@ -1,5 +1,12 @@
+import os
+import sys
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+# make the pesim package importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from pesim.dsp import Source
 
 # sinusoid signal
 # generate a signal with duration of 1 sec
@@ -14,29 +21,25 @@ import matplotlib.pyplot as plt
 t_duration = 1.0
 t_step = 1.0e-6
 
-num_samples = int(t_duration/t_step)
-
-# generate an array from 0 to (10^6 - 1)
-# mult t_step to get each time instant
-time_array = np.arange(num_samples)*t_step
-
 freq = 50.0
 omega = 2*np.pi*freq
 mag = 5.0
 
-# sinusoidal input signal generation
-inp_signal = mag*np.sin(omega*time_array)
-
 t_sample = 200.0e-6
-num_skip = int(t_sample/t_step)
 
-tsamp_array = time_array[::num_skip]
-sample_signal = inp_signal[::num_skip]
+# lazy source, evaluated only on the grid it is asked for; add components
+# (Harmonic, Tone, Noise, FrequencyStep, PhaseJump) for richer test signals
+source = Source(freq, mag)
+
+
+if __name__ == '__main__':
+    # full oversampled signal for the plot, and the samples every t_sample
+    # computed directly at the sampling instants, no 1M-point array needed
+    time_array, inp_signal = source.sample(t_duration, t_step)
+    tsamp_array, sample_signal = source.sample(t_duration, t_sample, t_step=t_step)
 
-print(len(tsamp_array))
-print(len(time_array))
+    print(len(tsamp_array))
+    print(len(time_array))
 
-plt.plot(time_array,inp_signal,label='full signal',ds='steps')
-plt.plot(tsamp_array,sample_signal,label='sample signal',ds='steps')
-plt.legend()
-plt.show()
\ No newline at end of file
+    from pesim.plotting import plot_sampled
+    plot_sampled(time_array, inp_signal, tsamp_array, sample_signal, label='sample signal')
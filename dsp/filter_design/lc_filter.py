@@ -1,6 +1,10 @@
-from scipy import signal
-import numpy as np
-import matplotlib.pyplot as plt
+import os
+import sys
+
+# make the pesim package importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from pesim.dsp import run_lc_bode
 
 # LC filter transfer function
 # H(s) = 1/(s^2*LC + s*RC + 1)
@@ -9,21 +13,9 @@ R = 0.1
 L = 0.01
 C = 1000.0e-6
 
-num_lc = [1]
-den_lc = [L*C, R*C, 1]
-
-lc_h = signal.lti(num_lc,den_lc)
-
-w, mag, phase = signal.bode(lc_h, np.arange(100000))
 
-# plt.figure()
-plt.subplot(2, 1, 1)
-plt.grid()
-plt.semilogx(w,mag)
-# plt.show()
+if __name__ == '__main__':
+    res = run_lc_bode(R, L, C)
 
-# plt.figure()
-plt.subplot(2, 1, 2)
-plt.grid()
-plt.semilogx(w,phase)
-plt.show()
\ No newline at end of file
+    from pesim.plotting import plot_bode
+    plot_bode(res, labels=False)
@@ -1,40 +1,20 @@
-from scipy import signal
-import numpy as np
-import matplotlib.pyplot as plt
+import os
+import sys
+
+# make the pesim package importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from pesim.dsp import run_sop_bode
 
 # second order pole transfer function
 # H(s) = omega_0**2/(s^2 + 2*s*zeta*omega_0 + omega_0**2)
 
-# R = 0.1
-# L = 0.01
-# C = 1000.0e-6
-
 omega_0 = 1000.0    # resonant freq rad/s
 zeta = 0.1          # damping factor
 
-num_sop = [omega_0**2]
-den_sop = [1, 2*zeta*omega_0, omega_0**2]
-
-sop_h = signal.lti(num_sop,den_sop)
-
-w, mag, phase = signal.bode(sop_h, np.arange(100000))
-
-# plt.figure()
-plt.subplot(2, 1, 1)
-plt.grid()
-plt.title('Magnitude plot')
-plt.xlabel('log(w)')
-plt.ylabel('Mag in dB')
-plt.semilogx(w,mag)
-# plt.show()
 
-# plt.figure()
-plt.subplot(2, 1, 2)
-plt.grid()
-plt.title('Phase plot')
-plt.xlabel('log(w)')
-plt.ylabel('Phase in degrees')
-plt.semilogx(w,phase)
+if __name__ == '__main__':
+    res = run_sop_bode(omega_0, zeta)
 
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+    from pesim.plotting import plot_bode
+    plot_bode(res)
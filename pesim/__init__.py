@@ -0,0 +1,13 @@
+"""
+Power Electronics Simulation Library
+
+Reusable models behind the scripts in buck-converter/, sogi-pll/, srf-pll/ and dsp/.
+The scripts stay as the runnable demos; the numerics live here so they can be
+imported from batch jobs and sweeps.
+
+Plotting lives in pesim.plotting and imports matplotlib only when called;
+`python -m pesim` runs any scenario headless and dumps the result arrays;
+`python -m pesim.bench` times the kernels and flags throughput regressions;
+`python -m pesim.replay` streams recorded waveforms (.npy, CSV, COMTRADE)
+through the PLLs.
+"""
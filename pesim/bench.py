@@ -0,0 +1,223 @@
+"""
+Benchmarks
+Standard workloads for every simulation kernel, timed the same way on every
+commit so a slowdown shows up before a batch job misses its window:
+
+    python -m pesim.bench --list
+    python -m pesim.bench --out bench.json                      # run all, save
+    python -m pesim.bench --baseline bench.json --threshold 0.2 # exit 1 on a >20% drop
+    python -m pesim.bench srf-pll-step sogi-pll-noisy --repeat 10
+
+Each benchmark reports samples/s (simulation steps or filter samples per
+wall-clock second), wall time per simulated second and the peak memory
+traced by tracemalloc during one extra run. The best of 'repeat' timed
+runs is kept, after one untimed warm-up run (numba compilation, caches).
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def _buck_open_loop():
+    from .buck.scenarios import run_open_loop
+    sim_time, dt = 1e-3, 1e-7
+    return lambda: run_open_loop(sim_time=sim_time, dt=dt), int(sim_time/dt), sim_time
+
+
+def _buck_closed_loop():
+    from .buck.scenarios import run_closed_loop
+    sim_time, dt = 5e-3, 1e-7
+    return (lambda: run_closed_loop(Vref=18.0, sim_time=sim_time, dt=dt, Vref_step=12.0),
+            int(sim_time/dt), sim_time)
+
+
+def _srf_pll_step():
+    from .pll.srf import run_srf_pll
+    t_sim, dt = 1.0, 1e-4
+    return lambda: run_srf_pll(t_sim=t_sim, dt=dt), len(np.arange(0, t_sim, dt)), t_sim
+
+
+def _sogi_pll_noisy():
+    from .pll.sogi import run_sogi_pll
+    fs, t_sim = 10000, 1.0
+    return lambda: run_sogi_pll(fs=fs, t_sim=t_sim, seed=0), len(np.arange(0, t_sim, 1/fs)), t_sim
+
+
+def _dsogi_pll_batch():
+    from .pll.dsogi import simulate_dsogi_pll
+    from .pll.grid import GridScenario
+    t_sim, dt, channels = 1.0, 1e-4, 16
+    vabc = GridScenario().unbalance(0.1).harmonic(5, 0.03).generate(t_sim, dt).vabc
+    vabc = np.repeat(vabc[:, None, :], channels, axis=1)
+    return (lambda: simulate_dsogi_pll(vabc, dt, record=('theta', 'f')), len(vabc)*channels,
+            t_sim)
+
+
+def _iir(name, *args):
+    # one minute of 50 Hz samples at the scripts' 200 us ISR period
+    def setup():
+        from .dsp import filters
+        t_duration, t_sample = 60.0, 200.0e-6
+        t = np.arange(int(t_duration/t_sample))*t_sample
+        x = 5.0*np.sin(2*np.pi*50.0*t)
+        func = getattr(filters, f"{name}_filter")
+        return lambda: func(x, t_sample, *args), x.size, t_duration
+    return setup
+
+
+# name -> setup() returning (workload, samples per run, simulated seconds per run)
+BENCHMARKS = {
+    'buck-open-loop': _buck_open_loop,
+    'buck-closed-loop': _buck_closed_loop,
+    'srf-pll-step': _srf_pll_step,
+    'sogi-pll-noisy': _sogi_pll_noisy,
+    'dsogi-pll-batch': _dsogi_pll_batch,
+    'capacitor-filter': _iir('capacitor', 100.0e-6),
+    'lossy-capacitor-filter': _iir('lossy_capacitor', 100.0e-6, 1.0e+3),
+    'inductor-filter': _iir('inductor', 1.0e-3),
+    'lossy-inductor-filter': _iir('lossy_inductor', 1.0e-3, 1.0e-2),
+    'lc-filter': _iir('lc', 0.001, 500.0e-6, 0.05),
+    'sop-filter': _iir('sop', 1000.0, 0.1),
+}
+
+
+def run_benchmark(name, repeat=5):
+    """Time one benchmark, returns its result dict."""
+    try:
+        setup = BENCHMARKS[name]
+    except KeyError:
+        raise ValueError(f"unknown benchmark {name!r}, choose from {', '.join(BENCHMARKS)}") from None
+    func, samples, sim_seconds = setup()
+    func()
+
+    times = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t_start)
+    best = min(times)
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    if not tracing:
+        tracemalloc.stop()
+
+    return {
+        'samples': samples,
+        'simulated_s': sim_seconds,
+        'best_s': best,
+        'median_s': float(np.median(times)),
+        'samples_per_s': samples/best,
+        'wall_per_simulated_s': best/sim_seconds,
+        'peak_memory_mb': peak/1e6,
+    }
+
+
+def _commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_benchmarks(names=None, repeat=5, progress=None):
+    """
+    Run the named benchmarks (all if None)
+
+    Returns {'meta': {...}, 'results': {name: result}}, the JSON layout
+    written by --out and read by compare().
+    """
+    names = list(BENCHMARKS) if names is None else list(names)
+    results = {}
+    for name in names:
+        results[name] = run_benchmark(name, repeat)
+        if progress is not None:
+            progress(name, results[name])
+    meta = {
+        'commit': _commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'repeat': repeat,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    Throughput of current against baseline, both run_benchmarks() dicts
+
+    Returns {name: ratio} of samples/s (current/baseline) for the benchmarks
+    present in both, and the list of names whose ratio fell below
+    1 - threshold.
+    """
+    ratios = {}
+    for name, res in current['results'].items():
+        ref = baseline['results'].get(name)
+        if ref is not None:
+            ratios[name] = res['samples_per_s']/ref['samples_per_s']
+    regressions = [name for name, r in ratios.items() if r < 1.0 - threshold]
+    return ratios, regressions
+
+
+def _print_result(name, res):
+    print(f"{name:24s} {res['samples_per_s']:12.4g} samples/s  "
+          f"{res['wall_per_simulated_s']:10.4g} s/sim-s  {res['peak_memory_mb']:8.2f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pesim.bench',
+                                     description='Benchmark the pesim simulation kernels.')
+    parser.add_argument('names', nargs='*', help='benchmarks to run, default all, see --list')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark, best is kept')
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed fractional drop of samples/s against the baseline')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in BENCHMARKS:
+            print(name)
+        return 0
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s) {', '.join(unknown)}, see --list")
+
+    report = run_benchmarks(args.names or None, args.repeat, progress=_print_result)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        ratios, regressions = compare(report, baseline, args.threshold)
+        print(f"\nagainst {args.baseline} (commit {baseline['meta'].get('commit')}):")
+        for name, r in ratios.items():
+            print(f"{name:24s} {r:8.3f}x{'  REGRESSION' if name in regressions else ''}")
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than {1 - args.threshold:.0%} of the baseline")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
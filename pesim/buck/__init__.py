@@ -0,0 +1,11 @@
+"""Buck converter models and solvers."""
+from .model import BuckParams, PIController, size_components, state_matrices, pi_step
+from .engine import (BuckResult, discretize, switching_pattern, propagate,
+                     simulate_open_loop, simulate_closed_loop)
+from .reference import simulate_euler
+from .edges import EULER_TOLERANCE, interval_map, simulate_edges, dense, compare_with_euler
+from .sweep import SWEEP_FIELDS, sweep_designs, grid
+from .events import EventResult, simulate_events, dense_events
+from .averaged import simulate_averaged, cycle_averages, cross_validate
+from .steady_state import SteadyState, periodic_steady_state, period_map
+from .scenarios import run_open_loop, run_closed_loop
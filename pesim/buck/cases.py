@@ -0,0 +1,50 @@
+"""
+Buck Sweep Cases
+Case functions and output layouts for running buck simulations through
+pesim.parallel.run_cases.
+
+    cases = [{'params': p, 'ctrl': PIController(Vref=v), 'sim_time': 5e-3} for v in vrefs]
+    results = run_cases(closed_loop_case, cases, closed_loop_outputs(cases[0]), seed=1)
+"""
+import math
+
+import numpy as np
+
+from .engine import BuckResult, simulate_closed_loop
+
+
+def closed_loop_outputs(case):
+    """Output layout for closed_loop_case, every case must share sim_time, dt and fsw."""
+    dt = case.get('dt', 1e-7)
+    num_steps = int(case['sim_time']/dt)
+    num_cycles = math.ceil(num_steps/int(case['params'].Tsw/dt))
+    return {
+        'iL': ((num_steps,), 'f8'),
+        'vc': ((num_steps,), 'f8'),
+        'switch': ((num_steps,), '?'),
+        'controller_output': ((num_cycles,), 'f8'),
+        'error': ((num_cycles,), 'f8'),
+        'duty': ((num_cycles,), 'f8'),
+    }
+
+
+def closed_loop_case(case, out, rng):
+    """
+    Closed-loop PI run writing straight into the shared output rows
+
+    case keys: params, ctrl, sim_time, optional dt, vref (per-cycle array) and
+    vref_noise (std of a noise term added to the per-cycle reference, drawn
+    from the case generator).
+    """
+    dt = case.get('dt', 1e-7)
+    vref = case.get('vref', case['ctrl'].Vref)
+    noise = case.get('vref_noise', 0.0)
+    if noise:
+        vref = vref + noise * rng.standard_normal(len(out['duty']))
+
+    res = BuckResult(time=np.empty(len(out['iL'])), iL=out['iL'], vc=out['vc'],
+                     switch=out['switch'],
+                     controller_time=np.empty(len(out['duty'])),
+                     controller_output=out['controller_output'],
+                     error=out['error'], duty=out['duty'])
+    simulate_closed_loop(case['params'], case['ctrl'], case['sim_time'], dt, vref=vref, out=res)
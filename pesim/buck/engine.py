@@ -0,0 +1,311 @@
+"""
+Buck Converter Simulation Engine
+
+Fixed-step engine that replaces the per-step Euler loops of the buck scripts.
+The switching pattern is precomputed as an array and the state (iL, Vc) is
+propagated with the exact state-transition matrix of each topology, so the
+result does not depend on Euler accuracy.
+
+Both topologies share the same A matrix, which makes the discrete plant a
+linear system driven by the switching sequence:
+
+    x[k+1] = Phi*x[k] + gamma*s[k]
+
+Diagonalizing Phi splits this into two first-order recursions that scipy's
+lfilter runs over the whole switching array in one pass.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+import math
+
+import numpy as np
+from scipy import linalg, signal
+
+from .model import state_matrices, pi_step
+
+
+@lru_cache(maxsize=None)
+def discretize(params, dt):
+    """
+    Exact discretization of the power stage over one time step
+
+    Returns (Phi, gamma) with Phi = expm(A*dt) and gamma the state increment
+    of an ON step. Results are cached per (params, dt).
+    """
+    A, B = state_matrices(params)
+
+    # augmented matrix trick, expm([[A, B], [0, 0]]*dt) = [[Phi, gamma], [0, 1]]
+    M = np.zeros((3, 3))
+    M[:2, :2] = A * dt
+    M[:2, 2] = B * dt
+    E = linalg.expm(M)
+
+    Phi = E[:2, :2].copy()
+    gamma = E[:2, 2].copy()
+    Phi.setflags(write=False)
+    gamma.setflags(write=False)
+    return Phi, gamma
+
+
+@lru_cache(maxsize=None)
+def _modes(params, dt):
+    # eigen decomposition of Phi, None if Phi is (close to) defective
+    Phi, gamma = discretize(params, dt)
+    lam, V = np.linalg.eig(Phi)
+    if np.linalg.cond(V) > 1e8:
+        return None
+    Vinv = np.linalg.inv(V)
+    return lam, V, Vinv, Vinv @ gamma
+
+
+def switching_pattern(duty, Tsw, dt, start, stop):
+    """
+    Gate signal for steps start..stop-1, True when the switch is ON
+
+    Uses the same t = i*dt and t % Tsw arithmetic as the scripts so the edges
+    land on exactly the same steps.
+    """
+    t = np.arange(start, stop) * dt
+    return (t % Tsw) < (duty*Tsw)
+
+
+def propagate(params, dt, sw, x0, iL_out, vc_out):
+    """
+    Advance the state over the switching array 'sw'
+
+    iL_out[k] and vc_out[k] receive the state at the end of step k (the value
+    the scripts log at step k). Returns the final state as a length-2 array.
+    """
+    n = len(sw)
+    x0 = np.asarray(x0, dtype=float)
+    if n == 0:
+        return x0.copy()
+
+    modes = _modes(params, dt)
+    if modes is None:
+        return _propagate_loop(params, dt, sw, x0, iL_out, vc_out)
+
+    lam, V, Vinv, b = modes
+    z0 = Vinv @ x0
+    u = sw.astype(float)
+
+    if np.iscomplexobj(lam) and lam[0].imag != 0.0:
+        # underdamped LC: the two modes are a conjugate pair,
+        # x = 2*Re(V[:, 0]*z0) so only one recursion is needed
+        z, _ = signal.lfilter([b[0]], [1.0, -lam[0]], u, zi=[lam[0]*z0[0]])
+        np.multiply(z.real, 2*V[0, 0].real, out=iL_out)
+        iL_out -= 2*V[0, 0].imag * z.imag
+        np.multiply(z.real, 2*V[1, 0].real, out=vc_out)
+        vc_out -= 2*V[1, 0].imag * z.imag
+    else:
+        lam = lam.real
+        V = V.real
+        b = b.real
+        z0 = z0.real
+        z_a, _ = signal.lfilter([b[0]], [1.0, -lam[0]], u, zi=[lam[0]*z0[0]])
+        z_b, _ = signal.lfilter([b[1]], [1.0, -lam[1]], u, zi=[lam[1]*z0[1]])
+        np.multiply(z_a, V[0, 0], out=iL_out)
+        iL_out += V[0, 1] * z_b
+        np.multiply(z_a, V[1, 0], out=vc_out)
+        vc_out += V[1, 1] * z_b
+
+    return np.array([iL_out[-1], vc_out[-1]])
+
+
+def _propagate_loop(params, dt, sw, x0, iL_out, vc_out):
+    # fallback for repeated eigenvalues (critically damped stage)
+    Phi, gamma = discretize(params, dt)
+    x = x0.copy()
+    for k in range(len(sw)):
+        x = Phi @ x
+        if sw[k]:
+            x = x + gamma
+        iL_out[k] = x[0]
+        vc_out[k] = x[1]
+    return x
+
+
+@dataclass
+class BuckResult:
+    """Waveforms of one buck run, every array preallocated by the engine."""
+    time: np.ndarray
+    iL: np.ndarray
+    vc: np.ndarray
+    switch: np.ndarray                  # bool gate signal
+    controller_time: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    controller_output: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    error: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    duty: np.ndarray = field(default_factory=lambda: np.zeros(0))
+
+
+def _allocate(num_steps, dt, num_cycles=0, out=None):
+    # fresh result arrays, or fill the caller's buffers (e.g. shared memory) in place
+    if out is None:
+        out = BuckResult(time=np.empty(num_steps),
+                         iL=np.empty(num_steps),
+                         vc=np.empty(num_steps),
+                         switch=np.empty(num_steps, dtype=bool))
+        if num_cycles:
+            out.controller_time = np.empty(num_cycles)
+            out.controller_output = np.empty(num_cycles)
+            out.error = np.empty(num_cycles)
+            out.duty = np.empty(num_cycles)
+    elif len(out.time) != num_steps or (num_cycles and len(out.duty) != num_cycles):
+        raise ValueError(f"'out' must hold {num_steps} steps and {num_cycles} controller updates")
+
+    np.multiply(np.arange(num_steps), dt, out=out.time)
+    return out
+
+
+def simulate_open_loop(params, duty, sim_time, dt=1e-7, x0=(0.0, 0.0), out=None,
+                       recorder=None, block=65536, instrument=None):
+    """
+    Open-loop run with a fixed duty cycle, one array pass over all steps
+
+    out: optional BuckResult with preallocated arrays to write into.
+    recorder: optional pesim.recorder.Recorder with channels time, iL, vc and
+    switch. The run is then processed in blocks of 'block' steps and the
+    waveforms only go to the recorder, so memory stays bounded; the returned
+    BuckResult has empty waveform arrays.
+    instrument: optional pesim.instrument.Instrument, times the plant and
+    logging (recorder) stages.
+    """
+    if instrument is not None:
+        with instrument.span('simulate_open_loop'):
+            return _open_loop(params, duty, sim_time, dt, x0, out, recorder, block, instrument)
+    return _open_loop(params, duty, sim_time, dt, x0, out, recorder, block, None)
+
+
+def _open_loop(params, duty, sim_time, dt, x0, out, recorder, block, instrument):
+    # a handful of array passes, timing each costs nothing per step
+    num_steps = int(sim_time/dt)
+    if instrument is not None:
+        clock = instrument.clock
+        t_plant = t_logging = 0
+
+    if recorder is not None:
+        x = np.asarray(x0, dtype=float)
+        buf = _allocate(min(block, num_steps), dt)
+        for i0 in range(0, num_steps, block):
+            if instrument is not None:
+                c0 = clock()
+            n = min(block, num_steps - i0)
+            t = buf.time[:n]
+            np.multiply(np.arange(i0, i0 + n), dt, out=t)
+            sw = buf.switch[:n]
+            sw[:] = switching_pattern(duty, params.Tsw, dt, i0, i0 + n)
+            x = propagate(params, dt, sw, x, buf.iL[:n], buf.vc[:n])
+            if instrument is not None:
+                c1 = clock()
+            recorder.extend(time=t, iL=buf.iL[:n], vc=buf.vc[:n], switch=sw)
+            if instrument is not None:
+                t_plant += c1 - c0
+                t_logging += clock() - c1
+        if instrument is not None:
+            instrument.add('plant', t_plant, -(-num_steps // block))
+            instrument.add('logging', t_logging, -(-num_steps // block))
+        return _allocate(0, dt)
+
+    if instrument is not None:
+        c0 = clock()
+    res = _allocate(num_steps, dt, out=out)
+    res.switch[:] = switching_pattern(duty, params.Tsw, dt, 0, num_steps)
+    propagate(params, dt, res.switch, x0, res.iL, res.vc)
+    if instrument is not None:
+        instrument.add('plant', clock() - c0)
+    return res
+
+
+def simulate_closed_loop(params, ctrl, sim_time, dt=1e-7, x0=(0.0, 0.0), vref=None, out=None,
+                         recorder=None, instrument=None):
+    """
+    Closed-loop run with the PI controller updated once every switching cycle
+
+    vref: optional per-cycle reference (scalar or array with one entry per
+    controller update), defaults to ctrl.Vref.
+    out: optional BuckResult with preallocated arrays to write into.
+    recorder: optional pesim.recorder.Recorder with channels time, iL, vc and
+    switch. Waveforms then only go to the recorder one cycle at a time and
+    the returned BuckResult keeps just the per-cycle controller arrays.
+    instrument: optional pesim.instrument.Instrument, times the controller,
+    plant and logging stages of every cycle and counts controller updates and
+    duty clamps.
+    Only the controller runs in Python; each cycle is propagated as an array.
+    """
+    if instrument is not None:
+        with instrument.span('simulate_closed_loop'):
+            return _closed_loop(params, ctrl, sim_time, dt, x0, vref, out, recorder, instrument)
+    return _closed_loop(params, ctrl, sim_time, dt, x0, vref, out, recorder, None)
+
+
+def _closed_loop(params, ctrl, sim_time, dt, x0, vref, out, recorder, instrument):
+    # one check per switching cycle (hundreds of steps) when instrumented
+    Tsw = params.Tsw
+    num_steps = int(sim_time/dt)
+    controller_step = int(Tsw/dt)
+    num_cycles = math.ceil(num_steps/controller_step)
+
+    if vref is None:
+        vref = ctrl.Vref
+    vref = np.broadcast_to(np.asarray(vref, dtype=float), (num_cycles,))
+
+    if recorder is not None:
+        # waveform arrays sized for one cycle, reused every cycle
+        res = _allocate(0, dt, num_cycles)
+        buf = _allocate(controller_step, dt)
+    else:
+        res = _allocate(num_steps, dt, num_cycles, out=out)
+        t_mod = res.time % Tsw
+    np.multiply(np.arange(num_cycles), controller_step * dt, out=res.controller_time)
+
+    x = np.asarray(x0, dtype=float)
+    integral_error = 0.0
+    if instrument is not None:
+        clock = instrument.clock
+        t_controller = t_plant = t_logging = 0
+        clamps = 0
+
+    for c in range(num_cycles):
+        if instrument is not None:
+            c0 = clock()
+        i0 = c * controller_step
+        i1 = min(i0 + controller_step, num_steps)
+
+        duty_cycle, pi_output, error, integral_error, clamped = pi_step(
+            ctrl, params.Vin, vref[c], x[1], integral_error, Tsw)
+        res.controller_output[c] = pi_output
+        res.error[c] = error
+        res.duty[c] = duty_cycle
+        if instrument is not None:
+            c1 = clock()
+            clamps += clamped
+
+        if recorder is not None:
+            n = i1 - i0
+            t = buf.time[:n]
+            np.multiply(np.arange(i0, i1), dt, out=t)
+            sw = buf.switch[:n]
+            np.less(t % Tsw, duty_cycle*Tsw, out=sw)
+            x = propagate(params, dt, sw, x, buf.iL[:n], buf.vc[:n])
+            if instrument is not None:
+                c2 = clock()
+            recorder.extend(time=t, iL=buf.iL[:n], vc=buf.vc[:n], switch=sw)
+        else:
+            sw = res.switch[i0:i1]
+            np.less(t_mod[i0:i1], duty_cycle*Tsw, out=sw)
+            x = propagate(params, dt, sw, x, res.iL[i0:i1], res.vc[i0:i1])
+            if instrument is not None:
+                c2 = clock()
+
+        if instrument is not None:
+            t_controller += c1 - c0
+            t_plant += c2 - c1
+            t_logging += clock() - c2
+
+    if instrument is not None:
+        instrument.add('controller', t_controller, num_cycles)
+        instrument.add('plant', t_plant, num_cycles)
+        instrument.add('logging', t_logging, num_cycles)
+        instrument.count('controller_updates', num_cycles)
+        instrument.count('duty_clamped', clamps)
+    return res
@@ -0,0 +1,160 @@
+"""
+Event-driven Buck Simulation
+
+Variable-step solver that jumps from event to event instead of stepping at a
+fixed time_step. Events are located analytically:
+
+    turn-on / controller sample   at the start of every cycle
+    turn-off                      at t0 + d*Tsw, not quantized to a step
+    iL zero crossing              in the OFF interval, starts DCM
+
+Between events the plant is linear and is advanced with the exact interval
+maps of edges.py, so a smooth interval costs a single step whatever its
+length. In DCM the diode blocks, iL stays at 0 and the capacitor discharges
+into the load until the next turn-on (the case left as commented-out code in
+buck_closed_loop_sim.py).
+"""
+from dataclasses import dataclass, field
+import math
+
+import numpy as np
+from scipy import optimize
+
+from .model import pi_step
+from .engine import BuckResult
+from .edges import interval_map, dense
+
+# interval modes, stored per event for the interval that starts there
+OFF, ON, DCM = 0, 1, 2
+
+# event kinds
+TURN_ON, TURN_OFF, ZERO_CROSSING, END = 0, 1, 2, 3
+
+
+@dataclass
+class EventResult(BuckResult):
+    """BuckResult at event instants, with the event kind and following interval mode."""
+    kind: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int8))
+    mode: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int8))
+
+
+def simulate_events(params, sim_time, duty=None, ctrl=None, vref=None, x0=(0.0, 0.0), dcm=True):
+    """
+    Event-driven run of the switching model
+
+    Pass 'duty' for open loop or 'ctrl' (PIController) for closed loop, the
+    controller samples Vc at every turn-on as in the scripts. vref is an
+    optional per-cycle reference. dcm=False keeps the ideal bidirectional
+    switch model (iL may go negative), matching the fixed-step solvers.
+    """
+    if (duty is None) == (ctrl is None):
+        raise ValueError("pass exactly one of 'duty' (open loop) or 'ctrl' (closed loop)")
+
+    Tsw = params.Tsw
+    RC = params.R * params.C
+    num_cycles = int(round(sim_time/Tsw))
+
+    if ctrl is not None:
+        if vref is None:
+            vref = ctrl.Vref
+        vref = np.broadcast_to(np.asarray(vref, dtype=float), (num_cycles,))
+
+    # at most three events per cycle plus the end of the run
+    cap = 3*num_cycles + 1
+    t_ev = np.empty(cap)
+    x_ev = np.empty((cap, 2))
+    kind = np.empty(cap, dtype=np.int8)
+    mode = np.empty(cap, dtype=np.int8)
+    n = 0
+
+    res = EventResult(time=None, iL=None, vc=None, switch=None)
+    res.duty = np.empty(num_cycles)
+    if ctrl is not None:
+        res.controller_time = np.arange(num_cycles) * Tsw
+        res.controller_output = np.empty(num_cycles)
+        res.error = np.empty(num_cycles)
+
+    x = np.asarray(x0, dtype=float)
+    integral_error = 0.0
+    duty_cycle = duty
+
+    for c in range(num_cycles):
+        t0 = c * Tsw
+
+        if ctrl is not None:
+            duty_cycle, pi_output, error, integral_error, _ = pi_step(
+                ctrl, params.Vin, vref[c], x[1], integral_error, Tsw)
+            res.controller_output[c] = pi_output
+            res.error[c] = error
+        res.duty[c] = duty_cycle
+
+        t_on = min(max(duty_cycle, 0.0), 1.0) * Tsw
+        t_off = Tsw - t_on
+
+        # turn-on
+        t_ev[n], x_ev[n], kind[n], mode[n] = t0, x, TURN_ON, ON
+        n += 1
+        Phi_on, gamma_on = interval_map(params, t_on)
+        x = Phi_on @ x + gamma_on
+
+        # turn-off
+        t_ev[n], x_ev[n], kind[n], mode[n] = t0 + t_on, x, TURN_OFF, OFF
+        n += 1
+        Phi_off, _ = interval_map(params, t_off)
+        x_end = Phi_off @ x
+
+        if dcm and x_end[0] < 0.0 and x[0] > 0.0:
+            # iL falls monotonically while Vc > 0, so the crossing is unique
+            x_off = x
+            iL_at = lambda tau: (interval_map(params, tau)[0] @ x_off)[0]
+            tz = optimize.brentq(iL_at, 0.0, t_off, xtol=1e-15, rtol=1e-12)
+            vc_z = (interval_map(params, tz)[0] @ x_off)[1]
+
+            t_ev[n], x_ev[n], kind[n], mode[n] = t0 + t_on + tz, (0.0, vc_z), ZERO_CROSSING, DCM
+            n += 1
+            x = np.array([0.0, vc_z * math.exp(-(t_off - tz)/RC)])
+        else:
+            x = x_end
+
+    t_ev[n], x_ev[n], kind[n], mode[n] = num_cycles * Tsw, x, END, OFF
+    n += 1
+
+    res.time = t_ev[:n].copy()
+    res.iL = x_ev[:n, 0].copy()
+    res.vc = x_ev[:n, 1].copy()
+    res.kind = kind[:n].copy()
+    res.mode = mode[:n].copy()
+    res.switch = res.mode == ON
+    return res
+
+
+def dense_events(params, res, t):
+    """Evaluate an event result at arbitrary times t, exact inside every interval."""
+    t = np.asarray(t, dtype=float)
+    iL, vc = dense(params, res, t)
+
+    # DCM intervals: iL held at zero, Vc decays with R*C
+    k = np.clip(np.searchsorted(res.time, t, side='right') - 1, 0, len(res.time) - 1)
+    in_dcm = res.mode[k] == DCM
+    if in_dcm.any():
+        tau = t[in_dcm] - res.time[k[in_dcm]]
+        iL[in_dcm] = 0.0
+        vc[in_dcm] = res.vc[k[in_dcm]] * np.exp(-tau/(params.R*params.C))
+    return iL, vc
+
+
+def resample(params, res, max_step):
+    """
+    Waveform with every event instant plus fill points at most max_step apart
+
+    Smooth intervals get only as many points as max_step asks for, the
+    switching edges are always included exactly.
+    """
+    spans = np.diff(res.time)
+    counts = np.maximum(np.ceil(spans / max_step).astype(int), 1)
+    starts = np.repeat(res.time[:-1], counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = starts + offsets * np.repeat(spans / counts, counts)
+    t = np.append(t, res.time[-1])
+    iL, vc = dense_events(params, res, t)
+    return t, iL, vc
@@ -0,0 +1,154 @@
+"""
+Compiled Closed-loop Buck Kernel
+
+The per-step closed-loop loop of buck_closed_loop_sim_v2.py (forward Euler
+plant, PI controller once per cycle, duty clamping, reference step) written as
+a flat kernel over scalars and preallocated arrays. With numba installed the
+kernel is compiled with @njit, otherwise the same function runs as plain
+Python. Both paths produce bit-identical results to simulate_euler() and the
+scripts: the arithmetic and its order are unchanged, only the loop-invariant
+controller_step is hoisted out of the loop.
+"""
+from collections import namedtuple
+import math
+
+import numpy as np
+
+from .engine import BuckResult
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+BACKENDS = ('auto', 'numba', 'python')
+
+
+# parameter struct passed to the kernel, all floats
+KernelParams = namedtuple('KernelParams', [
+    'Vin', 'L', 'C', 'R', 'Tsw', 'dt',
+    'Kp', 'Ki', 'duty_min', 'duty_max',
+    'Vref',             # reference at start
+    'Vref_step',        # reference after the step
+    'step_after',       # step index threshold, Vref_step applies for i > step_after
+    'iL0', 'Vc0',       # initial state
+])
+
+
+def kernel_params(params, ctrl, dt=1e-7, Vref_step=None, step_after=math.inf, x0=(0.0, 0.0)):
+    """Build the kernel parameter struct from BuckParams and PIController."""
+    return KernelParams(
+        Vin=float(params.Vin), L=float(params.L), C=float(params.C), R=float(params.R),
+        Tsw=float(params.Tsw), dt=float(dt),
+        Kp=float(ctrl.Kp), Ki=float(ctrl.Ki),
+        duty_min=float(ctrl.duty_min), duty_max=float(ctrl.duty_max),
+        Vref=float(ctrl.Vref),
+        Vref_step=float(ctrl.Vref if Vref_step is None else Vref_step),
+        step_after=float(step_after),
+        iL0=float(x0[0]), Vc0=float(x0[1]))
+
+
+def _closed_loop(p, iL_out, vc_out, sw_out, ctrl_out, err_out, duty_out):
+    Vin = p.Vin
+    L = p.L
+    C = p.C
+    R = p.R
+    Tsw = p.Tsw
+    time_step = p.dt
+    Kp = p.Kp
+    Ki = p.Ki
+
+    Vref = p.Vref
+    nominal_duty = Vref/Vin
+    controller_step = int(Tsw/time_step)
+
+    iL = p.iL0
+    Vc = p.Vc0
+    integral_error = 0.0
+    duty_cycle = nominal_duty
+
+    for i in range(iL_out.shape[0]):
+        t = i * time_step
+
+        if i > p.step_after:
+            Vref = p.Vref_step
+            nominal_duty = Vref/Vin
+
+        t_mod = t % Tsw
+
+        # PI controller - operating at switching frequency
+        if i % controller_step == 0:
+            error = Vref - Vc
+            integral_error = integral_error + (error * Tsw)
+            pi_output = Kp*error + Ki*integral_error
+            duty_cycle = nominal_duty + pi_output
+
+            # Clamp duty cycle to limits
+            if duty_cycle > p.duty_max:
+                duty_cycle = p.duty_max
+            elif duty_cycle < p.duty_min:
+                duty_cycle = p.duty_min
+
+            c = i // controller_step
+            ctrl_out[c] = pi_output
+            err_out[c] = error
+            duty_out[c] = duty_cycle
+
+        switch_state = t_mod < (duty_cycle*Tsw)
+
+        if switch_state:
+            diL_dt = (Vin - Vc) / L
+        else:
+            diL_dt = (-Vc)/L
+        dVc_dt = (iL - (Vc/R)) / C
+
+        iL = iL + (diL_dt * time_step)
+        Vc = Vc + (dVc_dt * time_step)
+
+        iL_out[i] = iL
+        vc_out[i] = Vc
+        sw_out[i] = switch_state
+
+
+_closed_loop_jit = njit(cache=True)(_closed_loop) if njit is not None else None
+
+HAVE_NUMBA = _closed_loop_jit is not None
+
+
+def closed_loop_kernel(p, iL_out, vc_out, sw_out, ctrl_out, err_out, duty_out, backend='auto'):
+    """
+    Run the closed-loop kernel into preallocated arrays
+
+    iL_out, vc_out, sw_out (bool) hold one entry per step and ctrl_out, err_out,
+    duty_out (clamped duty cycle) one per controller update. backend: 'auto' (numba when available),
+    'numba' or 'python'.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+    if backend == 'python' or (backend == 'auto' and not HAVE_NUMBA):
+        _closed_loop(p, iL_out, vc_out, sw_out, ctrl_out, err_out, duty_out)
+    elif HAVE_NUMBA:
+        _closed_loop_jit(p, iL_out, vc_out, sw_out, ctrl_out, err_out, duty_out)
+    else:
+        raise RuntimeError("numba is not installed, use backend='python'")
+
+
+def simulate_kernel(params, ctrl, sim_time, dt=1e-7, Vref_step=None, step_after=math.inf,
+                    x0=(0.0, 0.0), backend='auto'):
+    """Allocate the outputs and run the kernel, returns a BuckResult."""
+    p = kernel_params(params, ctrl, dt, Vref_step, step_after, x0)
+    num_steps = int(sim_time/dt)
+    controller_step = int(p.Tsw/dt)
+    num_cycles = math.ceil(num_steps/controller_step)
+
+    res = BuckResult(time=np.arange(num_steps) * dt,
+                     iL=np.empty(num_steps),
+                     vc=np.empty(num_steps),
+                     switch=np.empty(num_steps, dtype=bool),
+                     controller_time=np.arange(num_cycles) * controller_step * dt,
+                     controller_output=np.empty(num_cycles),
+                     error=np.empty(num_cycles),
+                     duty=np.empty(num_cycles))
+    closed_loop_kernel(p, res.iL, res.vc, res.switch, res.controller_output, res.error, res.duty,
+                       backend)
+    return res
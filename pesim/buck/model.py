@@ -0,0 +1,98 @@
+"""
+Buck Converter Model
+Power stage parameters, component sizing, state-space matrices and the PI
+controller shared by every buck solver in this package.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class BuckParams:
+    """Ideal buck converter power stage (CCM, resistive load)."""
+    Vin: float          # input voltage
+    L: float            # inductance
+    C: float            # output capacitance
+    R: float            # load resistance
+    fsw: float          # switching frequency
+
+    @property
+    def Tsw(self):
+        return 1/self.fsw
+
+    @classmethod
+    def design(cls, Vin, Vout, Iout, fsw, delta_iL_pu=0.1, delta_Vout_pu=0.05):
+        """Size L and C from the ripple targets, same equations as the scripts."""
+        L, C, R = size_components(Vin, Vout, Iout, fsw, delta_iL_pu, delta_Vout_pu)
+        return cls(Vin=Vin, L=L, C=C, R=R, fsw=fsw)
+
+
+def size_components(Vin, Vout, Iout, fsw, delta_iL_pu=0.1, delta_Vout_pu=0.05):
+    """
+    (L, C, R) from the ripple targets, same equations as the scripts
+
+    Plain arithmetic, so the arguments may be scalars or broadcastable arrays
+    (one entry per design point, see sweep_designs).
+    """
+    Tsw = 1/fsw
+    t_on = (Vout/Vin) * Tsw
+
+    # inductor value
+    delta_iL = delta_iL_pu * Iout
+    L = ((Vin - Vout) * t_on) / delta_iL
+
+    # capacitor value
+    delta_Vout = delta_Vout_pu * Vout
+    C = (delta_iL * Tsw) / (8 * delta_Vout)
+
+    return L, C, Vout/Iout
+
+
+def state_matrices(params):
+    """
+    State-space form of the power stage, x = [iL, Vc]
+
+    dx/dt = A*x + B*s, s = 1 when the switch is ON and 0 when it is OFF.
+    Both topologies share A, only the input term changes.
+    """
+    A = np.array([[0.0, -1.0/params.L],
+                  [1.0/params.C, -1.0/(params.R*params.C)]])
+    B = np.array([params.Vin/params.L, 0.0])
+    return A, B
+
+
+@dataclass(frozen=True)
+class PIController:
+    """Output voltage PI controller with duty feedforward and clamping."""
+    Vref: float         # reference output voltage
+    Kp: float = 0.05
+    Ki: float = 5.0
+    duty_min: float = 0.1
+    duty_max: float = 0.9
+
+
+def pi_step(ctrl, Vin, Vref, Vc, integral_error, Ts):
+    """
+    One controller update, executed once every switching cycle
+
+    Returns (duty_cycle, pi_output, error, integral_error, clamped). The order of
+    operations matches the scripts so results stay bit-identical.
+    """
+    error = Vref - Vc
+    integral_error = integral_error + (error * Ts)
+    pi_output = ctrl.Kp*error + ctrl.Ki*integral_error
+
+    # duty cycle with feed forward term 'nominal_duty'
+    duty_cycle = (Vref/Vin) + pi_output
+
+    # Clamp duty cycle to limits
+    clamped = False
+    if duty_cycle > ctrl.duty_max:
+        duty_cycle = ctrl.duty_max
+        clamped = True
+    elif duty_cycle < ctrl.duty_min:
+        duty_cycle = ctrl.duty_min
+        clamped = True
+
+    return duty_cycle, pi_output, error, integral_error, clamped
@@ -0,0 +1,82 @@
+"""
+Forward Euler Reference
+Straight port of the per-step loop in the buck scripts, kept as the reference
+the faster solvers are validated against. Results land in preallocated arrays
+instead of Python lists but the arithmetic is unchanged.
+"""
+import math
+
+import numpy as np
+
+from .model import pi_step
+from .engine import BuckResult
+
+
+def simulate_euler(params, sim_time, dt=1e-7, duty=None, ctrl=None, vref=None, x0=(0.0, 0.0)):
+    """
+    Fixed-step forward Euler run of the switching model
+
+    Pass 'duty' for open loop or 'ctrl' (PIController) for closed loop.
+    vref: optional per-cycle reference for closed loop, defaults to ctrl.Vref.
+    """
+    if (duty is None) == (ctrl is None):
+        raise ValueError("pass exactly one of 'duty' (open loop) or 'ctrl' (closed loop)")
+
+    Vin, L, C, R = params.Vin, params.L, params.C, params.R
+    Tsw = params.Tsw
+    num_steps = int(sim_time/dt)
+    controller_step = int(Tsw/dt)
+    num_cycles = math.ceil(num_steps/controller_step)
+
+    res = BuckResult(time=np.arange(num_steps) * dt,
+                     iL=np.empty(num_steps),
+                     vc=np.empty(num_steps),
+                     switch=np.empty(num_steps, dtype=bool))
+
+    if ctrl is not None:
+        if vref is None:
+            vref = ctrl.Vref
+        vref = np.broadcast_to(np.asarray(vref, dtype=float), (num_cycles,))
+        res.controller_time = np.arange(num_cycles) * controller_step * dt
+        res.controller_output = np.empty(num_cycles)
+        res.error = np.empty(num_cycles)
+        res.duty = np.empty(num_cycles)
+        duty_cycle = vref[0]/Vin
+    else:
+        duty_cycle = duty
+
+    iL, Vc = float(x0[0]), float(x0[1])
+    integral_error = 0.0
+
+    for i in range(num_steps):
+        t = i * dt
+        t_mod = t % Tsw
+
+        # PI controller - operating at switching frequency
+        if ctrl is not None and i % controller_step == 0:
+            c = i // controller_step
+            duty_cycle, pi_output, error, integral_error, _ = pi_step(
+                ctrl, Vin, vref[c], Vc, integral_error, Tsw)
+            res.controller_output[c] = pi_output
+            res.error[c] = error
+            res.duty[c] = duty_cycle
+
+        switch_state = t_mod < (duty_cycle*Tsw)
+
+        if switch_state:
+            # VL = L * diL/dt = Vin - Vc
+            diL_dt = (Vin - Vc) / L
+        else:
+            # VL = L * diL/dt = -Vc
+            diL_dt = (-Vc)/L
+        # iL = iC + iR
+        dVc_dt = (iL - (Vc/R)) / C
+
+        iL = iL + (diL_dt * dt)
+        Vc = Vc + (dVc_dt * dt)
+
+        res.iL[i] = iL
+        res.vc[i] = Vc
+        res.switch[i] = switch_state
+
+    return res
@@ -0,0 +1,40 @@
+"""
+Buck Script Scenarios
+The cases run by the scripts in buck-converter/, with their default
+parameters, as plain functions returning a BuckResult.
+"""
+import math
+
+import numpy as np
+
+from .model import BuckParams, PIController
+from .engine import simulate_open_loop, simulate_closed_loop
+
+
+def run_open_loop(Vin=24.0, Vout=12.0, Iout=2.0, fsw=50e3, delta_iL_pu=0.1, delta_Vout_pu=0.05,
+                  sim_time=1e-3, dt=1e-7, instrument=None):
+    """buck_open_loop_sim.py: start-up at D = Vout/Vin from iL = 0, Vc = 0."""
+    params = BuckParams.design(Vin, Vout, Iout, fsw, delta_iL_pu, delta_Vout_pu)
+    return simulate_open_loop(params, Vout/Vin, sim_time, dt, instrument=instrument)
+
+
+def run_closed_loop(Vin=24.0, Vref=18.0, Iout=2.0, fsw=50e3, Kp=0.05, Ki=5.0, duty_min=0.1,
+                    duty_max=0.9, delta_iL_pu=0.1, delta_Vout_pu=0.05, sim_time=1e-3, dt=1e-7,
+                    Vref_step=None, instrument=None):
+    """
+    buck_closed_loop_sim.py: PI regulated start-up to Vref
+
+    Vref_step: new reference applied halfway through the run, as in
+    buck_closed_loop_sim_v2.py (Vref_step=12, sim_time=5e-3).
+    """
+    params = BuckParams.design(Vin, Vref, Iout, fsw, delta_iL_pu, delta_Vout_pu)
+    ctrl = PIController(Vref=Vref, Kp=Kp, Ki=Ki, duty_min=duty_min, duty_max=duty_max)
+
+    vref = None
+    if Vref_step is not None:
+        # the script switches at step i > num_steps/2, seen by the next controller update
+        num_steps = int(sim_time/dt)
+        controller_step = int(params.Tsw/dt)
+        cycle_start = np.arange(math.ceil(num_steps/controller_step)) * controller_step
+        vref = np.where(cycle_start > num_steps/2, Vref_step, Vref)
+    return simulate_closed_loop(params, ctrl, sim_time, dt, vref=vref, instrument=instrument)
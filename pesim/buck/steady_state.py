@@ -0,0 +1,100 @@
+"""
+Periodic Steady-state Solver
+
+Finds the cycle-periodic (iL, Vc) orbit for a fixed duty cycle directly,
+instead of simulating the startup transient from iL = 0, Vc = 0 until it dies
+out. The one-period map x -> F(x) is solved for F(x) = x by shooting:
+
+    CCM    F is affine, F(x) = M*x + m, so x* = (I - M)^-1 * m in one solve
+    DCM    F is piecewise, Newton iterations with a finite-difference Jacobian
+           on the event-driven period map, started from the CCM solution
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from .edges import interval_map
+from .events import DCM, simulate_events, dense_events
+
+
+@dataclass
+class SteadyState:
+    """Converged periodic orbit, waveform sampled over one switching period."""
+    x0: np.ndarray          # [iL, Vc] at the start of the period
+    time: np.ndarray
+    iL: np.ndarray
+    vc: np.ndarray
+    iterations: int
+    residual: float
+    dcm: bool               # True if the orbit has a DCM interval
+
+    @property
+    def iL_ripple(self):
+        return float(np.ptp(self.iL))
+
+    @property
+    def vc_ripple(self):
+        return float(np.ptp(self.vc))
+
+    @property
+    def vc_mean(self):
+        return float(np.mean(self.vc))
+
+
+def periodic_state_batch(Phi_on, gamma_on, Phi_off):
+    """
+    CCM fixed point of the one-period map for a batch of designs
+
+    Phi_on, Phi_off: (..., 2, 2), gamma_on: (..., 2). Returns x* with shape (..., 2).
+    """
+    M = Phi_off @ Phi_on
+    m = np.einsum('...ij,...j->...i', Phi_off, gamma_on)
+    eye = np.broadcast_to(np.eye(2), M.shape)
+    return np.linalg.solve(eye - M, m[..., None])[..., 0]
+
+
+def period_map(params, duty, x, dcm=True):
+    """State after one switching period starting from x."""
+    res = simulate_events(params, params.Tsw, duty=duty, x0=x, dcm=dcm)
+    return np.array([res.iL[-1], res.vc[-1]])
+
+
+def periodic_steady_state(params, duty, dcm=True, tol=1e-12, max_iter=50, num_points=200):
+    """
+    Periodic steady state of the open-loop converter at a fixed duty cycle
+
+    tol is the residual |F(x) - x| relative to |x|. Raises RuntimeError if
+    Newton does not converge within max_iter iterations.
+    """
+    Tsw = params.Tsw
+    t_on = min(max(duty, 0.0), 1.0) * Tsw
+    Phi_on, gamma_on = interval_map(params, t_on)
+    Phi_off, _ = interval_map(params, Tsw - t_on)
+
+    # exact in CCM, initial guess otherwise
+    x = periodic_state_batch(Phi_on, gamma_on, Phi_off)
+
+    eye = np.eye(2)
+    for iterations in range(max_iter + 1):
+        r = period_map(params, duty, x, dcm) - x
+        residual = float(np.linalg.norm(r))
+        if residual <= tol * max(1.0, float(np.linalg.norm(x))):
+            break
+        if iterations == max_iter:
+            raise RuntimeError(f"shooting did not converge, residual {residual:.3g}")
+
+        # finite-difference Jacobian of F(x) - x
+        J = np.empty((2, 2))
+        for j in range(2):
+            h = 1e-7 * max(1.0, abs(x[j]))
+            xh = x.copy()
+            xh[j] += h
+            J[:, j] = (period_map(params, duty, xh, dcm) - xh - r) / h
+        x = x - np.linalg.solve(J, r)
+
+    orbit = simulate_events(params, Tsw, duty=duty, x0=x, dcm=dcm)
+    t = np.arange(num_points) * (Tsw/num_points)
+    iL, vc = dense_events(params, orbit, t)
+
+    return SteadyState(x0=x, time=t, iL=iL, vc=vc, iterations=iterations,
+                       residual=residual, dcm=bool(np.any(orbit.mode == DCM)))
@@ -0,0 +1,179 @@
+"""
+Batched Buck Design Sweep
+
+Simulates many open-loop buck designs at once. Every design point is one
+entry along a batch dimension; L and C are sized per entry from the ripple
+targets (same equations as the scripts) and all instances are advanced edge to
+edge together with batched matrix exponentials.
+
+    table = sweep_designs(Vin=[12, 24, 48], Iout=2, fsw=[50e3, 100e3],
+                          delta_iL_pu=0.1, delta_Vout_pu=0.05, Vout=5)
+
+Inputs broadcast against each other like NumPy arrays, the result is a
+structured array with one row per design point.
+"""
+import numpy as np
+from scipy import linalg
+
+from .model import size_components
+from .steady_state import periodic_state_batch
+
+
+SWEEP_FIELDS = [
+    ('Vin', float), ('Vout', float), ('Iout', float), ('fsw', float),
+    ('delta_iL_pu', float), ('delta_Vout_pu', float),
+    ('L', float), ('C', float), ('R', float), ('duty', float),
+    ('vout_mean', float),           # mean output voltage over the last cycle
+    ('iL_ripple_pu', float),        # peak-peak iL ripple / Iout
+    ('vout_ripple_pu', float),      # peak-peak Vout ripple / Vout
+    ('settling_time', float),       # time for Vc to stay inside the settle band, NaN if never
+    ('p_cond', float),              # conduction loss proxy (W)
+    ('p_sw', float),                # switching loss proxy (W)
+    ('efficiency', float),          # Pout / (Pout + p_cond + p_sw)
+]
+
+
+def _batched_modes(Vin, L, C, R):
+    # eigen decomposition of the augmented matrix [[A, B], [0, 0]] of every instance
+    M = np.zeros(Vin.shape + (3, 3))
+    M[..., 0, 1] = -1.0/L
+    M[..., 0, 2] = Vin/L
+    M[..., 1, 0] = 1.0/C
+    M[..., 1, 1] = -1.0/(R*C)
+    mu, W = np.linalg.eig(M)
+    Winv = np.linalg.inv(W)
+    # critically damped instances have a defective M, these get scipy's expm
+    defective = np.linalg.cond(W) > 1e8
+    return M, mu, W, Winv, defective
+
+
+def _batched_maps(modes, tau):
+    # (Phi, gamma) of every instance for intervals tau of shape (n,) or (n, m)
+    M, mu, W, Winv, defective = modes
+    extra = (slice(None),) + (None,)*(tau.ndim - 1)
+    E = (W[extra] * np.exp(mu[extra] * tau[..., None])[..., None, :]) @ Winv[extra]
+    E = E.real
+    if defective.any():
+        idx = np.flatnonzero(defective)
+        E[idx] = linalg.expm(M[idx][extra] * tau[idx][..., None, None])
+    return E[..., :2, :2], E[..., :2, 2]
+
+
+def sweep_designs(Vin, Iout, fsw, delta_iL_pu=0.1, delta_Vout_pu=0.05, Vout=12.0,
+                  num_cycles=400, settle_band=0.02, samples_per_cycle=64,
+                  r_on=0.05, r_diode=0.05, r_L=0.02, t_sw=20e-9, settling=True):
+    """
+    Simulate every design point from iL = 0, Vc = 0 for num_cycles cycles
+
+    With settling=False the startup transient is skipped: the last cycle starts
+    from the periodic steady state (shooting, exact in CCM) and settling_time
+    is NaN.
+
+    settling_time is the time after which the cycle-start Vc stays within
+    settle_band (relative to the final mean output voltage) of its periodic
+    steady-state value; NaN for designs still outside after num_cycles.
+
+    Ripple, mean output and losses are taken from the last cycle, sampled at
+    samples_per_cycle points. r_on, r_diode, r_L and t_sw only feed the
+    loss proxies, the simulated power stage itself is ideal.
+    """
+    Vin, Iout, fsw, delta_iL_pu, delta_Vout_pu, Vout = (
+        np.ravel(a).astype(float) for a in np.broadcast_arrays(
+            Vin, Iout, fsw, delta_iL_pu, delta_Vout_pu, Vout))
+
+    # size every instance with the script equations, vectorized over the batch
+    L, C, R = size_components(Vin, Vout, Iout, fsw, delta_iL_pu, delta_Vout_pu)
+    Tsw = 1/fsw
+    duty = Vout/Vin
+    t_on = duty * Tsw
+    n = len(Vin)
+
+    modes = _batched_modes(Vin, L, C, R)
+    Phi_on, gamma_on = _batched_maps(modes, t_on)
+    Phi_off, _ = _batched_maps(modes, Tsw - t_on)
+
+    # cycle-start state of the periodic steady state, the settling target
+    x_ss = periodic_state_batch(Phi_on, gamma_on, Phi_off)
+
+    if settling:
+        # cycle-start samples of Vc for the settling time
+        vc_start = np.empty((num_cycles + 1, n))
+        x = np.zeros((n, 2))
+        vc_start[0] = x[:, 1]
+        for c in range(num_cycles - 1):
+            x = np.einsum('nij,nj->ni', Phi_on, x) + gamma_on
+            x = np.einsum('nij,nj->ni', Phi_off, x)
+            vc_start[c + 1] = x[:, 1]
+    else:
+        x = x_ss
+
+    # last cycle in detail, ON and OFF intervals sampled separately
+    m = samples_per_cycle // 2
+    frac = np.arange(m) / m
+    tau_on = t_on[:, None] * frac
+    tau_off = (Tsw - t_on)[:, None] * frac
+    P_on, g_on = _batched_maps(modes, tau_on)
+    P_off, _ = _batched_maps(modes, tau_off)
+
+    x_on = np.einsum('nmij,nj->nmi', P_on, x) + g_on
+    x_turn_off = np.einsum('nij,nj->ni', Phi_on, x) + gamma_on
+    x_off = np.einsum('nmij,nj->nmi', P_off, x_turn_off)
+    x = np.einsum('nij,nj->ni', Phi_off, x_turn_off)
+
+    iL_on, vc_on = x_on[..., 0], x_on[..., 1]
+    iL_off, vc_off = x_off[..., 0], x_off[..., 1]
+    iL_all = np.concatenate([iL_on, iL_off], axis=1)
+    vc_all = np.concatenate([vc_on, vc_off], axis=1)
+
+    # time-weighted averages over the cycle
+    vout_mean = duty*vc_on.mean(axis=1) + (1 - duty)*vc_off.mean(axis=1)
+    i2_on = (iL_on**2).mean(axis=1)
+    i2_off = (iL_off**2).mean(axis=1)
+
+    if settling:
+        # settling: cycle starts compared with the steady-state cycle start, so the
+        # ripple does not count; settled one cycle after the last one outside the band
+        vc_start[num_cycles] = x[:, 1]
+        outside = np.abs(vc_start - x_ss[:, 1]) > settle_band*np.abs(vout_mean)
+        last_out = num_cycles - np.argmax(outside[::-1], axis=0)
+        settling_time = np.where(outside.any(axis=0), last_out + 1, 0) * Tsw
+        settling_time[outside[-1]] = np.nan
+    else:
+        settling_time = np.full(n, np.nan)
+
+    # loss proxies
+    p_cond = duty*i2_on*r_on + (1 - duty)*i2_off*r_diode + (duty*i2_on + (1 - duty)*i2_off)*r_L
+    i_mean = duty*iL_on.mean(axis=1) + (1 - duty)*iL_off.mean(axis=1)
+    p_sw = Vin * np.abs(i_mean) * t_sw * fsw
+    p_out = vout_mean**2 / R
+
+    table = np.empty(n, dtype=SWEEP_FIELDS)
+    table['Vin'] = Vin
+    table['Vout'] = Vout
+    table['Iout'] = Iout
+    table['fsw'] = fsw
+    table['delta_iL_pu'] = delta_iL_pu
+    table['delta_Vout_pu'] = delta_Vout_pu
+    table['L'] = L
+    table['C'] = C
+    table['R'] = R
+    table['duty'] = duty
+    table['vout_mean'] = vout_mean
+    table['iL_ripple_pu'] = np.ptp(iL_all, axis=1) / Iout
+    table['vout_ripple_pu'] = np.ptp(vc_all, axis=1) / Vout
+    table['settling_time'] = settling_time
+    table['p_cond'] = p_cond
+    table['p_sw'] = p_sw
+    table['efficiency'] = p_out / (p_out + p_cond + p_sw)
+    return table
+
+
+def grid(**axes):
+    """
+    Cartesian product of sweep axes, ready to be passed to sweep_designs()
+
+        sweep_designs(**grid(Vin=[12, 24], fsw=[50e3, 100e3]), Iout=2, Vout=5)
+    """
+    names = list(axes)
+    mesh = np.meshgrid(*[np.asarray(axes[k], dtype=float) for k in names], indexing='ij')
+    return {k: m.ravel() for k, m in zip(names, mesh)}
@@ -0,0 +1,167 @@
+"""
+Command Line Interface
+Runs the example scenarios headless and dumps the result arrays:
+
+    python -m pesim --list
+    python -m pesim buck-closed-loop --set sim_time=5e-3 --set Vref_step=12 --out step.npz
+    python -m pesim srf-pll --out srf.npz --figures srf.png     # figures without a display
+    python -m pesim sogi-pll --plot                             # interactive figures
+    python -m pesim srf-pll --profile srf.json                  # stage timers, Chrome trace
+
+Scenario modules are imported on demand and matplotlib only when --plot or
+--figures is given.
+"""
+import argparse
+import ast
+from dataclasses import fields, is_dataclass
+import importlib
+import inspect
+import os
+import sys
+import time
+
+import numpy as np
+
+# name -> (scenario function, plot function in pesim.plotting, plot keyword arguments)
+SCENARIOS = {
+    'buck-open-loop': ('pesim.buck.scenarios:run_open_loop', 'plot_buck_open_loop', {}),
+    'buck-closed-loop': ('pesim.buck.scenarios:run_closed_loop', 'plot_buck_closed_loop', {}),
+    'srf-pll': ('pesim.pll.srf:run_srf_pll', 'plot_srf_pll', {}),
+    'srf-pll-unbalanced': ('pesim.pll.three_phase:run_unbalanced_srf_pll', 'plot_srf_pll',
+                           {'f2': 52.0}),
+    'sogi-pll': ('pesim.pll.sogi:run_sogi_pll', 'plot_sogi_pll', {}),
+    'dsogi-pll-fault': ('pesim.pll.dsogi:run_dsogi_pll_fault', 'plot_dsogi_pll', {}),
+    'pll-monte-carlo': ('pesim.pll.montecarlo:monte_carlo_pll', 'plot_monte_carlo', {}),
+    'capacitor-filter': ('pesim.dsp.filters:run_capacitor_filter', 'plot_filter', {}),
+    'lossy-capacitor-filter': ('pesim.dsp.filters:run_lossy_capacitor_filter', 'plot_filter', {}),
+    'inductor-filter': ('pesim.dsp.filters:run_inductor_filter', 'plot_filter', {}),
+    'lossy-inductor-filter': ('pesim.dsp.filters:run_lossy_inductor_filter', 'plot_filter', {}),
+    'lc-filter': ('pesim.dsp.filters:run_lc_filter', 'plot_filter',
+                  {'figures': ('combined',)}),
+    'sop-filter': ('pesim.dsp.filters:run_sop_filter', 'plot_filter',
+                   {'figures': ('input', 'output', 'combined')}),
+    'lc-bode': ('pesim.dsp.design:run_lc_bode', 'plot_bode', {'labels': False}),
+    'sop-bode': ('pesim.dsp.design:run_sop_bode', 'plot_bode', {}),
+}
+
+
+def load(name):
+    """Scenario function registered under name."""
+    try:
+        target = SCENARIOS[name][0]
+    except KeyError:
+        raise ValueError(f"unknown scenario {name!r}, choose from {', '.join(SCENARIOS)}") from None
+    module, func = target.split(':')
+    return getattr(importlib.import_module(module), func)
+
+
+def run(name, **kwargs):
+    """Run a scenario by name, keyword arguments override its defaults."""
+    return load(name)(**kwargs)
+
+
+def result_arrays(res):
+    """Array fields of a result dataclass, skipping unset (None) fields."""
+    if not is_dataclass(res):
+        raise TypeError(f"expected a result dataclass, got {type(res).__name__}")
+    out = {}
+    for f in fields(res):
+        value = getattr(res, f.name)
+        if value is not None:
+            out[f.name] = np.asarray(value)
+    return out
+
+
+def _parse_set(items):
+    kwargs = {}
+    for item in items:
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise SystemExit(f"--set expects key=value, got {item!r}")
+        try:
+            kwargs[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            kwargs[key] = value
+    return kwargs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pesim',
+                                     description='Run a pesim scenario headless and dump the results.')
+    parser.add_argument('scenario', nargs='?', help='scenario name, see --list')
+    parser.add_argument('--list', action='store_true', help='list the scenarios and exit')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='override a scenario parameter, may be repeated')
+    parser.add_argument('--out', help='write the result arrays to this .npz file')
+    parser.add_argument('--plot', action='store_true', help='show the figures (needs a display)')
+    parser.add_argument('--figures', metavar='PATH',
+                        help='save the figures to PATH (numbered if there are several), no display needed')
+    parser.add_argument('--quiet', action='store_true', help='do not print the result summary')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='instrument the run and write a Chrome trace (.json) or folded stacks '
+                             '(any other extension) to PATH')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (target, _, _) in SCENARIOS.items():
+            print(f"{name:24s} {target}")
+        return 0
+    if args.scenario is None:
+        parser.error('a scenario name is required, see --list')
+    if args.scenario not in SCENARIOS:
+        parser.error(f"unknown scenario {args.scenario!r}, see --list")
+
+    kwargs = _parse_set(args.set)
+    instrument = None
+    if args.profile:
+        from .instrument import Instrument
+        instrument = Instrument()
+        if 'instrument' in inspect.signature(load(args.scenario)).parameters:
+            kwargs['instrument'] = instrument
+    t_start = time.perf_counter()
+    if instrument is not None:
+        with instrument.span(args.scenario):
+            res = run(args.scenario, **kwargs)
+    else:
+        res = run(args.scenario, **kwargs)
+    elapsed = time.perf_counter() - t_start
+    arrays = result_arrays(res)
+
+    if args.out:
+        np.savez(args.out, **arrays)
+    if not args.quiet:
+        print(f"{args.scenario}: {elapsed:.3f} s")
+        for key, a in arrays.items():
+            if a.size and a.dtype.kind in 'biuf':
+                print(f"  {key:18s} {str(a.shape):12s} min {a.min():.6g}  max {a.max():.6g}")
+            else:
+                print(f"  {key:18s} {str(a.shape):12s}")
+
+    if args.plot or args.figures:
+        if not args.plot:
+            import matplotlib
+            matplotlib.use('Agg')
+        from . import plotting
+        _, plot_name, plot_kwargs = SCENARIOS[args.scenario]
+        if instrument is not None:
+            with instrument.span('plot'):
+                figs = getattr(plotting, plot_name)(res, show=args.plot, **plot_kwargs)
+        else:
+            figs = getattr(plotting, plot_name)(res, show=args.plot, **plot_kwargs)
+        if args.figures:
+            stem, ext = os.path.splitext(args.figures)
+            for k, fig in enumerate(figs):
+                fig.savefig(args.figures if len(figs) == 1 else f"{stem}-{k + 1}{ext or '.png'}")
+
+    if instrument is not None:
+        if args.profile.endswith('.json'):
+            instrument.write_chrome_trace(args.profile)
+        else:
+            instrument.write_folded(args.profile)
+        if not args.quiet:
+            print(instrument.summary())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
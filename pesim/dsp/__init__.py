@@ -0,0 +1,16 @@
+"""Discrete filters and analog filter design."""
+from .filters import (FilterResult, capacitor_filter, lossy_capacitor_filter, inductor_filter,
+                      lossy_inductor_filter, lc_filter, sop_filter, tf_filter, discrete_tf_filter,
+                      sampled_signal, run_filter,
+                      capacitor_coefficients, lossy_capacitor_coefficients, inductor_coefficients,
+                      lossy_inductor_coefficients, lc_coefficients, sop_coefficients,
+                      run_capacitor_filter, run_lossy_capacitor_filter, run_inductor_filter,
+                      run_lossy_inductor_filter, run_lc_filter, run_sop_filter)
+from .design import (BodeResult, capacitor_tf, lossy_capacitor_tf, inductor_tf, lossy_inductor_tf,
+                     lc_filter_tf, second_order_pole_tf, bode, run_lc_bode, run_sop_bode)
+from .sos import SosFilter
+from .discretize import DiscreteFilter, compile_filter
+from .response import FrequencyResponse, Margins, log_grid, frequency_response, margins
+from .resample import Resampler
+from .source import Source, Harmonic, Tone, Noise, FrequencyStep, PhaseJump
+from .fixed import fixed_iir, fixed_filter_report
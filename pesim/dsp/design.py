@@ -0,0 +1,71 @@
+"""
+Analog Filter Design
+Continuous-time transfer functions of the filters in dsp/filter_code and
+dsp/filter_design and their Bode plots, as computed by the design scripts.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import signal
+
+
+@dataclass
+class BodeResult:
+    """Bode data: angular frequency (rad/s), magnitude (dB), phase (deg)."""
+    w: np.ndarray
+    mag: np.ndarray
+    phase: np.ndarray
+
+
+def capacitor_tf(C):
+    """Z(s) = 1/(s*C), current in -> voltage out."""
+    return signal.lti([1], [C, 0])
+
+
+def lossy_capacitor_tf(C, R):
+    """Z(s) = R/(s*RC + 1), capacitor with a parallel loss resistor."""
+    return signal.lti([R], [R*C, 1])
+
+
+def inductor_tf(L):
+    """Y(s) = 1/(s*L), voltage in -> current out."""
+    return signal.lti([1], [L, 0])
+
+
+def lossy_inductor_tf(L, R):
+    """Y(s) = 1/(s*L + R), inductor with a series loss resistor."""
+    return signal.lti([1], [L, R])
+
+
+def lc_filter_tf(L, C, R):
+    """H(s) = 1/(s^2*LC + s*RC + 1)"""
+    return signal.lti([1], [L*C, R*C, 1])
+
+
+def second_order_pole_tf(omega_0, zeta):
+    """H(s) = omega_0**2/(s^2 + 2*s*zeta*omega_0 + omega_0**2)"""
+    return signal.lti([omega_0**2], [1, 2*zeta*omega_0, omega_0**2])
+
+
+def bode(system, w=None):
+    """
+    Bode data of an lti system
+
+    w defaults to an adaptive log grid over the 1..1e5 rad/s span the
+    scripts plot, refined around resonances (see response.py).
+    """
+    if w is None:
+        from .response import frequency_response
+        return frequency_response(system, w_min=1.0, w_max=1.0e5).bode()
+    w, mag, phase = signal.bode(system, w)
+    return BodeResult(w, mag, phase)
+
+
+def run_lc_bode(R=0.1, L=0.01, C=1000.0e-6, w=None):
+    """lc_filter.py: Bode plot of the RLC low-pass."""
+    return bode(lc_filter_tf(L, C, R), w)
+
+
+def run_sop_bode(omega_0=1000.0, zeta=0.1, w=None):
+    """second_order_pole.py: Bode plot of the second-order pole."""
+    return bode(second_order_pole_tf(omega_0, zeta), w)
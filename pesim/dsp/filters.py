@@ -0,0 +1,231 @@
+"""
+Discrete Filters
+Tustin (trapezoidal) discretizations of the passive filters in
+dsp/filter_code, plus the sampled test scenarios the scripts run them on.
+
+Every filter is a coefficient definition: the *_coefficients functions give
+a normalized z^-1 transfer function (num, den) with den[0] = 1, and the
+filter functions run it through the SosFilter engine over the whole array.
+discrete_tf_filter() keeps the sample-by-sample difference equation the ISR
+executes, as the reference the engine is checked against.
+"""
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+
+from .design import second_order_pole_tf
+from .discretize import compile_filter
+from .sos import SosFilter
+from .source import Harmonic, Source, Tone, _count
+
+
+@dataclass
+class FilterResult:
+    """
+    Input samples at t_sample and the filter output
+
+    The oversampled input (time, signal) is only built when first asked
+    for, e.g. by the 'input' figure of plot_filter().
+    """
+    sample_time: np.ndarray     # time of every sample seen by the filter
+    samples: np.ndarray         # filter input samples
+    output: np.ndarray          # filter output samples
+    make_signal: object = None  # the input, callable of t (a Source or any function)
+    t_duration: float = None
+    t_step: float = None
+
+    @cached_property
+    def _oversampled(self):
+        return sampled_signal(self.t_duration, self.t_step, self.t_step, self.make_signal)[:2]
+
+    @property
+    def time(self):
+        """Oversampled time axis."""
+        return self._oversampled[0]
+
+    @property
+    def signal(self):
+        """Oversampled input signal."""
+        return self._oversampled[1]
+
+
+# ---------------------------------------------------------------- coefficients
+
+def capacitor_coefficients(t_sample, C):
+    """v(n) = v(n-1) + T/(2C)*(i(n) + i(n-1))"""
+    g = t_sample/(2*C)
+    return np.array([g, g]), np.array([1.0, -1.0])
+
+
+def lossy_capacitor_coefficients(t_sample, C, R):
+    """Capacitor with a parallel loss resistor R."""
+    den = 2*C + t_sample/R
+    return np.array([t_sample/den, t_sample/den]), np.array([1.0, -(2*C - t_sample/R)/den])
+
+
+def inductor_coefficients(t_sample, L):
+    """i(n) = i(n-1) + T/(2L)*(v(n) + v(n-1))"""
+    g = t_sample/(2*L)
+    return np.array([g, g]), np.array([1.0, -1.0])
+
+
+def lossy_inductor_coefficients(t_sample, L, R):
+    """Inductor with a series loss resistor R."""
+    den = 2*L + t_sample*R
+    return np.array([t_sample/den, t_sample/den]), np.array([1.0, -(2*L - t_sample*R)/den])
+
+
+def lc_coefficients(t_sample, L, C, R):
+    """Series R-L, shunt C low-pass, input voltage -> capacitor voltage."""
+    k = (2/t_sample)**2
+    den = k + 2*R/(L*t_sample) + 1/(L*C)
+    num = np.array([1.0, 2.0, 1.0]) * (1/(L*C)) / den
+    return num, np.array([1.0, (-2*k + 2/(L*C))/den, (k - 2*R/(L*t_sample) + 1/(L*C))/den])
+
+
+def sop_coefficients(t_sample, omega_0=1000.0, zeta=0.1):
+    """Tustin (bilinear, trapezoidal) discretization of the second-order pole."""
+    sop_z = compile_filter(second_order_pole_tf(omega_0, zeta), t_sample, 'tustin')
+    return sop_z.num.copy(), sop_z.den.copy()
+
+
+# ---------------------------------------------------------------- filters
+
+def tf_filter(samples, num, den):
+    """Run num/den over samples, (num_samples,) or (num_samples, channels)."""
+    return SosFilter.from_tf(num, den).process(samples)
+
+
+def capacitor_filter(current_samples, t_sample, C):
+    """Ideal capacitor, current in -> voltage out."""
+    return tf_filter(current_samples, *capacitor_coefficients(t_sample, C))
+
+
+def lossy_capacitor_filter(current_samples, t_sample, C, R):
+    """Capacitor with a parallel loss resistor R, current in -> voltage out."""
+    return tf_filter(current_samples, *lossy_capacitor_coefficients(t_sample, C, R))
+
+
+def inductor_filter(voltage_samples, t_sample, L):
+    """Ideal inductor, voltage in -> current out."""
+    return tf_filter(voltage_samples, *inductor_coefficients(t_sample, L))
+
+
+def lossy_inductor_filter(voltage_samples, t_sample, L, R):
+    """Inductor with a series loss resistor R, voltage in -> current out."""
+    return tf_filter(voltage_samples, *lossy_inductor_coefficients(t_sample, L, R))
+
+
+def lc_filter(inp_voltage_samples, t_sample, L, C, R):
+    """Series R-L, shunt C low-pass filter, input voltage -> capacitor voltage."""
+    return tf_filter(inp_voltage_samples, *lc_coefficients(t_sample, L, C, R))
+
+
+def sop_filter(inp_voltage_samples, t_sample, omega_0=1000.0, zeta=0.1):
+    """Tustin second-order pole."""
+    return tf_filter(inp_voltage_samples, *sop_coefficients(t_sample, omega_0, zeta))
+
+
+def discrete_tf_filter(inp_samples, num, den):
+    """
+    Up to second-order num/den (z^-1 coefficients) run sample by sample
+
+    The per-sample difference equation of the dsp scripts' ISR loops, kept
+    as the reference for the array engine.
+    """
+    num = np.pad(np.asarray(num, dtype=float), (0, 3 - len(num)))
+    den = np.pad(np.asarray(den, dtype=float), (0, 3 - len(den)))
+    out_samples = np.zeros(inp_samples.size)
+    u = np.zeros(3)     # present value u[0]=u(n) and past values u[1]=u(n-1), u[2]=u(n-2)
+    y = np.zeros(3)     # present value y[0]=y(n) and past values y[1]=y(n-1), y[2]=y(n-2)
+
+    for idx, val in np.ndenumerate(inp_samples):
+        u[0] = val
+
+        y[0] = ( num[0] * u[0] + num[1] * u[1] + num[2] * u[2] - den[1] * y[1] - den[2] * y[2] ) / den[0]
+
+        u[2] = u[1]     # u(n-2) = u(n-1)
+        u[1] = u[0]     # u(n-1) = u(n)
+        y[2] = y[1]     # y(n-2) = y(n-1)
+        y[1] = y[0]     # y(n-1) = y(n)
+
+        out_samples[idx] = y[0]
+
+    return out_samples
+
+
+# ---------------------------------------------------------------- scenarios
+
+def sampled_signal(t_duration, t_step, t_sample, make_signal):
+    """Oversampled signal make_signal(t) and the samples the ISR sees every t_sample."""
+    num_samples = int(t_duration/t_step)
+    time_array = np.arange(num_samples)*t_step
+    sig = make_signal(time_array)
+    num_skip = int(t_sample/t_step)
+    return time_array, sig, time_array[::num_skip], sig[::num_skip]
+
+
+def _samples(make_signal, t_duration, t_step, t_sample):
+    # the t_sample instants of the oversampled grid, without building the grid
+    if hasattr(make_signal, 'sample'):
+        return make_signal.sample(t_duration, t_sample, t_step=t_step)
+    every = int(t_sample/t_step)
+    t = np.arange(_count(t_duration, t_step, every))*every*t_step
+    return t, make_signal(t)
+
+
+def run_filter(num, den, make_signal, t_duration=1.0, t_step=1.0e-6, t_sample=200.0e-6):
+    """
+    Sample make_signal(t) every t_sample and run num/den over the samples
+
+    make_signal: a Source or any callable of t. Only the sampling instants
+    of the t_step grid are evaluated; the oversampled trace waits until
+    FilterResult.time/signal is read.
+    """
+    ts, x = _samples(make_signal, t_duration, t_step, t_sample)
+    return FilterResult(ts, x, tf_filter(x, num, den), make_signal, t_duration, t_step)
+
+
+def run_capacitor_filter(t_duration=1.0, t_step=1.0e-6, t_sample=200.0e-6, freq=50.0, mag=5.0,
+                         C=100.0e-6):
+    """capacitor_filter.py: 50 Hz current into an ideal 100 uF capacitor."""
+    return run_filter(*capacitor_coefficients(t_sample, C), Source(freq, mag),
+                      t_duration, t_step, t_sample)
+
+
+def run_lossy_capacitor_filter(t_duration=1.0, t_step=1.0e-6, t_sample=200.0e-6, freq=50.0,
+                               mag=5.0, C=100.0e-6, R=1.0e+3):
+    """lossy_capacitor_filter.py: as run_capacitor_filter with a 1 kohm parallel resistor."""
+    return run_filter(*lossy_capacitor_coefficients(t_sample, C, R), Source(freq, mag),
+                      t_duration, t_step, t_sample)
+
+
+def run_inductor_filter(t_duration=1.0, t_step=1.0e-6, t_sample=200.0e-6, freq=50.0,
+                        mag=np.sqrt(2)*230.0, L=1.0e-3):
+    """inductor_filter.py: 230 V rms, 50 Hz across an ideal 1 mH inductor."""
+    return run_filter(*inductor_coefficients(t_sample, L), Source(freq, mag),
+                      t_duration, t_step, t_sample)
+
+
+def run_lossy_inductor_filter(t_duration=1.0, t_step=1.0e-6, t_sample=200.0e-6, freq=50.0,
+                              mag=np.sqrt(2)*230.0, L=1.0e-3, R=1.0e-2):
+    """lossy_inductor_filter.py: as run_inductor_filter with a series loss resistor."""
+    return run_filter(*lossy_inductor_coefficients(t_sample, L, R), Source(freq, mag),
+                      t_duration, t_step, t_sample)
+
+
+def run_lc_filter(t_duration=0.4, t_step=1.0e-6, t_sample=200.0e-6, freq=50.0,
+                  mag=np.sqrt(2)*230, harmonic=13, C=500.0e-6, R=0.05, L=0.001):
+    """LC_filter.py: 50 Hz with a 10% 13th harmonic through the RLC low-pass."""
+    source = Source(freq, mag, components=[Harmonic(harmonic, 0.1)])
+    return run_filter(*lc_coefficients(t_sample, L, C, R), source,
+                      t_duration, t_step, t_sample)
+
+
+def run_sop_filter(t_duration=0.4, t_step=1.0e-6, t_sample=200.0e-6, freq=50.0,
+                   inp_mag=np.sqrt(2)*230, f_noise=8000.0, omega_0=1000.0, zeta=0.1):
+    """second_order_pole_implementation.py: Tustin second-order pole on 50 Hz + 8 kHz."""
+    source = Source(freq, inp_mag, components=[Tone(f_noise, 0.2*inp_mag)])
+    return run_filter(*sop_coefficients(t_sample, omega_0, zeta), source,
+                      t_duration, t_step, t_sample)
@@ -0,0 +1,120 @@
+"""
+Fixed-point IIR Filters
+Direct form I emulation of the filters in dsp/filter_code as they would run
+on a fixed-point MCU: input and output in a Q data format scaled to a full
+scale value, coefficients quantized to coef_word bits with the binary point
+placed for the largest coefficient, products summed in a wide accumulator,
+output rounded and saturated (or wrapped) back to the data format.
+
+The feed-forward part is computed for the whole record at once, only the
+feedback recursion steps through time, vectorized over channels.
+"""
+import math
+
+import numpy as np
+from scipy import signal
+
+from ..fixed_point import FixedPoint, FixedResult, QFormat, Q15, quantization_noise, to_float
+from .filters import (capacitor_coefficients, lossy_capacitor_coefficients, inductor_coefficients,
+                      lossy_inductor_coefficients, lc_coefficients, sop_coefficients,
+                      run_capacitor_filter, run_lossy_capacitor_filter, run_inductor_filter,
+                      run_lossy_inductor_filter, run_lc_filter, run_sop_filter)
+
+
+def fixed_iir(u, num, den, data=Q15, coef_word=16, acc_word=None, full_scale=1.0, out_scale=None,
+              rounding='nearest', saturate=True):
+    """
+    Run num/den (z^-1 coefficients) in fixed point over u
+
+    u: input in physical units, (num_steps,) or (num_steps, N) channels.
+    full_scale / out_scale: physical value of 1.0 in the data format at the
+    input / output (out_scale defaults to full_scale).
+    acc_word: accumulator width, default two data words plus 8 guard bits
+    (at most 63). Products wider than 58 bits are truncated before they are
+    summed so the accumulator stays inside int64.
+    Returns a FixedResult whose output is in physical units, with overflow
+    counts per stage and the quantization noise against the float filter.
+    """
+    fx = FixedPoint(rounding, saturate)
+    out_scale = full_scale if out_scale is None else out_scale
+
+    num = np.asarray(num, dtype=float) / den[0]
+    den = np.asarray(den, dtype=float) / den[0]
+
+    # the ratio of input to output scaling is folded into the feed-forward coefficients
+    num_q = num * (full_scale/out_scale)
+    coef = QFormat.fit(np.concatenate([num_q, den[1:]]), coef_word)
+    b = fx.quantize(num_q, coef, 'coefficients')
+    a_q = fx.quantize(den[1:], coef, 'coefficients')
+
+    pshift = max(0, data.word + coef.word - 58)
+    acc_frac = data.frac + coef.frac - pshift
+    if acc_word is None:
+        acc_word = min(2*data.word + 8, 63)
+    acc = QFormat(acc_word, acc_frac)
+
+    u = np.asarray(u, dtype=float)
+    x = fx.quantize(u/full_scale, data, 'input')
+    num_steps = len(x)
+
+    # feed-forward sum for all samples at once
+    ff = np.zeros(x.shape, dtype=np.int64)
+    for k, bk in enumerate(b.tolist()):
+        ff[k:] += (bk * x[:num_steps - k]) >> pshift
+
+    # feedback recursion, one vector over channels per step
+    a = a_q.tolist()
+    order = len(a)
+    y = np.zeros(x.shape, dtype=np.int64)
+    past = [np.zeros(x.shape[1:], dtype=np.int64) for _ in range(order)]
+    for n in range(num_steps):
+        s = ff[n]
+        for k in range(order):
+            s = s - ((a[k] * past[k]) >> pshift)
+        s = fx.limit(s, acc, 'accumulator')
+        yn = fx.requantize(s, acc_frac, data, 'output')
+        y[n] = yn
+        if order:
+            past = [yn] + past[:-1]
+
+    y_float = to_float(y, data) * out_scale
+    reference = signal.lfilter(num, den, u, axis=0)
+    noise = {'output': quantization_noise(reference, y_float),
+             'coefficients': quantization_noise(np.concatenate([num_q, den[1:]]),
+                                                to_float(np.concatenate([b, a_q]), coef))}
+    return FixedResult(output=y_float, raw={'input': x, 'output': y},
+                       overflows=dict(fx.overflows), noise=noise,
+                       formats={'data': data, 'coefficients': coef, 'accumulator': acc})
+
+
+def _scale(peak):
+    # next power of two above the peak, the usual per-unit base
+    return 2.0**math.ceil(math.log2(peak)) if peak > 0 else 1.0
+
+
+def fixed_filter_report(data=Q15, coef_word=16, rounding='nearest', saturate=True, headroom=1.0):
+    """
+    Run every dsp/filter_code scenario in fixed point
+
+    Input and output full scales are the powers of two above the float
+    peaks times 'headroom' (< 1 provokes overflows, > 1 trades resolution
+    for margin). Returns {name: FixedResult}.
+    """
+    t_sample = 200.0e-6
+    cases = {
+        'capacitor': (run_capacitor_filter(), capacitor_coefficients(t_sample, 100.0e-6)),
+        'lossy_capacitor': (run_lossy_capacitor_filter(),
+                            lossy_capacitor_coefficients(t_sample, 100.0e-6, 1.0e+3)),
+        'inductor': (run_inductor_filter(), inductor_coefficients(t_sample, 1.0e-3)),
+        'lossy_inductor': (run_lossy_inductor_filter(),
+                           lossy_inductor_coefficients(t_sample, 1.0e-3, 1.0e-2)),
+        'lc': (run_lc_filter(), lc_coefficients(t_sample, 0.001, 500.0e-6, 0.05)),
+        'sop': (run_sop_filter(), sop_coefficients(t_sample, 1000.0, 0.1)),
+    }
+    report = {}
+    for name, (res, (num, den)) in cases.items():
+        in_scale = _scale(np.max(np.abs(res.samples))) * headroom
+        out_scale = _scale(np.max(np.abs(res.output))) * headroom
+        report[name] = fixed_iir(res.samples, num, den, data, coef_word, full_scale=in_scale,
+                                 out_scale=out_scale, rounding=rounding, saturate=saturate)
+    return report
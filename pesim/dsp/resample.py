@@ -0,0 +1,105 @@
+"""
+Streaming Resampler
+Rational-rate polyphase resampler for records fed in blocks. The FIR design
+and the time alignment are those of scipy.signal.resample_poly (Kaiser
+window, beta 5, 10 zero crossings per side, output sample j at t = j/fs_out,
+zero padding at both ends), so the concatenated output of process() and
+flush() equals resample_poly over the whole record (to round-off) while
+memory stays at one block.
+
+    rs = Resampler(12800.0, 10000.0)        # up 25, down 32
+    for block in blocks:                    # (n,) or (n, channels)
+        y = rs.process(block)
+    y_tail = rs.flush()
+
+Time runs along axis 0; trailing axes are independent channels.
+"""
+from fractions import Fraction
+import math
+
+import numpy as np
+from scipy import signal
+
+
+class Resampler:
+    """Polyphase resampler from fs_in to fs_out with state carried across blocks."""
+
+    def __init__(self, fs_in, fs_out, max_denominator=1000, window=('kaiser', 5.0)):
+        """
+        The ratio fs_out/fs_in is approximated by up/down with down at most
+        max_denominator; fs_out is then the exact output rate fs_in*up/down.
+        """
+        ratio = (Fraction(fs_out) / Fraction(fs_in)).limit_denominator(max_denominator)
+        self.up = ratio.numerator
+        self.down = ratio.denominator
+        self.fs_in = float(fs_in)
+        self.fs_out = self.fs_in * self.up / self.down
+
+        if self.up == self.down:
+            self.taps = np.ones((1, 1))
+        else:
+            max_rate = max(self.up, self.down)
+            self.half_len = 10 * max_rate
+            h = signal.firwin(2*self.half_len + 1, 1/max_rate, window=window) * self.up
+            # polyphase bank, phase p holds h[p::up] zero-padded and time-reversed so it
+            # lines up with the oldest-first window of input samples
+            k = -(-len(h) // self.up)
+            bank = np.zeros((self.up, k))
+            for p in range(self.up):
+                taps = h[p::self.up]
+                bank[p, :len(taps)] = taps
+            self.taps = bank[:, ::-1].copy()
+        self.reset()
+
+    def reset(self):
+        """Forget the history, the next block starts a new record."""
+        self.samples_in = 0         # input samples consumed
+        self.samples_out = 0        # output samples produced
+        self._channels = ()         # trailing shape of the blocks
+        self._hist = None
+
+    def process(self, x):
+        """Resample the next block, returns the output samples now available."""
+        x = np.asarray(x, dtype=float)
+        self._channels = x.shape[1:]
+        if self.up == self.down:
+            self.samples_in += len(x)
+            self.samples_out += len(x)
+            return x
+
+        k = self.taps.shape[1]
+        if self._hist is None:
+            self._hist = np.zeros((k - 1,) + x.shape[1:])
+        buf = np.concatenate([self._hist, x])
+        n_in = self.samples_in
+        self.samples_in += len(x)
+        self._hist = buf[len(buf) - (k - 1):]
+
+        # outputs whose newest input sample has arrived
+        j_end = (self.samples_in*self.up - 1 - self.half_len) // self.down + 1
+        j = np.arange(self.samples_out, max(j_end, self.samples_out))
+        self.samples_out += len(j)
+        n = j*self.down + self.half_len
+        start = n // self.up - n_in     # window of input samples in buf
+        phase = n % self.up
+
+        # outputs up apart share a phase and their windows are 'down' samples apart:
+        # one strided view of buf and one matrix product per phase
+        y = np.empty((len(j),) + x.shape[1:])
+        windows = np.lib.stride_tricks.sliding_window_view(buf, k, axis=0)
+        for r in range(min(self.up, len(j))):
+            count = len(y[r::self.up])
+            y[r::self.up] = windows[start[r]:start[r] + self.down*(count - 1) + 1:self.down] \
+                @ self.taps[phase[r]]
+        return y
+
+    def flush(self):
+        """Outputs still held back at the end of the record, zero padded like resample_poly."""
+        total = math.ceil(self.samples_in*self.up/self.down)
+        pending = total - self.samples_out
+        if pending <= 0:
+            return np.zeros((0,) + self._channels)
+        last = ((total - 1)*self.down + self.half_len) // self.up
+        y = self.process(np.zeros((last + 1 - self.samples_in,) + self._channels))
+        self.samples_out = total
+        return y[:pending]
@@ -0,0 +1,238 @@
+"""
+Frequency Response
+Bode data of many transfer functions at once on log-spaced grids. The
+numerators and denominators are padded into coefficient matrices and
+evaluated by Horner's rule over (systems, frequencies) in one pass,
+instead of signal.bode() on 100k linear points per system.
+
+The default grid is adaptive: a log grid plus the natural frequencies of
+every pole and zero, bisected (geometrically) wherever the magnitude or
+phase of any system changes by more than a tolerance between neighbours,
+which resolves narrow resonances such as the zeta = 0.1 peak.
+
+    resp = frequency_response([lc_filter_tf(L, C, R), second_order_pole_tf(1000, 0.1)])
+    resp.mag, resp.phase            # (systems, points), dB and unwrapped degrees
+    margins(resp)                   # gain/phase margins and crossovers per system
+
+Continuous systems are evaluated at s = jw; with dt they are z-domain
+num/den in z^-1 (DiscreteFilter, the *_coefficients functions) evaluated
+at z = exp(jw*dt); DiscreteFilter and scipy dlti systems bring their own dt.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from .design import BodeResult
+
+
+@dataclass
+class FrequencyResponse:
+    """Complex response of M systems on a common grid w (rad/s)."""
+    w: np.ndarray               # (points,)
+    h: np.ndarray               # (M, points)
+
+    @property
+    def mag(self):
+        """Magnitude in dB."""
+        return 20*np.log10(np.abs(self.h))
+
+    @property
+    def phase(self):
+        """Phase in degrees, unwrapped along w."""
+        return np.degrees(np.unwrap(np.angle(self.h), axis=-1))
+
+    def bode(self, index=0):
+        """BodeResult of one system, for plot_bode()."""
+        return BodeResult(self.w, self.mag[index], self.phase[index])
+
+
+@dataclass
+class Margins:
+    """Stability margins of a loop transfer function; inf/nan where there is no crossover."""
+    gain_margin_db: float           # -|L| in dB at the phase crossover
+    phase_margin_deg: float         # 180 + angle(L) at the gain crossover
+    w_gain_crossover: float         # |L| = 0 dB (rad/s)
+    w_phase_crossover: float        # angle(L) = -180 deg (rad/s)
+    peak_db: float                  # largest magnitude on the grid
+    w_peak: float
+
+
+def _is_pair(system):
+    # a single (num, den) pair rather than a list of systems
+    try:
+        return len(system) == 2 and all(np.asarray(p, dtype=float).ndim == 1 for p in system)
+    except (TypeError, ValueError):
+        return False
+
+
+def _coefficients(systems, dt):
+    # (num, den) matrices padded to a common length and the common sample time;
+    # descending powers of s, or z^-1 coefficients padded on the right for
+    # discrete systems. Without dt, discrete systems (DiscreteFilter, scipy
+    # dlti) bring their own.
+    pairs = []
+    dts = []
+    for system in systems:
+        system_dt = getattr(system, 'dt', None)
+        if hasattr(system, 'to_tf'):
+            system = system.to_tf()
+        if hasattr(system, 'num'):
+            num, den = system.num, system.den
+        else:
+            num, den = system
+        num = np.atleast_1d(np.asarray(num, dtype=float))
+        den = np.atleast_1d(np.asarray(den, dtype=float))
+        if system_dt is not None and hasattr(system, 'to_ss'):
+            # scipy dlti keeps descending powers of z, left-aligned they are z^-1 coefficients
+            n = max(len(num), len(den))
+            num = np.concatenate([np.zeros(n - len(num)), num])
+            den = np.concatenate([np.zeros(n - len(den)), den])
+        pairs.append((num, den))
+        dts.append(system_dt)
+
+    given = {float(d) for d in dts if d is not None}
+    if dt is None:
+        if given and None in dts:
+            raise ValueError("cannot mix continuous and discrete systems in one response")
+        if len(given) > 1:
+            raise ValueError(f"discrete systems with different sample times {sorted(given)}")
+        dt = given.pop() if given else None
+    elif given - {float(dt)}:
+        raise ValueError(f"dt={dt} does not match the sample time of the discrete systems "
+                         f"{sorted(given)}")
+
+    n = max(max(len(num), len(den)) for num, den in pairs)
+    num = np.zeros((len(pairs), n))
+    den = np.zeros((len(pairs), n))
+    for i, (b, a) in enumerate(pairs):
+        if dt is None:
+            num[i, n - len(b):] = b
+            den[i, n - len(a):] = a
+        else:
+            num[i, :len(b)] = b
+            den[i, :len(a)] = a
+    return num, den, dt
+
+
+def _horner(coef, x):
+    # polynomials (M, n) in descending powers at points x (points,) -> (M, points)
+    out = np.zeros((coef.shape[0], x.size), dtype=complex)
+    for k in range(coef.shape[1]):
+        out *= x
+        out += coef[:, k:k+1]
+    return out
+
+
+def _evaluate(num, den, w, dt):
+    x = 1j*w if dt is None else np.exp(1j*w*dt)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _horner(num, x) / _horner(den, x)
+
+
+def _natural_frequencies(num, den, dt):
+    # |root| of every pole and zero (rad/s), the places worth a grid point
+    w = []
+    for poly in np.concatenate([num, den]):
+        roots = np.roots(np.trim_zeros(poly, 'f') if dt is None else np.trim_zeros(poly, 'b'))
+        if dt is not None:
+            # z^-1 coefficients are the descending polynomial in z, up to a power of z
+            roots = np.log(roots[roots != 0].astype(complex)) / dt
+        w.append(np.abs(roots[np.isfinite(roots)]))
+    w = np.concatenate(w) if w else np.zeros(0)
+    return w[w > 0]
+
+
+def log_grid(w_min, w_max, points_per_decade=50):
+    """Log-spaced grid from w_min to w_max (rad/s), both included."""
+    decades = np.log10(w_max/w_min)
+    return np.logspace(np.log10(w_min), np.log10(w_max),
+                       max(int(np.ceil(decades*points_per_decade)) + 1, 2))
+
+
+def frequency_response(systems, w=None, dt=None, w_min=None, w_max=None, points_per_decade=50,
+                       tol_db=0.5, tol_deg=5.0, max_points=20000):
+    """
+    Response of one system or a list of systems
+
+    systems: lti, dlti, (num, den) or DiscreteFilter, or a list of them.
+    dt: sample time of z^-1 (num, den) pairs; DiscreteFilter and dlti
+    systems carry their own, and all systems must share one (ValueError
+    otherwise).
+    w: fixed grid (rad/s); None builds the adaptive log grid from w_min to
+    w_max, which default to two decades around the pole/zero frequencies
+    (below Nyquist for discrete systems). Bisection stops when neighbouring
+    points differ by at most tol_db and tol_deg for every system or the grid
+    reaches max_points.
+    """
+    if not isinstance(systems, (list, tuple)) or _is_pair(systems):
+        systems = [systems]
+    num, den, dt = _coefficients(systems, dt)
+
+    if w is not None:
+        w = np.asarray(w, dtype=float)
+        return FrequencyResponse(w, _evaluate(num, den, w, dt))
+
+    natural = _natural_frequencies(num, den, dt)
+    if w_min is None:
+        w_min = natural.min()/100 if natural.size else 1.0
+    if w_max is None:
+        w_max = natural.max()*100 if natural.size else 1.0e5
+        if dt is not None:
+            w_max = min(w_max, np.pi/dt)
+    w = np.union1d(log_grid(w_min, w_max, points_per_decade),
+                   natural[(natural > w_min) & (natural < w_max)])
+    h = _evaluate(num, den, w, dt)
+
+    while w.size < max_points:
+        mag = 20*np.log10(np.abs(h))
+        ang = np.degrees(np.angle(h[:, 1:] * np.conj(h[:, :-1])))    # wrap-free phase step
+        coarse = np.any((np.abs(np.diff(mag, axis=-1)) > tol_db) | (np.abs(ang) > tol_deg), axis=0)
+        coarse = np.flatnonzero(coarse)[:max_points - w.size]
+        if not coarse.size:
+            break
+        w_new = np.sqrt(w[coarse]*w[coarse + 1])
+        w = np.concatenate([w, w_new])
+        h = np.concatenate([h, _evaluate(num, den, w_new, dt)], axis=-1)
+        order = np.argsort(w)
+        w = w[order]
+        h = h[:, order]
+
+    return FrequencyResponse(w, h)
+
+
+def _interpolate(w, y, k, frac):
+    # log(w) and y interpolated between grid points k and k + 1
+    lw = np.log(w)
+    return np.exp(lw[k] + frac*(lw[k + 1] - lw[k])), y[k] + frac*(y[k + 1] - y[k])
+
+
+def margins(resp):
+    """Margins of every system in a FrequencyResponse, taken as loop transfer functions."""
+    out = []
+    w = resp.w
+    for mag, phase in zip(resp.mag, resp.phase):
+        # gain crossovers, |L| = 0 dB; the worst phase margin wins
+        k = np.flatnonzero(np.sign(mag[:-1]) != np.sign(mag[1:]))
+        k = k[np.isfinite(mag[k]) & np.isfinite(mag[k + 1])]
+        frac = mag[k] / (mag[k] - mag[k + 1])
+        w_gc, ph = _interpolate(w, phase, k, frac)
+        pm = (ph + 360.0) % 360.0 - 180.0           # 180 + phase wrapped into [-180, 180)
+
+        # phase crossovers, phase = -180 + n*360 deg in turns q; the worst gain margin wins
+        q = (phase + 180.0)/360.0
+        k = np.flatnonzero(np.floor(q[:-1]) != np.floor(q[1:]))
+        level = np.maximum(np.floor(q[k]), np.floor(q[k + 1]))
+        w_pc, gm = _interpolate(w, -mag, k, (level - q[k]) / (q[k + 1] - q[k]))
+
+        i_pm = np.argmin(pm) if pm.size else None
+        i_gm = np.argmin(gm) if gm.size else None
+        i_peak = np.nanargmax(mag)
+        out.append(Margins(
+            gain_margin_db=float(gm[i_gm]) if i_gm is not None else np.inf,
+            phase_margin_deg=float(pm[i_pm]) if i_pm is not None else np.inf,
+            w_gain_crossover=float(w_gc[i_pm]) if i_pm is not None else np.nan,
+            w_phase_crossover=float(w_pc[i_gm]) if i_gm is not None else np.nan,
+            peak_db=float(mag[i_peak]),
+            w_peak=float(w[i_peak]),
+        ))
+    return out
@@ -0,0 +1,73 @@
+"""
+SOS Filter Engine
+Stateful second-order-sections filter on top of scipy.signal.sosfilt. The
+coefficients are built once, each call runs the recursion over a whole
+block in C and the section state is carried to the next call, so a record
+fed in blocks gives the same output as one call on the full record.
+
+Time runs along axis 0; any trailing axes are independent channels sharing
+the same coefficients:
+
+    lp = SosFilter.from_tf(*lc_coefficients(200e-6, L, C, R))
+    y1 = lp(block1)                 # (n,) or (n, channels)
+    y2 = lp(block2)                 # continues where block1 stopped
+"""
+import numpy as np
+from scipy import signal
+
+
+class SosFilter:
+    """IIR filter as cascaded biquads with state carried across calls."""
+
+    def __init__(self, sos):
+        self.sos = np.atleast_2d(np.array(sos, dtype=float))
+        if self.sos.shape[1] != 6:
+            raise ValueError(f"sos must have shape (n_sections, 6), got {self.sos.shape}")
+        self.zi = None          # (n_sections, 2, *channels), created on the first block
+
+    @classmethod
+    def from_tf(cls, num, den):
+        """Filter from z^-1 transfer function coefficients."""
+        return cls(signal.tf2sos(num, den))
+
+    @classmethod
+    def from_zpk(cls, z, p, k):
+        return cls(signal.zpk2sos(z, p, k))
+
+    @property
+    def num_sections(self):
+        return len(self.sos)
+
+    def reset(self, channels=None, x0=None):
+        """
+        Clear the state
+
+        channels: shape of the trailing channel axes, taken from the next
+        block if None. x0: start in steady state for a constant input x0
+        (scalar or per channel) instead of from rest.
+        """
+        if channels is None and x0 is None:
+            self.zi = None
+            return
+        shape = tuple(np.atleast_1d(channels)) if channels is not None else np.shape(x0)
+        zi = np.zeros((self.num_sections, 2) + shape)
+        if x0 is not None:
+            zi_unit = signal.sosfilt_zi(self.sos)
+            zi += zi_unit.reshape(zi_unit.shape + (1,)*len(shape)) * np.asarray(x0, dtype=float)
+        self.zi = zi
+
+    def process(self, x):
+        """Filter one block, (num_samples, *channels), returns the output block."""
+        x = np.asarray(x, dtype=float)
+        if self.zi is None or self.zi.shape[2:] != x.shape[1:]:
+            if self.zi is not None:
+                raise ValueError(f"block has channels {x.shape[1:]}, the filter state {self.zi.shape[2:]}")
+            self.zi = np.zeros((self.num_sections, 2) + x.shape[1:])
+        y, self.zi = signal.sosfilt(self.sos, x, axis=0, zi=self.zi)
+        return y
+
+    __call__ = process
+
+    def response(self, worN=512, fs=2*np.pi):
+        """Frequency response (w, h) of the cascade."""
+        return signal.sosfreqz(self.sos, worN=worN, fs=fs)
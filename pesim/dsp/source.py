@@ -0,0 +1,152 @@
+"""
+Signal Sources
+Test signals of dsp/filter_code/signal_gen.py as lazy sources. Instead of a
+1 MHz time_array of the whole record and sig[::num_skip], a Source is
+evaluated only where it is needed: directly at the t_sample instants, or
+over the oversampled grid chunk by chunk with bounded memory.
+
+    src = Source(freq=50.0, mag=5.0, components=[Harmonic(13, 0.1), Noise(0.05, seed=1),
+                                                 FrequencyStep(0.5, 5.0), PhaseJump(0.3, np.pi/6)])
+    ts, x = src.sample(1.0, 200e-6, t_step=1e-6)    # == sampled_signal(...)[2:], 200x less memory
+    for t, sig in src.stream(3600.0, 1e-6):         # one hour at 1 MHz in 64k-sample chunks
+        ...
+
+The fundamental is mag*sin(angle(t)); phase components (FrequencyStep,
+PhaseJump) shape angle(t), waveform components (Harmonic, Tone, Noise) are
+added on top, harmonics following the fundamental's angle. Everything but
+the noise is a closed-form function of t, so chunks and decimated samples
+agree exactly with the full oversampled array.
+"""
+import numpy as np
+
+
+class FrequencyStep:
+    """Fundamental frequency changes by df (Hz) at t0, phase continuous."""
+
+    def __init__(self, t0, df):
+        self.t0 = t0
+        self.df = df
+
+    def phase(self, t):
+        return np.where(t >= self.t0, 2*np.pi*self.df*(t - self.t0), 0.0)
+
+
+class PhaseJump:
+    """Fundamental phase jumps by dphi (rad) at t0."""
+
+    def __init__(self, t0, dphi):
+        self.t0 = t0
+        self.dphi = dphi
+
+    def phase(self, t):
+        return np.where(t >= self.t0, self.dphi, 0.0)
+
+
+class Harmonic:
+    """order-th harmonic of the fundamental, rel_mag relative to mag."""
+
+    def __init__(self, order, rel_mag, phase=0.0):
+        self.order = order
+        self.rel_mag = rel_mag
+        self.phase0 = phase
+
+    def value(self, t, angle, mag):
+        return mag*self.rel_mag*np.sin(self.order*angle + self.phase0)
+
+
+class Tone:
+    """Fixed-frequency sinusoid (e.g. switching noise), independent of the fundamental."""
+
+    def __init__(self, freq, mag, phase=0.0):
+        self.omega = 2*np.pi*freq
+        self.mag = mag
+        self.phase0 = phase
+
+    def value(self, t, angle, mag):
+        return self.mag*np.sin(self.omega*t + self.phase0)
+
+
+class Noise:
+    """
+    White Gaussian noise of standard deviation std
+
+    The draws continue across calls; reset() restarts the stream from
+    seed, which Source.stream() does so repeated runs are identical.
+    """
+
+    def __init__(self, std, seed=None):
+        self.std = std
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        self.rng = np.random.default_rng(self.seed)
+
+    def value(self, t, angle, mag):
+        return self.std*self.rng.normal(0, 1, np.shape(t))
+
+
+def _count(t_duration, t_step, every):
+    # points of the oversampled grid kept when taking every 'every'-th
+    return -(-int(t_duration/t_step) // every)
+
+
+class Source:
+    """Fundamental mag*sin(2*pi*freq*t + phase) plus components, callable on a time array."""
+
+    def __init__(self, freq=50.0, mag=1.0, phase=0.0, components=()):
+        self.omega = 2*np.pi*freq
+        self.mag = mag
+        self.phase0 = phase
+        self.components = list(components)
+
+    def angle(self, t):
+        """Fundamental angle (rad, not wrapped) at t."""
+        angle = self.omega*t + self.phase0
+        for c in self.components:
+            if hasattr(c, 'phase'):
+                angle = angle + c.phase(t)
+        return angle
+
+    def __call__(self, t):
+        t = np.asarray(t, dtype=float)
+        angle = self.angle(t)
+        out = self.mag*np.sin(angle)
+        for c in self.components:
+            if hasattr(c, 'value'):
+                out = out + c.value(t, angle, self.mag)
+        return out
+
+    def reset(self):
+        """Restart the noise streams."""
+        for c in self.components:
+            if hasattr(c, 'reset'):
+                c.reset()
+
+    def stream(self, t_duration, t_step, every=1, chunk=1 << 16):
+        """
+        Yield (t, x) chunks of at most 'chunk' samples
+
+        The grid is the oversampled one of sampled_signal(), int(t_duration/t_step)
+        points t_step apart, of which every 'every'-th is produced.
+        """
+        self.reset()
+        num_out = _count(t_duration, t_step, every)
+        for start in range(0, num_out, chunk):
+            t = np.arange(start, min(start + chunk, num_out))*every*t_step
+            yield t, self(t)
+
+    def sample(self, t_duration, t_sample, t_step=None):
+        """
+        (t, x) at the sampling instants only
+
+        With t_step the instants are those of the oversampled grid,
+        time_array[::int(t_sample/t_step)] as in sampled_signal().
+        """
+        if t_step is None:
+            t_step, every = t_sample, 1
+        else:
+            every = int(t_sample/t_step)
+        self.reset()
+        t = np.arange(_count(t_duration, t_step, every))*every*t_step
+        return t, self(t)
@@ -0,0 +1,153 @@
+"""
+Fixed-point Emulation
+Integer arithmetic of a fixed-point MCU on int64 NumPy arrays: Q formats
+with configurable word length, rounding (floor / nearest / convergent) and
+overflow handling (saturate or two's complement wrap). Every saturation or
+wrap is counted per named operation so the coefficient and signal scaling
+can be checked before the code goes on the target.
+
+    fx = FixedPoint(rounding='nearest', saturate=True)
+    q = fx.quantize(x, Q15, 'input')                    # float -> int
+    acc = b_q * q                                       # Q(cf) * Q15 = Q(cf + 15)
+    y = fx.requantize(acc, cf, Q15, 'output')           # back to Q15
+    fx.overflows                                        # {'input': 0, 'output': 3}
+
+Word lengths up to 32 bits are supported: the product of two such words
+fits in int64, sums of products and wide accumulators do not necessarily,
+the callers bound those (see pll/fixed.py and dsp/fixed.py).
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+import math
+
+import numpy as np
+
+ROUNDING = ('floor', 'nearest', 'convergent')
+
+
+@dataclass(frozen=True)
+class QFormat:
+    """Signed fixed-point format, 'word' bits of which 'frac' are fractional."""
+    word: int = 16
+    frac: int = 15
+
+    @property
+    def min_int(self):
+        return -(1 << (self.word - 1))
+
+    @property
+    def max_int(self):
+        return (1 << (self.word - 1)) - 1
+
+    @property
+    def lsb(self):
+        return 2.0**-self.frac
+
+    @property
+    def max_value(self):
+        return self.max_int * self.lsb
+
+    @classmethod
+    def fit(cls, values, word=16):
+        """Format with the most fractional bits that still holds every value."""
+        peak = float(np.max(np.abs(values))) if np.size(values) else 0.0
+        if peak == 0.0:
+            return cls(word, word - 1)
+        int_bits = math.floor(math.log2(peak)) + 1      # bits left of the binary point
+        frac = word - 1 - int_bits
+        if round(peak * 2.0**frac) > (1 << (word - 1)) - 1:
+            frac -= 1
+        return cls(word, frac)
+
+    def __str__(self):
+        return f"Q{self.word - 1 - self.frac}.{self.frac}"
+
+
+Q15 = QFormat(16, 15)
+Q31 = QFormat(32, 31)
+
+
+class FixedPoint:
+    """Rounding / overflow policy plus the per-operation overflow counters."""
+
+    def __init__(self, rounding='nearest', saturate=True):
+        if rounding not in ROUNDING:
+            raise ValueError(f"rounding must be one of {ROUNDING}, got {rounding!r}")
+        self.rounding = rounding
+        self.saturate = saturate
+        self.overflows = Counter()
+
+    def _round_shift(self, q, shift):
+        # q / 2**shift rounded to an integer, shift >= 0
+        if shift <= 0:
+            return q << -shift if shift else q
+        if self.rounding == 'floor':
+            return q >> shift
+        half = 1 << (shift - 1)
+        if self.rounding == 'nearest':
+            return (q + half) >> shift
+        # convergent: round half to even
+        out = (q + half) >> shift
+        tie = (q & ((1 << shift) - 1)) == half
+        return out - (tie & (out & 1).astype(bool))
+
+    def limit(self, q, fmt, name):
+        """Saturate or wrap q into fmt, counting the samples that did not fit."""
+        q = np.asarray(q, dtype=np.int64)
+        over = (q > fmt.max_int) | (q < fmt.min_int)
+        n = int(np.count_nonzero(over))
+        if n:
+            self.overflows[name] += n
+            if self.saturate:
+                q = np.clip(q, fmt.min_int, fmt.max_int)
+            else:
+                span = 1 << fmt.word
+                q = ((q - fmt.min_int) % span) + fmt.min_int
+        elif name not in self.overflows:
+            self.overflows[name] = 0
+        return q
+
+    def quantize(self, x, fmt, name='quantize'):
+        """Float values to fmt integers."""
+        scaled = np.asarray(x, dtype=float) * 2.0**fmt.frac
+        if self.rounding == 'floor':
+            q = np.floor(scaled)
+        elif self.rounding == 'nearest':
+            q = np.floor(scaled + 0.5)
+        else:
+            q = np.rint(scaled)
+        # clip before the cast so values beyond int64 still count as one overflow
+        big = float(1 << 62)
+        return self.limit(np.clip(q, -big, big).astype(np.int64), fmt, name)
+
+    def requantize(self, q, frac, fmt, name):
+        """Integers with 'frac' fractional bits (e.g. a product) to fmt."""
+        return self.limit(self._round_shift(np.asarray(q, dtype=np.int64), frac - fmt.frac), fmt, name)
+
+
+def to_float(q, fmt):
+    """fmt integers back to floats."""
+    return np.asarray(q, dtype=float) * fmt.lsb
+
+
+def quantization_noise(reference, value):
+    """Error of a fixed-point signal against its float reference: rms, max and SNR (dB)."""
+    reference = np.asarray(reference, dtype=float)
+    err = np.asarray(value, dtype=float) - reference
+    rms = float(np.sqrt(np.mean(err**2))) if err.size else 0.0
+    power = float(np.sqrt(np.mean(reference**2))) if reference.size else 0.0
+    return {
+        'rms': rms,
+        'max': float(np.max(np.abs(err))) if err.size else 0.0,
+        'snr_db': 20*math.log10(power/rms) if rms > 0 and power > 0 else math.inf,
+    }
+
+
+@dataclass
+class FixedResult:
+    """Fixed-point run: float view of the outputs plus the raw integers and the report."""
+    output: object                                  # float outputs (array or result dataclass)
+    raw: dict = field(default_factory=dict)         # name -> int64 array
+    overflows: dict = field(default_factory=dict)   # operation -> saturated/wrapped samples
+    noise: dict = field(default_factory=dict)       # signal -> quantization_noise() against float
+    formats: dict = field(default_factory=dict)     # quantity -> QFormat
@@ -0,0 +1,135 @@
+"""
+Instrumentation
+Opt-in timers and counters for the simulation loops. Every instrumented
+function takes instrument=None; with None the loop computes exactly the
+same results. Each loop exists once: its timer hooks sit behind a flag
+hoisted out of the loop, checked per block or cycle where the loop is
+vectorized and per step in the scalar PLL loops, so disabled instrumentation
+costs a few bool tests.
+
+    inst = Instrument()
+    with inst.span('run'):
+        res = run_srf_pll(instrument=inst)
+    print(inst.summary())                 # time per stage, calls, counters
+    inst.write_chrome_trace('srf.json')   # chrome://tracing or ui.perfetto.dev
+    inst.write_folded('srf.folded')       # flamegraph.pl / speedscope input
+
+Stages used by the loops:
+    plant        power stage propagation, SOGI filter
+    controller   PI updates
+    trig         sin/cos of the Park transform
+    transform    the Park transform arithmetic
+    logging      history arrays, recorder writes
+
+Coarse spans (span()) are recorded as trace events; per-step stages inside
+the hot loops are accumulated locally and added once per call (add()), they
+appear in the trace as one aggregated event per stage under their span.
+Counters: controller executions ('controller_updates'), clamp saturations
+('duty_clamped'), phase wraps ('phase_wraps').
+
+Scope: only simulate_open_loop, simulate_closed_loop (pesim.buck),
+simulate_srf_pll and simulate_sogi_pll (pesim.pll) and the run_* scenarios
+built on them take instrument=. The other loops (Euler reference, edge and
+event solvers, compiled kernel, batched, streaming, DSOGI and fixed-point
+PLLs) have no stage hooks; time them as a whole with a span() around the
+call, as the CLI --profile option does, or with pesim.bench.
+"""
+from collections import Counter
+from contextlib import contextmanager
+import json
+import time
+
+
+class Instrument:
+    """Stage timers, counters and a trace of spans."""
+
+    def __init__(self, max_events=100000):
+        self.max_events = max_events
+        self.totals = {}            # stage path (tuple) -> [ns, calls]
+        self.counters = Counter()
+        self.events = []            # (path, start_ns, duration_ns, calls)
+        self.dropped = 0
+        self._stack = []
+        self._t0 = time.perf_counter_ns()
+
+    clock = staticmethod(time.perf_counter_ns)
+
+    def _record(self, path, start, ns, calls):
+        total = self.totals.setdefault(path, [0, 0])
+        total[0] += ns
+        total[1] += calls
+        if len(self.events) < self.max_events:
+            self.events.append((path, start - self._t0, ns, calls))
+        else:
+            self.dropped += 1
+
+    def _path(self):
+        return tuple(frame[0] for frame in self._stack)
+
+    @contextmanager
+    def span(self, name):
+        """Time a block as one trace event, nested spans build the stack."""
+        start = time.perf_counter_ns()
+        frame = [name, start]           # name, where the next aggregated stage event goes
+        self._stack.append(frame)
+        path = self._path()
+        try:
+            yield self
+        finally:
+            self._record(path, start, time.perf_counter_ns() - start, 1)
+            self._stack.pop()
+
+    def add(self, name, ns, calls=1):
+        """Add time measured inside a loop to stage 'name' under the current span."""
+        path = self._path() + (name,)
+        if self._stack:
+            # aggregated stage events are laid out back to back from the span start
+            start = self._stack[-1][1]
+            self._stack[-1][1] += ns
+        else:
+            start = time.perf_counter_ns() - ns
+        self._record(path, start, ns, calls)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def report(self):
+        """{stage path: {'total_s', 'calls', 'mean_us'}} plus the counters."""
+        stages = {'/'.join(path): {'total_s': ns*1e-9, 'calls': calls,
+                                   'mean_us': ns*1e-3/calls if calls else 0.0}
+                  for path, (ns, calls) in self.totals.items()}
+        return {'stages': stages, 'counters': dict(self.counters)}
+
+    def summary(self):
+        """Text table of the stages and counters."""
+        lines = [f"{'stage':40s} {'total s':>10s} {'calls':>10s} {'mean us':>10s}"]
+        for name, s in self.report()['stages'].items():
+            lines.append(f"{name:40s} {s['total_s']:10.4f} {s['calls']:10d} {s['mean_us']:10.3f}")
+        for name, n in self.counters.items():
+            lines.append(f"{name:40s} {n:10d}")
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """Chrome trace event format (complete 'X' events, microseconds)."""
+        events = [{'name': path[-1], 'cat': '/'.join(path[:-1]) or 'pesim', 'ph': 'X',
+                   'ts': start*1e-3, 'dur': ns*1e-3, 'pid': 0, 'tid': 0, 'args': {'calls': calls}}
+                  for path, start, ns, calls in self.events]
+        events.extend({'name': name, 'ph': 'C', 'ts': 0, 'pid': 0, 'args': {name: n}}
+                      for name, n in self.counters.items())
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def folded(self):
+        """Collapsed stacks 'a;b;c <self time us>' for flamegraph tools."""
+        self_ns = {path: ns for path, (ns, _) in self.totals.items()}
+        for path, (ns, _) in self.totals.items():
+            if len(path) > 1 and path[:-1] in self_ns:
+                self_ns[path[:-1]] -= ns
+        return '\n'.join(f"{';'.join(path)} {max(ns, 0)//1000}" for path, ns in self_ns.items())
+
+    def write_folded(self, path):
+        with open(path, 'w') as f:
+            f.write(self.folded() + '\n')
@@ -0,0 +1,146 @@
+"""
+Multiprocess Sweep Executor
+
+Runs simulation cases that cannot be vectorized (closed-loop variants with
+clamping, noisy PLL runs) across a process pool. Every output channel is one
+multiprocessing.shared_memory array with a leading case dimension; workers
+write their waveforms straight into their row, only the case descriptions go
+to the workers and nothing but a case count comes back.
+
+    outputs = {'iL': ((num_steps,), 'f8'), 'vc': ((num_steps,), 'f8')}
+    results = run_cases(my_case, cases, outputs, seed=1234, progress=True)
+
+my_case(case, out, rng) must be a module-level function. 'out' maps every
+output name to the case's row view and 'rng' is a np.random.Generator that
+depends only on the seed and the case index, so results do not change with
+the number of workers or the chunk size.
+"""
+from multiprocessing import shared_memory
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+
+class SharedArray:
+    """NumPy array backed by a named shared memory block."""
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    def spec(self):
+        """Picklable description used by workers to attach to the block."""
+        return self.shm.name, self.shape, self.dtype.str
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shape, dtype, name=name)
+
+    def close(self):
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# per-worker state, set up once by the pool initializer
+_worker = {}
+
+
+def _init_worker(func, specs, seed):
+    _worker['func'] = func
+    _worker['buffers'] = {k: SharedArray.attach(spec) for k, spec in specs.items()}
+    _worker['seed'] = seed
+
+
+def case_rng(seed, index):
+    """Generator of case 'index', identical to np.random.SeedSequence(seed).spawn(...)[index]."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+
+def _run_chunk(task):
+    start, stop, chunk_cases = task
+    func = _worker['func']
+    buffers = _worker['buffers']
+    for k, i in enumerate(range(start, stop)):
+        out = {name: buf.array[i] for name, buf in buffers.items()}
+        func(chunk_cases[k], out, case_rng(_worker['seed'], i))
+    return stop - start
+
+
+def _print_progress(done, total, elapsed):
+    rate = done/elapsed if elapsed > 0 else 0.0
+    sys.stderr.write(f"\r{done}/{total} cases  {rate:.1f} cases/s")
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+def run_cases(func, cases, outputs, workers=None, chunksize=None, seed=None, progress=None,
+              start_method=None):
+    """
+    Run func(case, out, rng) for every case in a process pool
+
+    outputs: dict of name -> (per-case shape, dtype)
+    workers: number of processes, defaults to os.cpu_count(); 0 runs inline
+    chunksize: cases per task, defaults to about four tasks per worker
+    seed: root seed for the per-case generators (None draws fresh entropy)
+    progress: True to print to stderr, or a callable(done, total, elapsed)
+
+    Returns a dict of name -> array of shape (len(cases),) + per-case shape.
+    """
+    cases = list(cases)
+    n = len(cases)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, n // (4*max(workers, 1)))
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    if progress is True:
+        progress = _print_progress
+
+    buffers = {name: SharedArray((n,) + tuple(shape), dtype)
+               for name, (shape, dtype) in outputs.items()}
+    try:
+        specs = {name: buf.spec() for name, buf in buffers.items()}
+        tasks = [(s, min(s + chunksize, n), cases[s:s + chunksize]) for s in range(0, n, chunksize)]
+        t_start = time.perf_counter()
+        done = 0
+
+        if workers == 0:
+            # inline run, handy for debugging a case function
+            _init_worker(func, specs, seed)
+            try:
+                for task in tasks:
+                    done += _run_chunk(task)
+                    if progress:
+                        progress(done, n, time.perf_counter() - t_start)
+            finally:
+                for buf in _worker.pop('buffers').values():
+                    buf.close()
+                _worker.clear()
+        else:
+            ctx = mp.get_context(start_method)
+            with ctx.Pool(workers, initializer=_init_worker, initargs=(func, specs, seed)) as pool:
+                for count in pool.imap_unordered(_run_chunk, tasks):
+                    done += count
+                    if progress:
+                        progress(done, n, time.perf_counter() - t_start)
+
+        return {name: buf.array.copy() for name, buf in buffers.items()}
+    finally:
+        for buf in buffers.values():
+            buf.close()
@@ -0,0 +1,12 @@
+"""Phase locked loop models."""
+from .srf import (SrfPllResult, SrfPllState, SRF_RECORD, frequency_step_signal, simulate_srf_pll,
+                  simulate_srf_pll_batch, run_srf_pll)
+from .sogi import (SogiPllResult, SogiPllState, SOGI_RECORD, noisy_sine, simulate_sogi_pll,
+                   simulate_sogi_pll_batch, run_sogi_pll)
+from .grid import GridScenario, GridSignal
+from .three_phase import simulate_three_phase_srf_pll, run_unbalanced_srf_pll
+from .dsogi import (DsogiBlock, DsogiPll, DsogiPllResult, DSOGI_RECORD, simulate_dsogi_pll,
+                    run_dsogi_pll_fault)
+from .montecarlo import MonteCarloResult, monte_carlo_pll, pll_metrics
+from .stream import SogiPllBlock, SogiPllStream, SrfPllBlock, SrfPllStream
+from .fixed import simulate_srf_pll_fixed, simulate_sogi_pll_fixed
@@ -0,0 +1,227 @@
+"""
+Fixed-point PLLs
+The SRF-PLL and SOGI-PLL loops in the integer arithmetic of a fixed-point
+MCU, vectorized over channels with int64 arrays:
+
+    signals     Q data format (default Q15), 1.0 = full_scale; the default
+                full scale of 2 leaves one bit of headroom for per-unit inputs
+    angle       binary angle of angle_bits, 2**angle_bits is one turn so the
+                phase wraps for free
+    sin/cos     Q table of 2**lut_bits entries indexed by the top angle bits
+    PI gains    folded with dt and the angle scaling into integer gains of
+                coef_word bits, the vq integrator is acc_word bits wide
+                (default the data word plus 16 guard bits, at most 63)
+
+Returns a FixedResult holding the usual result dataclass in float units,
+overflow counts per stage and the error against the float64 loop.
+"""
+import math
+
+import numpy as np
+
+from ..fixed_point import FixedPoint, FixedResult, QFormat, Q15, quantization_noise, to_float
+from .srf import SrfPllResult, simulate_srf_pll_batch
+from .sogi import SogiPllResult, simulate_sogi_pll
+
+
+def _phase_noise(reference, value):
+    # error of a wrapped phase, measured on the circle
+    err = np.angle(np.exp(1j*(np.asarray(value) - np.asarray(reference))))
+    return {'rms': float(np.sqrt(np.mean(err**2))), 'max': float(np.max(np.abs(err)))}
+
+
+class _FixedLoop:
+    """Shared pieces of the fixed-point PLLs: sine table, angle and PI scaling."""
+
+    def __init__(self, fx, dt, kp, ki, w_ff, data, angle_bits, lut_bits, coef_word, acc_word,
+                 full_scale):
+        self.fx = fx
+        self.data = data
+        self.angle_bits = angle_bits
+        self.angle_mask = (1 << angle_bits) - 1
+        self.lut_shift = angle_bits - lut_bits
+        self.lut_mask = (1 << lut_bits) - 1
+        self.quarter = 1 << (lut_bits - 2)
+        if acc_word is None:
+            acc_word = min(data.word + 16, 63)
+        self.acc = QFormat(acc_word, data.frac)
+
+        # sin(1) does not fit Q0.x, the table saturates there like a firmware table would
+        self.sine = fx.quantize(np.sin(np.arange(1 << lut_bits) * (2*math.pi/(1 << lut_bits))),
+                                data, 'lut')
+
+        # angle increment per step (binary angle units) from vq and from the vq sum
+        self.per_rad = (1 << angle_bits)/(2*math.pi)
+        unit = full_scale * 2.0**-data.frac
+        gains = np.array([kp * dt * self.per_rad * unit, ki * dt * dt * self.per_rad * unit])
+        self.coef = QFormat.fit(gains.ravel(), coef_word)
+        self.kp = fx.quantize(kp * dt * self.per_rad * unit, self.coef, 'coefficients')
+        self.ki = fx.quantize(ki * dt * dt * self.per_rad * unit, self.coef, 'coefficients')
+        self.ff = np.rint(np.asarray(w_ff) * dt * self.per_rad).astype(np.int64)
+
+        # kp*vq + ki*integ is summed in int64
+        bound = int(np.max(np.abs(self.kp))) << (data.word - 1)
+        bound += int(np.max(np.abs(self.ki))) << (acc_word - 1)
+        if acc_word > 63 or bound >= 1 << 63:
+            raise ValueError(f"kp*vq + ki*integ does not fit in int64 with a {acc_word}-bit "
+                             f"integrator and {self.coef} gains, reduce acc_word or coef_word")
+        self.inc_fmt = QFormat(angle_bits + 1, 0)
+        self.dt = dt
+
+    def sincos(self, theta):
+        idx = theta >> self.lut_shift
+        return self.sine[idx], self.sine[(idx + self.quarter) & self.lut_mask]
+
+    def rotate(self, a, b, c, s, name):
+        # (a*c + b*s) back to the data format; |(c, s)| is one, so the sum stays
+        # below sqrt(2)*2**(2*word - 2), inside int64 for words up to 32 bits
+        return self.fx.requantize(a*c + b*s, 2*self.data.frac, self.data, name)
+
+    def pi(self, vq, integ):
+        fx = self.fx
+        integ = fx.limit(integ + vq, self.acc, 'integrator')
+        inc = fx.requantize(self.kp*vq + self.ki*integ, self.coef.frac, self.inc_fmt, 'frequency')
+        return integ, inc + self.ff
+
+    def to_rad(self, theta):
+        return theta * (2*math.pi/(1 << self.angle_bits))
+
+    def to_rad_per_s(self, inc):
+        return inc / (self.per_rad * self.dt)
+
+
+def simulate_srf_pll_fixed(va, vb, dt, kp=225, ki=10000, wnom=2*np.pi*50, feedforward=False,
+                           data=Q15, angle_bits=32, lut_bits=10, coef_word=24, acc_word=None,
+                           full_scale=2.0, rounding='nearest', saturate=True, reference=True):
+    """
+    Fixed-point SRF-PLL over (num_steps,) or (num_steps, N) alpha-beta arrays
+
+    Gains and wnom may be per-channel arrays as in simulate_srf_pll_batch.
+    reference=True also runs the float64 loop and reports the error of
+    theta, frequency and vq against it.
+    """
+    fx = FixedPoint(rounding, saturate)
+    va = np.asarray(va, dtype=float)
+    vb = np.asarray(vb, dtype=float)
+    if va.ndim == 1:
+        va = va[:, None]
+        vb = vb[:, None]
+    num_steps, n = va.shape
+
+    w_ff = np.broadcast_to(np.asarray(wnom, dtype=float), (n,)) if feedforward else np.zeros(n)
+    loop = _FixedLoop(fx, dt, np.broadcast_to(kp, (n,)), np.broadcast_to(ki, (n,)), w_ff, data,
+                      angle_bits, lut_bits, coef_word, acc_word, full_scale)
+    qa = fx.quantize(va/full_scale, data, 'input')
+    qb = fx.quantize(vb/full_scale, data, 'input')
+
+    theta = np.zeros(n, dtype=np.int64)
+    integ = np.zeros(n, dtype=np.int64)
+    raw = {name: np.empty((num_steps, n), dtype=np.int64) for name in ('theta', 'inc', 'vd', 'vq')}
+
+    for k in range(num_steps):
+        s, c = loop.sincos(theta)
+        a_k = qa[k]
+        b_k = qb[k]
+
+        # Park transformation alpha-beta to d-q
+        vd = loop.rotate(a_k, b_k, c, s, 'vd')
+        vq = loop.rotate(b_k, -a_k, c, s, 'vq')
+
+        integ, inc = loop.pi(vq, integ)
+        theta = (theta + inc) & loop.angle_mask
+
+        raw['theta'][k] = theta
+        raw['inc'][k] = inc
+        raw['vd'][k] = vd
+        raw['vq'][k] = vq
+
+    w_pll = loop.to_rad_per_s(raw['inc'])
+    vq_f = to_float(raw['vq'], data) * full_scale
+    res = SrfPllResult(t=None, va=va, vb=vb, theta_pll=loop.to_rad(raw['theta']), w_pll=w_pll,
+                       f_pll=w_pll/(2*np.pi), vd=to_float(raw['vd'], data) * full_scale, vq=vq_f,
+                       error=vq_f, pi_output=w_pll - w_ff)
+
+    noise = {}
+    if reference:
+        ref = simulate_srf_pll_batch(va, vb, dt, kp, ki, wnom, feedforward,
+                                     record=('theta_pll', 'f_pll', 'vq'))
+        noise = {'theta': _phase_noise(ref.theta_pll, res.theta_pll),
+                 'f': quantization_noise(ref.f_pll, res.f_pll),
+                 'vq': quantization_noise(ref.vq, res.vq)}
+    return FixedResult(output=res, raw=raw, overflows=dict(fx.overflows), noise=noise,
+                       formats={'data': data, 'gains': loop.coef, 'integrator': loop.acc})
+
+
+def simulate_sogi_pll_fixed(v_in, dt, k=1.0, w_nom=2*np.pi*50, kp=20, ki=5, data=Q15,
+                            angle_bits=32, lut_bits=10, coef_word=24, acc_word=None, full_scale=2.0,
+                            rounding='nearest', saturate=True, reference=True):
+    """
+    Fixed-point SOGI-PLL over (num_steps,) or (num_steps, N) input arrays
+
+    The SOGI states x1, x2 are kept in the data format, their Euler updates
+    use gains k*w_nom*dt and w_nom*dt quantized to coef_word bits.
+    reference=True also runs the float64 loop for every channel.
+    """
+    fx = FixedPoint(rounding, saturate)
+    v_in = np.asarray(v_in, dtype=float)
+    squeeze = v_in.ndim == 1
+    if squeeze:
+        v_in = v_in[:, None]
+    num_steps, n = v_in.shape
+
+    loop = _FixedLoop(fx, dt, kp, ki, np.full(n, w_nom), data, angle_bits, lut_bits, coef_word,
+                      acc_word, full_scale)
+    sogi = QFormat.fit([k*w_nom*dt, w_nom*dt], coef_word)
+    c1 = int(fx.quantize(k*w_nom*dt, sogi, 'coefficients'))
+    c2 = int(fx.quantize(w_nom*dt, sogi, 'coefficients'))
+    x = fx.quantize(v_in/full_scale, data, 'input')
+
+    x1 = np.zeros(n, dtype=np.int64)
+    x2 = np.zeros(n, dtype=np.int64)
+    theta = np.zeros(n, dtype=np.int64)
+    integ = np.zeros(n, dtype=np.int64)
+    raw = {name: np.empty((num_steps, n), dtype=np.int64)
+           for name in ('theta', 'inc', 'vq', 'v_alpha', 'v_beta')}
+
+    for i in range(num_steps):
+        # ===== SOGI =====
+        e = fx.limit(x[i] - x1, data, 'sogi_error')
+        dx1 = fx.requantize(c1*e - c2*x2, sogi.frac + data.frac, data, 'sogi')
+        dx2 = fx.requantize(c2*x1, sogi.frac + data.frac, data, 'sogi')
+        x1 = fx.limit(x1 + dx1, data, 'v_alpha')
+        x2 = fx.limit(x2 + dx2, data, 'v_beta')
+
+        # ===== Park Transform =====
+        s, c = loop.sincos(theta)
+        vq = loop.rotate(x2, -x1, c, s, 'vq')
+
+        # ===== PLL PI Controller =====
+        integ, inc = loop.pi(vq, integ)
+        theta = (theta + inc) & loop.angle_mask
+
+        raw['theta'][i] = theta
+        raw['inc'][i] = inc
+        raw['vq'][i] = vq
+        raw['v_alpha'][i] = x1
+        raw['v_beta'][i] = x2
+
+    out = {'theta': loop.to_rad(raw['theta']),
+           'f': loop.to_rad_per_s(raw['inc'])/(2*np.pi),
+           'vq': to_float(raw['vq'], data) * full_scale,
+           'v_alpha': to_float(raw['v_alpha'], data) * full_scale,
+           'v_beta': to_float(raw['v_beta'], data) * full_scale}
+
+    noise = {}
+    if reference:
+        refs = [simulate_sogi_pll(v_in[:, j], dt, k, w_nom, kp, ki) for j in range(n)]
+        ref = {name: np.stack([getattr(r, name) for r in refs], axis=1) for name in out}
+        noise = {'theta': _phase_noise(ref['theta'], out['theta'])}
+        noise.update({name: quantization_noise(ref[name], out[name])
+                      for name in ('f', 'vq', 'v_alpha', 'v_beta')})
+
+    if squeeze:
+        out = {name: a[:, 0] for name, a in out.items()}
+    res = SogiPllResult(t=None, v_in=v_in[:, 0] if squeeze else v_in, **out)
+    return FixedResult(output=res, raw=raw, overflows=dict(fx.overflows), noise=noise,
+                       formats={'data': data, 'sogi': sogi, 'gains': loop.coef,
+                                'integrator': loop.acc})
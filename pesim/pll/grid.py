@@ -0,0 +1,214 @@
+"""
+Grid Event Signals
+Phase-continuous three-phase test signals for the PLLs, built in one
+vectorized pass. A GridScenario is a list of events on top of a balanced
+fundamental; generate() turns it into alpha-beta and abc voltages together
+with the ground-truth angle, frequency and amplitude:
+
+    scenario = (GridScenario(f0=50.0)
+                .frequency_step(0.5, +50.0)             # 50 -> 100 Hz at 0.5 s
+                .frequency_ramp(0.7, 0.9, -10.0)        # -10 Hz over 0.2 s
+                .phase_jump(0.3, np.pi/6)
+                .sag(0.6, 0.65, 0.4)                    # 40% dip
+                .unbalance(0.05)                        # 5% negative sequence
+                .phase_unbalance((1.0, 0.9, 0.95))      # per-phase feeder unbalance
+                .fault(0.8, 0.9, (0.3, 1.0, 1.0))       # phase-a-to-ground fault
+                .harmonic(5, 0.03).harmonic(7, 0.02))
+    sig = scenario.generate(1.0, 1e-4)
+    simulate_srf_pll(sig.va, sig.vb, 1e-4)              # three-phase PLLs
+    simulate_sogi_pll(sig.v, 1e-4)                      # single-phase PLLs, phase a
+
+The phase is integrated with a cumulative sum of the mean frequency of every
+sample interval, computed exactly for steps and ramps falling anywhere
+inside it, so the angle is continuous and has no drift from the event
+timing. The phase voltages are built first and alpha-beta is their Clarke
+transform (pesim.transforms), following the scripts' convention
+va = V cos(theta), vb = V sin(theta) for a balanced grid.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..transforms import SHIFTS, clarke, symmetrical_components
+
+
+@dataclass
+class GridSignal:
+    """Test signal and its ground truth, one entry per time step."""
+    t: np.ndarray
+    va: np.ndarray              # alpha
+    vb: np.ndarray              # beta
+    vabc: np.ndarray            # (num_steps, 3) phase voltages
+    theta: np.ndarray           # positive-sequence fundamental angle, wrapped to [0, 2*pi)
+    f: np.ndarray               # instantaneous fundamental frequency (Hz)
+    amplitude: np.ndarray       # positive-sequence fundamental amplitude
+    amplitude_neg: np.ndarray = None    # negative-sequence fundamental amplitude
+
+    @property
+    def v(self):
+        """Phase a voltage, the input of the single-phase PLLs."""
+        return self.vabc[:, 0]
+
+
+def _ramp_integral(tau, duration):
+    # integral over [0, tau] of a unit ramp rising over 'duration' (a unit step if 0)
+    tau = np.maximum(tau, 0.0)
+    if duration <= 0:
+        return tau
+    inside = np.minimum(tau, duration)
+    return inside*inside/(2*duration) + (tau - inside)
+
+
+def _sequence(order):
+    # natural sequence of a harmonic in a balanced system: +1, -1 or 0
+    return (0, 1, -1)[order % 3]
+
+
+class GridScenario:
+    """Fundamental f0, amplitude v_amp and starting angle theta0 plus a list of grid events."""
+
+    def __init__(self, f0=50.0, v_amp=1.0, theta0=0.0):
+        self.f0 = f0
+        self.v_amp = v_amp
+        self.theta0 = theta0
+        self.frequency_events = []      # (t0, duration, df)
+        self.phase_jumps = []           # (t0, dphi)
+        self.sags = []                  # (t0, t1, depth)
+        self.negative = (0.0, 0.0)      # (ratio, phase)
+        self.phases = (np.ones(3), np.zeros(3))     # per-phase fundamental gain and angle offset
+        self.faults = []                # (t0, t1, gains, angle offsets)
+        self.harmonics = []             # (order, rel_mag, phase, sequence)
+
+    def frequency_step(self, t0, df):
+        """Frequency changes by df (Hz) at t0."""
+        self.frequency_events.append((t0, 0.0, df))
+        return self
+
+    def frequency_ramp(self, t0, t1, df):
+        """Frequency changes linearly by df (Hz) between t0 and t1."""
+        self.frequency_events.append((t0, t1 - t0, df))
+        return self
+
+    def phase_jump(self, t0, dphi):
+        """Angle jumps by dphi (rad) at t0."""
+        self.phase_jumps.append((t0, dphi))
+        return self
+
+    def sag(self, t0, t1, depth):
+        """All voltages drop by the fraction 'depth' between t0 and t1."""
+        self.sags.append((t0, t1, depth))
+        return self
+
+    def unbalance(self, ratio, phase=0.0):
+        """Negative sequence of ratio*v_amp, phase (rad) against the positive sequence."""
+        self.negative = (ratio, phase)
+        return self
+
+    def phase_unbalance(self, amplitudes=(1.0, 1.0, 1.0), angles=(0.0, 0.0, 0.0)):
+        """
+        Per-phase fundamental gains and angle offsets (rad) of phases a, b, c
+
+        The ground truth follows the resulting positive sequence, whose angle
+        and amplitude differ from the nominal ones when the phases differ.
+        """
+        self.phases = (np.asarray(amplitudes, dtype=float), np.asarray(angles, dtype=float))
+        return self
+
+    def fault(self, t0, t1, amplitudes, angles=(0.0, 0.0, 0.0)):
+        """
+        Per-phase gains and angle offsets replaced between t0 and t1
+
+        An asymmetric fault seen from the measurement point, e.g. (0.3, 1, 1)
+        for a phase-a-to-ground fault; the ground truth follows the positive
+        sequence of the faulted phases.
+        """
+        self.faults.append((t0, t1, np.asarray(amplitudes, dtype=float),
+                            np.asarray(angles, dtype=float)))
+        return self
+
+    def _sequences(self, gain, offset):
+        ratio, phase = self.negative
+        pos, neg, zero = symmetrical_components(gain*np.exp(1j*(SHIFTS + offset)))
+        # the explicit negative sequence enters with its phase against the positive one
+        return pos, neg + ratio*np.exp(-1j*phase), zero
+
+    def sequences(self):
+        """(positive, negative, zero) fundamental phasors per unit of v_amp at theta = 0, no fault."""
+        return self._sequences(*self.phases)
+
+    def harmonic(self, order, rel_mag, phase=0.0, sequence=None):
+        """
+        order-th harmonic of rel_mag*v_amp following the fundamental angle
+
+        sequence +1, -1 or 0 (zero sequence, phase voltages only), default
+        the natural one of the order: 5th negative, 7th positive, 3rd zero.
+        """
+        self.harmonics.append((order, rel_mag, phase, _sequence(order) if sequence is None else sequence))
+        return self
+
+    def frequency(self, t):
+        """Instantaneous fundamental frequency (Hz) at t."""
+        f = np.full(np.shape(t), float(self.f0))
+        for t0, duration, df in self.frequency_events:
+            if duration > 0:
+                f += df*np.clip((t - t0)/duration, 0.0, 1.0)
+            else:
+                f += np.where(t >= t0, df, 0.0)
+        return f
+
+    def angle(self, t, dt):
+        """Unwrapped fundamental angle on the uniform grid t, step dt."""
+        t = np.asarray(t, dtype=float)
+        # mean frequency deviation of every interval [t_k, t_k + dt], then integrate
+        df_mean = np.zeros(t.shape)
+        offset = 0.0
+        for t0, duration, df in self.frequency_events:
+            g = df*_ramp_integral(t - t0, duration)
+            df_mean += df*_ramp_integral(t + dt - t0, duration) - g
+            offset += g[0] if t.size else 0.0
+        dev = np.empty(t.shape)
+        if t.size:
+            dev[0] = offset
+            np.cumsum(df_mean[:-1], out=dev[1:])
+            dev[1:] += offset
+
+        theta = 2*np.pi*(self.f0*t + dev) + self.theta0
+        for t0, dphi in self.phase_jumps:
+            theta += np.where(t >= t0, dphi, 0.0)
+        return theta
+
+    def amplitude(self, t):
+        """Positive-sequence fundamental amplitude at t."""
+        amp = np.full(np.shape(t), float(self.v_amp))
+        for t0, t1, depth in self.sags:
+            amp *= np.where((t >= t0) & (t < t1), 1.0 - depth, 1.0)
+        return amp
+
+    def generate(self, t_sim, dt):
+        """GridSignal on t = np.arange(0, t_sim, dt), as the PLL scripts."""
+        t = np.arange(0, t_sim, dt)
+        theta = self.angle(t, dt)
+        amp = self.amplitude(t)
+
+        # phase voltages: fundamental of each phase, explicit negative sequence, harmonics
+        gain, offset = self.phases
+        if self.faults:
+            gain = np.tile(gain, (t.size, 1))
+            offset = np.tile(offset, (t.size, 1))
+            for t0, t1, fault_gain, fault_offset in self.faults:
+                during = (t >= t0) & (t < t1)
+                gain[during] = fault_gain
+                offset[during] = fault_offset
+        ratio, phase = self.negative
+        th = theta[:, None]
+        vabc = gain*np.cos(th + (SHIFTS + offset))
+        if ratio:
+            vabc += ratio*np.cos(th - phase - SHIFTS)
+        for order, rel_mag, phase, sequence in self.harmonics:
+            vabc += rel_mag*np.cos(order*th + phase + sequence*SHIFTS)
+        vabc *= amp[:, None]
+
+        va, vb = clarke(vabc)
+        pos, neg, _ = self._sequences(gain, offset)
+        return GridSignal(t=t, va=va, vb=vb, vabc=vabc, theta=np.mod(theta + np.angle(pos), 2*np.pi),
+                          f=self.frequency(t), amplitude=amp*np.abs(pos), amplitude_neg=amp*np.abs(neg))
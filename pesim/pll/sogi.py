@@ -0,0 +1,260 @@
+"""
+Second Order Generalized Integrator - Phase Locked Loop
+Model behind sogi-pll/sogi-pll-v1.py: the SOGI quadrature signal generator
+centered at w_nom followed by a Park transform and PI loop filter.
+
+simulate_sogi_pll_batch runs the same loop over N channels at once, the
+state is a vector and every time step is one set of array operations.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..trig import get_backend
+
+
+@dataclass
+class SogiPllResult:
+    """SOGI-PLL run, every array holds one entry per sample."""
+    t: np.ndarray
+    v_in: np.ndarray
+    theta: np.ndarray
+    f: np.ndarray
+    vq: np.ndarray
+    v_alpha: np.ndarray
+    v_beta: np.ndarray
+
+
+@dataclass
+class SogiPllState:
+    """Per-channel loop state, carried across calls of simulate_sogi_pll_batch."""
+    x1: np.ndarray
+    x2: np.ndarray
+    vq_int: np.ndarray
+    theta_est: np.ndarray
+
+    @classmethod
+    def zeros(cls, num_channels):
+        return cls(x1=np.zeros(num_channels), x2=np.zeros(num_channels),
+                   vq_int=np.zeros(num_channels), theta_est=np.zeros(num_channels))
+
+
+SOGI_RECORD = ('theta', 'f', 'vq', 'v_alpha', 'v_beta')
+
+
+def noisy_sine(t, f_in=50.0, harmonic3=0.02, noise=0.05, rng=None):
+    """Unit sine with a 3rd harmonic and white noise, rng is a np.random.Generator or seed."""
+    rng = np.random.default_rng(rng)
+    w_in = 2*np.pi*f_in
+    return np.sin(w_in*t) \
+        + harmonic3 * np.sin(3*w_in*t) \
+        + noise * rng.normal(0, 1, len(t))
+
+
+def simulate_sogi_pll(v_in, dt, k=1.0, w_nom=2*np.pi*50, kp=20, ki=5, trig=None, instrument=None):
+    """
+    Run the SOGI-PLL over an input array, returns a SogiPllResult without t
+
+    trig: optional Park transform sin/cos backend (see pesim.trig), default np.cos/np.sin.
+    instrument: optional pesim.instrument.Instrument, times the SOGI (plant),
+    trig, transform, controller and logging stages of every step.
+    """
+    sincos = get_backend(trig).sincos if trig is not None else None
+    if instrument is not None:
+        with instrument.span('simulate_sogi_pll'):
+            return _sogi_pll(v_in, dt, k, w_nom, kp, ki, sincos, instrument)
+    return _sogi_pll(v_in, dt, k, w_nom, kp, ki, sincos, None)
+
+
+def _sogi_pll(v_in, dt, k, w_nom, kp, ki, sincos, instrument):
+    # stage timers behind one hoisted flag, a few bool checks per step when disabled
+    num_steps = len(v_in)
+    timed = instrument is not None
+    if timed:
+        clock = instrument.clock
+        t_plant = t_trig = t_transform = t_controller = t_logging = 0
+    wraps = 0
+
+    x1 = 0.0     # ~ v_alpha - SOGI output in-phase component
+    x2 = 0.0     # ~ v-beta - SOGI output quadrature component
+
+    theta_est = 0.0     # initializing estimated phase angle
+    vq_int = 0.0        # vq integrator
+
+    theta_log = np.empty(num_steps)
+    f_log = np.empty(num_steps)
+    vq_log = np.empty(num_steps)
+    v_alpha_log = np.empty(num_steps)
+    v_beta_log = np.empty(num_steps)
+
+    for n in range(num_steps):
+        if timed:
+            c0 = clock()
+        vin = v_in[n]
+
+        # ===== SOGI =====
+        e = vin - x1
+        dx1 = w_nom * ((k*e) - x2)
+        dx2 = w_nom * x1
+        # SOGI behaves like a band-pass filter centered at w_nom
+
+        x1 += dx1 * dt
+        x2 += dx2 * dt
+
+        v_alpha = x1
+        v_beta = x2
+        if timed:
+            c1 = clock()
+
+        # ===== Park Transform =====
+        # in MCU implementation we use a lookup table here, see pesim.trig
+        if sincos is None:
+            cos_theta = np.cos(theta_est)
+            sin_theta = np.sin(theta_est)
+        else:
+            sin_theta, cos_theta = sincos(theta_est)
+        if timed:
+            c2 = clock()
+
+        vq = v_alpha*(-sin_theta) + v_beta*cos_theta
+        if timed:
+            c3 = clock()
+
+        # ===== PLL PI Controller =====
+        vq_int += vq * dt
+        w_est = (kp*vq) + (ki*vq_int) + w_nom
+
+        theta_est += w_est * dt
+        if theta_est > 2*np.pi:
+            theta_est -= 2*np.pi
+            wraps += 1
+        if timed:
+            c4 = clock()
+
+        theta_log[n] = theta_est
+        f_log[n] = w_est/(2*np.pi)
+        vq_log[n] = vq
+        v_alpha_log[n] = v_alpha
+        v_beta_log[n] = v_beta
+
+        if timed:
+            c5 = clock()
+            t_plant += c1 - c0
+            t_trig += c2 - c1
+            t_transform += c3 - c2
+            t_controller += c4 - c3
+            t_logging += c5 - c4
+
+    if timed:
+        instrument.add('plant', t_plant, num_steps)
+        instrument.add('trig', t_trig, num_steps)
+        instrument.add('transform', t_transform, num_steps)
+        instrument.add('controller', t_controller, num_steps)
+        instrument.add('logging', t_logging, num_steps)
+        instrument.count('controller_updates', num_steps)
+        instrument.count('phase_wraps', wraps)
+
+    return SogiPllResult(t=None, v_in=v_in, theta=theta_log, f=f_log, vq=vq_log,
+                         v_alpha=v_alpha_log, v_beta=v_beta_log)
+
+
+def simulate_sogi_pll_batch(v_in, dt, k=1.0, w_nom=2*np.pi*50, kp=20, ki=5, state=None,
+                            record=SOGI_RECORD, trig=None):
+    """
+    Run N independent SOGI-PLLs over a (num_steps, N) input array
+
+    k, w_nom, kp and ki are scalars or per-channel arrays of length N. The
+    arithmetic per channel is the same as simulate_sogi_pll. state: optional
+    SogiPllState, updated in place so a long record can be fed in chunks.
+    record: names of the histories to keep, the others are left None.
+    trig: optional sin/cos backend (see pesim.trig). Returns a SogiPllResult
+    of (num_steps, N) arrays without t.
+    """
+    v_in = np.asarray(v_in, dtype=float)
+    if v_in.ndim == 1:
+        v_in = v_in[:, None]
+    num_steps, n = v_in.shape
+
+    k = np.broadcast_to(np.asarray(k, dtype=float), (n,))
+    w_nom = np.broadcast_to(np.asarray(w_nom, dtype=float), (n,))
+    kp = np.broadcast_to(np.asarray(kp, dtype=float), (n,))
+    ki = np.broadcast_to(np.asarray(ki, dtype=float), (n,))
+
+    sincos = get_backend(trig).sincos if trig is not None else None
+    if state is None:
+        state = SogiPllState.zeros(n)
+    x1, x2, vq_int, theta_est = state.x1, state.x2, state.vq_int, state.theta_est
+
+    hist = {name: np.empty((num_steps, n)) if name in record else None for name in SOGI_RECORD}
+
+    # per-step work arrays, no allocation inside the loop
+    e = np.empty(n)
+    dx1 = np.empty(n)
+    dx2 = np.empty(n)
+    cos_theta = np.empty(n)
+    sin_theta = np.empty(n)
+    vq = np.empty(n)
+    w_est = np.empty(n)
+    tmp = np.empty(n)
+    wrap = np.empty(n, dtype=bool)
+    two_pi = 2*np.pi
+
+    for i in range(num_steps):
+        # ===== SOGI =====
+        np.subtract(v_in[i], x1, out=e)
+        np.multiply(k, e, out=dx1)
+        dx1 -= x2
+        dx1 *= w_nom
+        np.multiply(w_nom, x1, out=dx2)
+        np.multiply(dx1, dt, out=tmp)
+        x1 += tmp
+        np.multiply(dx2, dt, out=tmp)
+        x2 += tmp
+
+        # ===== Park Transform =====
+        if sincos is None:
+            np.cos(theta_est, out=cos_theta)
+            np.sin(theta_est, out=sin_theta)
+        else:
+            sincos(theta_est, out=(sin_theta, cos_theta))
+        np.negative(sin_theta, out=tmp)
+        np.multiply(x1, tmp, out=vq)
+        np.multiply(x2, cos_theta, out=tmp)
+        vq += tmp
+
+        # ===== PLL PI Controller =====
+        np.multiply(vq, dt, out=tmp)
+        vq_int += tmp
+        np.multiply(kp, vq, out=w_est)
+        np.multiply(ki, vq_int, out=tmp)
+        w_est += tmp
+        w_est += w_nom
+
+        np.multiply(w_est, dt, out=tmp)
+        theta_est += tmp
+        np.greater(theta_est, two_pi, out=wrap)
+        np.subtract(theta_est, two_pi, out=theta_est, where=wrap)
+
+        if hist['theta'] is not None:
+            hist['theta'][i] = theta_est
+        if hist['f'] is not None:
+            np.divide(w_est, two_pi, out=hist['f'][i])
+        if hist['vq'] is not None:
+            hist['vq'][i] = vq
+        if hist['v_alpha'] is not None:
+            hist['v_alpha'][i] = x1
+        if hist['v_beta'] is not None:
+            hist['v_beta'][i] = x2
+
+    return SogiPllResult(t=None, v_in=v_in, **hist)
+
+
+def run_sogi_pll(fs=10000, t_sim=0.6, f_in=50.0, k=1.0, f_nom=50.0, kp=20, ki=5, seed=None,
+                 trig=None, instrument=None):
+    """The sogi-pll-v1.py scenario: noisy 50 Hz input with a 3rd harmonic."""
+    dt = 1/fs
+    t = np.arange(0, t_sim, dt)
+    v_in = noisy_sine(t, f_in, rng=seed)
+    res = simulate_sogi_pll(v_in, dt, k, 2*np.pi*f_nom, kp, ki, trig, instrument)
+    res.t = t
+    return res
@@ -0,0 +1,287 @@
+"""
+Synchronous Reference Frame - Phase Locked Loop
+Model behind srf-pll/srf-pll-v2.py: phase-continuous frequency step test
+signal and the SRF-PLL loop (Park transform, PI controller, phase integrator).
+
+simulate_srf_pll_batch runs the same loop over N channels at once, the
+state is a vector and every time step is one set of array operations.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from ..trig import get_backend
+
+
+@dataclass
+class SrfPllResult:
+    """SRF-PLL run, every array holds one entry per time step."""
+    t: np.ndarray
+    va: np.ndarray
+    vb: np.ndarray
+    theta_pll: np.ndarray
+    w_pll: np.ndarray
+    f_pll: np.ndarray
+    vd: np.ndarray
+    vq: np.ndarray
+    error: np.ndarray
+    pi_output: np.ndarray
+    theta_actual: np.ndarray = None
+
+
+@dataclass
+class SrfPllState:
+    """
+    Per-channel loop state, carried across calls of simulate_srf_pll_batch
+
+    theta_pll and integral_error are the loop state. w_pll is output only:
+    the frequency estimate (rad/s) after the last step, written by every
+    call and never read, the loop recomputes it from the PI on resume.
+    """
+    theta_pll: np.ndarray
+    integral_error: np.ndarray
+    w_pll: np.ndarray = field(default=None)     # output only
+
+    @classmethod
+    def zeros(cls, num_channels):
+        return cls(theta_pll=np.zeros(num_channels), integral_error=np.zeros(num_channels),
+                   w_pll=np.zeros(num_channels))
+
+
+SRF_RECORD = ('theta_pll', 'w_pll', 'f_pll', 'vd', 'vq', 'error', 'pi_output')
+
+
+def frequency_step_signal(t, f1=50.0, f2=100.0, step_instant=0.5, v_amp=1.0):
+    """
+    Phase-continuous alpha-beta signal with a frequency step at step_instant
+
+    Returns (va, vb, theta_actual), theta_actual wrapped like the script does.
+    GridScenario (grid.py) builds this and richer events with full ground truth.
+    """
+    t = np.asarray(t)
+    phase_at_step = 2 * np.pi * f1 * step_instant
+    angle = np.where(t < step_instant, 2 * np.pi * f1 * t,
+                     phase_at_step + 2 * np.pi * f2 * (t - step_instant))
+
+    va = v_amp * np.cos(angle)          # alpha component -- cosine b/c aligned w/ x-axis
+    vb = v_amp * np.sin(angle)          # beta component (true quadrature)
+
+    # the script subtracts one turn, it does not wrap fully
+    theta_actual = np.where(angle > 2 * np.pi, angle - 2 * np.pi, angle)
+
+    return va, vb, theta_actual
+
+
+def simulate_srf_pll(va, vb, dt, kp=225, ki=10000, wnom=2*np.pi*50, feedforward=False, trig=None,
+                     instrument=None):
+    """
+    Run the SRF-PLL over alpha-beta input arrays
+
+    feedforward adds wnom to the PI output (the script runs without it).
+    trig: optional Park transform sin/cos backend (see pesim.trig), default np.cos/np.sin.
+    instrument: optional pesim.instrument.Instrument, times the trig, transform,
+    controller and logging stages of every step.
+    Returns an SrfPllResult without t and theta_actual filled in.
+    """
+    sincos = get_backend(trig).sincos if trig is not None else None
+    if instrument is not None:
+        with instrument.span('simulate_srf_pll'):
+            return _srf_pll(va, vb, dt, kp, ki, wnom, feedforward, sincos, instrument)
+    return _srf_pll(va, vb, dt, kp, ki, wnom, feedforward, sincos, None)
+
+
+def _srf_pll(va, vb, dt, kp, ki, wnom, feedforward, sincos, instrument):
+    # stage timers behind one hoisted flag, a few bool checks per step when disabled
+    num_steps = len(va)
+    timed = instrument is not None
+    if timed:
+        clock = instrument.clock
+        t_trig = t_transform = t_controller = t_logging = 0
+    wraps = 0
+
+    theta_pll = 0                 # phase estimate initialization
+    integral_error = 0
+
+    theta_pll_hist = np.zeros(num_steps)
+    w_pll_hist = np.zeros(num_steps)
+    f_pll_hist = np.zeros(num_steps)
+    vd_hist = np.zeros(num_steps)
+    vq_hist = np.zeros(num_steps)
+    error_hist = np.zeros(num_steps)
+    pi_output_hist = np.zeros(num_steps)
+
+    for k in range(num_steps):
+        if timed:
+            c0 = clock()
+        va_k = va[k]
+        vb_k = vb[k]
+
+        # Park transformation alpha-beta to d-q
+        if sincos is None:
+            cos_theta = np.cos(theta_pll)
+            sin_theta = np.sin(theta_pll)
+        else:
+            sin_theta, cos_theta = sincos(theta_pll)
+        if timed:
+            c1 = clock()
+
+        vd = (va_k * cos_theta) + (vb_k * sin_theta)
+        vq = (-va_k * sin_theta) + (vb_k * cos_theta)
+        if timed:
+            c2 = clock()
+
+        # vq is the error which we will drive to zero
+        error = vq
+        integral_error = integral_error + (error * dt)
+        pi_output = (kp * error) + (ki * integral_error)
+
+        # frequency estimate, optionally with wnom as the feed-forward term
+        w_pll = (wnom + pi_output) if feedforward else pi_output
+
+        # phase estimate, integrating w_pll using forward Euler method
+        theta_pll = theta_pll + (w_pll * dt)
+
+        # Wrap the phase [0, 2*pi]
+        if theta_pll > (2 * np.pi):
+            theta_pll = theta_pll - (2 * np.pi)
+            wraps += 1
+        if timed:
+            c3 = clock()
+
+        theta_pll_hist[k] = theta_pll
+        w_pll_hist[k] = w_pll
+        f_pll_hist[k] = w_pll / (2 * np.pi)
+        vd_hist[k] = vd
+        vq_hist[k] = vq
+        error_hist[k] = error
+        pi_output_hist[k] = pi_output
+
+        if timed:
+            c4 = clock()
+            t_trig += c1 - c0
+            t_transform += c2 - c1
+            t_controller += c3 - c2
+            t_logging += c4 - c3
+
+    if timed:
+        instrument.add('trig', t_trig, num_steps)
+        instrument.add('transform', t_transform, num_steps)
+        instrument.add('controller', t_controller, num_steps)
+        instrument.add('logging', t_logging, num_steps)
+        instrument.count('controller_updates', num_steps)
+        instrument.count('phase_wraps', wraps)
+
+    return SrfPllResult(t=None, va=va, vb=vb, theta_pll=theta_pll_hist, w_pll=w_pll_hist,
+                        f_pll=f_pll_hist, vd=vd_hist, vq=vq_hist, error=error_hist,
+                        pi_output=pi_output_hist)
+
+
+def simulate_srf_pll_batch(va, vb, dt, kp=225, ki=10000, wnom=2*np.pi*50, feedforward=False,
+                           state=None, record=SRF_RECORD, trig=None):
+    """
+    Run N independent SRF-PLLs over (num_steps, N) alpha-beta arrays
+
+    kp, ki and wnom are scalars or per-channel arrays of length N. The
+    arithmetic per channel is the same as simulate_srf_pll. state: optional
+    SrfPllState, updated in place so a long record can be fed in chunks.
+    record: names of the histories to keep, the others are left None
+    (each costs num_steps*N floats). trig: optional sin/cos backend
+    (see pesim.trig). Returns an SrfPllResult of
+    (num_steps, N) arrays without t and theta_actual filled in.
+    """
+    va = np.asarray(va, dtype=float)
+    vb = np.asarray(vb, dtype=float)
+    if va.ndim == 1:
+        va = va[:, None]
+        vb = vb[:, None]
+    num_steps, n = va.shape
+
+    kp = np.broadcast_to(np.asarray(kp, dtype=float), (n,))
+    ki = np.broadcast_to(np.asarray(ki, dtype=float), (n,))
+    wnom = np.broadcast_to(np.asarray(wnom, dtype=float), (n,))
+
+    sincos = get_backend(trig).sincos if trig is not None else None
+    if state is None:
+        state = SrfPllState.zeros(n)
+    theta_pll = state.theta_pll
+    integral_error = state.integral_error
+
+    hist = {name: np.empty((num_steps, n)) if name in record else None for name in SRF_RECORD}
+
+    # per-step work arrays, no allocation inside the loop
+    cos_theta = np.empty(n)
+    sin_theta = np.empty(n)
+    vd = np.empty(n)
+    vq = np.empty(n)
+    tmp = np.empty(n)
+    w_ff = np.empty(n)
+    pi_output = np.empty(n)
+    wrap = np.empty(n, dtype=bool)
+    two_pi = 2 * np.pi
+
+    for k in range(num_steps):
+        va_k = va[k]
+        vb_k = vb[k]
+
+        # Park transformation alpha-beta to d-q
+        if sincos is None:
+            np.cos(theta_pll, out=cos_theta)
+            np.sin(theta_pll, out=sin_theta)
+        else:
+            sincos(theta_pll, out=(sin_theta, cos_theta))
+
+        np.multiply(va_k, cos_theta, out=vd)
+        np.multiply(vb_k, sin_theta, out=tmp)
+        vd += tmp
+        # (-va*sin) + (vb*cos), same rounding as the scalar loop
+        np.multiply(vb_k, cos_theta, out=vq)
+        np.multiply(va_k, sin_theta, out=tmp)
+        vq -= tmp
+
+        # PI on vq, integrated with forward Euler
+        np.multiply(vq, dt, out=tmp)
+        integral_error += tmp
+        np.multiply(kp, vq, out=pi_output)
+        np.multiply(ki, integral_error, out=tmp)
+        pi_output += tmp
+
+        w_pll = pi_output
+        if feedforward:
+            w_pll = np.add(wnom, pi_output, out=w_ff)
+
+        # phase estimate, wrapped once per step like the scalar loop
+        np.multiply(w_pll, dt, out=tmp)
+        theta_pll += tmp
+        np.greater(theta_pll, two_pi, out=wrap)
+        np.subtract(theta_pll, two_pi, out=theta_pll, where=wrap)
+
+        if hist['theta_pll'] is not None:
+            hist['theta_pll'][k] = theta_pll
+        if hist['w_pll'] is not None:
+            hist['w_pll'][k] = w_pll
+        if hist['f_pll'] is not None:
+            np.divide(w_pll, two_pi, out=hist['f_pll'][k])
+        if hist['vd'] is not None:
+            hist['vd'][k] = vd
+        if hist['vq'] is not None:
+            hist['vq'][k] = vq
+        if hist['error'] is not None:
+            hist['error'][k] = vq
+        if hist['pi_output'] is not None:
+            hist['pi_output'][k] = pi_output
+
+    if num_steps:
+        state.w_pll = np.array(w_pll)
+    return SrfPllResult(t=None, va=va, vb=vb, **hist)
+
+
+def run_srf_pll(t_sim=1.0, dt=1e-4, v_amp=1.0, f1=50.0, f2=100.0, step_instant=0.5,
+                kp=225, ki=10000, f_grid=50.0, trig=None, instrument=None):
+    """The srf-pll-v2.py scenario: 50 Hz -> 100 Hz step tracked by the SRF-PLL."""
+    t = np.arange(0, t_sim, dt)
+    va, vb, theta_actual = frequency_step_signal(t, f1, f2, step_instant, v_amp)
+    res = simulate_srf_pll(va, vb, dt, kp, ki, wnom=2 * np.pi * f_grid, trig=trig,
+                           instrument=instrument)
+    res.t = t
+    res.theta_actual = theta_actual
+    return res
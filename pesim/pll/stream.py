@@ -0,0 +1,265 @@
+"""
+Streaming SOGI-PLL and SRF-PLL
+Stateful PLLs for live acquisition and replay: samples arrive in blocks
+(e.g. 1024 from a DAQ ring buffer) and the loop state (x1, x2, vq_int,
+theta_est of the SOGI-PLL, theta_pll and the integral of the SRF-PLL) is
+carried from one block to the next, so feeding a record block by block gives
+the same result as simulate_sogi_pll / simulate_srf_pll over the whole record.
+
+The per-sample loop is a flat kernel over floats and preallocated arrays,
+compiled with numba when it is installed and run as plain Python otherwise.
+Output buffers are allocated once in the constructor, process() only writes
+into them. Every call is timed against the real-time budget of the block
+(block length * dt).
+"""
+from collections import namedtuple
+import math
+import time
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# views into the stream's output buffers, valid until the next process() call
+SogiPllBlock = namedtuple('SogiPllBlock', ['theta', 'f', 'amplitude'])
+SrfPllBlock = namedtuple('SrfPllBlock', ['theta', 'f', 'amplitude'])
+
+# state vector layouts
+X1, X2, VQ_INT, THETA_EST = range(4)
+THETA_PLL, INTEGRAL_ERROR = range(2)
+
+
+def _sogi_block(v_in, n, state, dt, k, w_nom, kp, ki, theta_out, f_out, amp_out):
+    x1 = state[X1]
+    x2 = state[X2]
+    vq_int = state[VQ_INT]
+    theta_est = state[THETA_EST]
+    two_pi = 2*math.pi
+
+    for i in range(n):
+        # ===== SOGI =====
+        e = v_in[i] - x1
+        dx1 = w_nom * ((k*e) - x2)
+        dx2 = w_nom * x1
+
+        x1 += dx1 * dt
+        x2 += dx2 * dt
+
+        # ===== Park Transform =====
+        cos_theta = math.cos(theta_est)
+        sin_theta = math.sin(theta_est)
+
+        vq = x1*(-sin_theta) + x2*cos_theta
+
+        # ===== PLL PI Controller =====
+        vq_int += vq * dt
+        w_est = (kp*vq) + (ki*vq_int) + w_nom
+
+        theta_est += w_est * dt
+        if theta_est > two_pi:
+            theta_est -= two_pi
+
+        theta_out[i] = theta_est
+        f_out[i] = w_est/two_pi
+        amp_out[i] = math.sqrt(x1*x1 + x2*x2)
+
+    state[X1] = x1
+    state[X2] = x2
+    state[VQ_INT] = vq_int
+    state[THETA_EST] = theta_est
+
+
+def _srf_block(va, vb, n, state, dt, kp, ki, wnom, feedforward, theta_out, f_out, amp_out):
+    theta_pll = state[THETA_PLL]
+    integral_error = state[INTEGRAL_ERROR]
+    two_pi = 2*math.pi
+
+    for i in range(n):
+        va_k = va[i]
+        vb_k = vb[i]
+
+        # ===== Park Transform =====
+        cos_theta = math.cos(theta_pll)
+        sin_theta = math.sin(theta_pll)
+
+        vd = (va_k * cos_theta) + (vb_k * sin_theta)
+        vq = (-va_k * sin_theta) + (vb_k * cos_theta)
+
+        # ===== PI Controller =====
+        integral_error = integral_error + (vq * dt)
+        pi_output = (kp * vq) + (ki * integral_error)
+        w_pll = (wnom + pi_output) if feedforward else pi_output
+
+        theta_pll = theta_pll + (w_pll * dt)
+        if theta_pll > two_pi:
+            theta_pll = theta_pll - two_pi
+
+        theta_out[i] = theta_pll
+        f_out[i] = w_pll / two_pi
+        amp_out[i] = vd
+
+    state[THETA_PLL] = theta_pll
+    state[INTEGRAL_ERROR] = integral_error
+
+
+_sogi_block_jit = njit(cache=True)(_sogi_block) if njit is not None else None
+_srf_block_jit = njit(cache=True)(_srf_block) if njit is not None else None
+
+HAVE_NUMBA = _sogi_block_jit is not None
+BACKENDS = ('auto', 'numba', 'python')
+
+
+class _BlockStream:
+    # backend selection, output buffers and latency accounting shared by the streams
+
+    def __init__(self, fs, block, num_state, backend):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+        if backend == 'numba' and not HAVE_NUMBA:
+            raise RuntimeError("numba is not installed, use backend='python'")
+        self.backend = 'numba' if backend != 'python' and HAVE_NUMBA else 'python'
+
+        self.fs = float(fs)
+        self.dt = 1/self.fs
+        self.block = int(block)
+
+        self.state = np.zeros(num_state)
+        self._theta = np.empty(self.block)
+        self._f = np.empty(self.block)
+        self._amp = np.empty(self.block)
+        self._views = {}
+
+        self.samples = 0
+        self.blocks = 0
+        self.overruns = 0
+        self.last_ns = 0
+        self.max_ns = 0
+        self.total_ns = 0
+
+    def reset(self):
+        """Zero the loop state and the latency counters."""
+        self.state[:] = 0.0
+        self.samples = self.blocks = self.overruns = 0
+        self.last_ns = self.max_ns = self.total_ns = 0
+
+    def _check(self, n):
+        if n > self.block:
+            raise ValueError(f"block of {n} samples exceeds the stream block size {self.block}")
+
+    def _account(self, n, elapsed, block_type):
+        self.samples += n
+        self.blocks += 1
+        self.last_ns = elapsed
+        self.total_ns += elapsed
+        if elapsed > self.max_ns:
+            self.max_ns = elapsed
+        if elapsed > n * self.dt * 1e9:
+            self.overruns += 1
+
+        out = self._views.get(n)
+        if out is None:
+            out = self._views[n] = block_type(self._theta[:n], self._f[:n], self._amp[:n])
+        return out
+
+    def latency(self):
+        """
+        Processing time against the real-time budget
+
+        budget_us is the duration of a full block at fs; load is the mean
+        processing time per sample over the sample period (must stay < 1),
+        overruns counts blocks that took longer than their own duration.
+        """
+        per_sample = self.total_ns / self.samples if self.samples else 0.0
+        return {
+            'blocks': self.blocks,
+            'budget_us': self.block * self.dt * 1e6,
+            'last_us': self.last_ns * 1e-3,
+            'max_us': self.max_ns * 1e-3,
+            'mean_us': (self.total_ns / self.blocks * 1e-3) if self.blocks else 0.0,
+            'ns_per_sample': per_sample,
+            'load': per_sample * 1e-9 * self.fs,
+            'max_rate': 1e9/per_sample if per_sample else math.inf,
+            'overruns': self.overruns,
+        }
+
+
+class SogiPllStream(_BlockStream):
+    """Block-by-block SOGI-PLL with carried state and per-block latency accounting."""
+
+    def __init__(self, fs, block=1024, k=1.0, f_nom=50.0, kp=20, ki=5, backend='auto'):
+        """
+        fs: sample rate (Hz); block: largest block process() accepts
+        backend: 'auto' (numba when available), 'numba' or 'python'
+        """
+        super().__init__(fs, block, 4, backend)
+        self._kernel = _sogi_block_jit if self.backend == 'numba' else _sogi_block
+        self.k = float(k)
+        self.w_nom = 2*math.pi*f_nom
+        self.kp = float(kp)
+        self.ki = float(ki)
+
+        # compile (or load from cache) now, not inside the first real-time block
+        self._kernel(np.zeros(1), 0, np.zeros(4), self.dt, self.k, self.w_nom, self.kp, self.ki,
+                     self._theta, self._f, self._amp)
+
+    @property
+    def theta(self):
+        return float(self.state[THETA_EST])
+
+    def process(self, v_in):
+        """
+        Run one block of float64 samples, returns SogiPllBlock(theta, f, amplitude)
+
+        The returned arrays are views into buffers reused by the next call;
+        copy them if they must outlive it.
+        """
+        n = len(v_in)
+        self._check(n)
+        t_start = time.perf_counter_ns()
+        self._kernel(v_in, n, self.state, self.dt, self.k, self.w_nom, self.kp, self.ki,
+                     self._theta, self._f, self._amp)
+        return self._account(n, time.perf_counter_ns() - t_start, SogiPllBlock)
+
+
+class SrfPllStream(_BlockStream):
+    """Block-by-block SRF-PLL over alpha-beta samples, the loop of simulate_srf_pll."""
+
+    def __init__(self, fs, block=1024, kp=225, ki=10000, f_nom=50.0, feedforward=False,
+                 backend='auto'):
+        """
+        fs: sample rate (Hz); block: largest block process() accepts
+        feedforward adds 2*pi*f_nom to the PI output, as in simulate_srf_pll
+        backend: 'auto' (numba when available), 'numba' or 'python'
+        """
+        super().__init__(fs, block, 2, backend)
+        self._kernel = _srf_block_jit if self.backend == 'numba' else _srf_block
+        self.kp = float(kp)
+        self.ki = float(ki)
+        self.wnom = 2*math.pi*f_nom
+        self.feedforward = bool(feedforward)
+
+        # compile (or load from cache) now, not inside the first real-time block
+        self._kernel(np.zeros(1), np.zeros(1), 0, np.zeros(2), self.dt, self.kp, self.ki, self.wnom,
+                     self.feedforward, self._theta, self._f, self._amp)
+
+    @property
+    def theta(self):
+        return float(self.state[THETA_PLL])
+
+    def process(self, va, vb):
+        """
+        Run one block of float64 alpha-beta samples, returns SrfPllBlock(theta, f, amplitude)
+
+        amplitude is vd, the input amplitude once locked. The returned arrays
+        are views into buffers reused by the next call.
+        """
+        n = len(va)
+        self._check(n)
+        t_start = time.perf_counter_ns()
+        self._kernel(va, vb, n, self.state, self.dt, self.kp, self.ki, self.wnom, self.feedforward,
+                     self._theta, self._f, self._amp)
+        return self._account(n, time.perf_counter_ns() - t_start, SrfPllBlock)
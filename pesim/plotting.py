@@ -0,0 +1,308 @@
+"""
+Plotting
+Figures of the example scripts, kept out of the models so that simulations
+can run in batch jobs and worker processes without matplotlib. pyplot is
+only imported when a plot function is called.
+
+Every function returns the list of figures it created and calls plt.show()
+unless show=False.
+"""
+import numpy as np
+
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _finish(plt, figs, show):
+    if show:
+        plt.show()
+    return figs
+
+
+def plot_buck_open_loop(res, show=True):
+    """iL, Vc and switching state, as buck_open_loop_sim.py."""
+    plt = _pyplot()
+    fig = plt.figure()
+
+    # Inductor Current plot
+    plt.subplot(3, 1, 1)
+    plt.plot(res.time, res.iL, label='Inductor Current (iL)', color='b')
+    plt.ylabel('Current (A)')
+    plt.title('Inductor Current vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # Cap voltage plot
+    plt.subplot(3, 1, 2)
+    plt.plot(res.time, res.vc, label='Capacitor Voltage (Vc)', color='r')
+    plt.ylabel('Voltage (V)')
+    plt.title('Capacitor Voltage vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # Switch state plot
+    plt.subplot(3, 1, 3)
+    plt.plot(res.time, res.switch.astype(int), label='Switching State', color='g')
+    plt.ylabel('State')
+    plt.title('Switching State vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    return _finish(plt, [fig], show)
+
+
+def plot_buck_closed_loop(res, show=True):
+    """Waveforms plus per-cycle error and PI output, as buck_closed_loop_sim.py."""
+    plt = _pyplot()
+    fig = plt.figure()
+
+    # Inductor Current plot
+    plt.subplot(3, 2, 1)
+    plt.plot(res.time, res.iL, label='Inductor Current (iL)', color='b')
+    plt.ylabel('Current (A)')
+    plt.title('Inductor Current vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # Cap voltage plot
+    plt.subplot(3, 2, 5)
+    plt.plot(res.time, res.vc, label='Capacitor Voltage (Vc)', color='r')
+    plt.ylabel('Voltage (V)')
+    plt.title('Capacitor Voltage vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # Switch state plot
+    plt.subplot(3, 2, 3)
+    plt.plot(res.time, res.switch.astype(int), label='Switching State', color='g')
+    plt.ylabel('State')
+    plt.title('Switching State vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # error plot
+    plt.subplot(3, 2, 2)
+    plt.plot(res.error, label='Error', color='r')
+    plt.ylabel('error')
+    plt.title('error vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    # controller output plot
+    plt.subplot(3, 2, 4)
+    plt.plot(res.controller_output, label='Controller Output', color='b')
+    plt.ylabel('PI output')
+    plt.title('PI Output vs Time')
+    plt.grid(True)
+    plt.legend()
+
+    plt.tight_layout()
+    return _finish(plt, [fig], show)
+
+
+def plot_srf_pll(res, f1=50, f2=100, step_instant=0.5, show=True):
+    """Tracking, frequency estimate, dq components and phase error, as srf-pll-v2.py."""
+    plt = _pyplot()
+    t = res.t
+    fig = plt.figure()
+
+    # Plot 1: Input signal and PLL tracking
+    plt.subplot(2, 2, 1)
+    plt.plot(t, res.va, label='Input Signal', color='b', linestyle='--')
+    plt.plot(t, np.cos(res.theta_pll), label='PLL', color='r', linestyle='-')
+    plt.ylabel('Amplitude')
+    plt.title('Input Signal vs PLL')
+    plt.grid(True)
+    plt.legend()
+    plt.xlim([0.4, 0.6])
+
+    # Plot 2: Frequency estimation
+    plt.subplot(2, 2, 2)
+    plt.plot(t, res.f_pll, label='Estimated Frequency', color='b')
+    plt.axhline(y=f1, color='b', linestyle='--', alpha=0.7, label=f'Target {f1} Hz')
+    plt.axhline(y=f2, color='g', linestyle='--', alpha=0.7, label=f'Target {f2} Hz')
+    plt.axvline(x=step_instant, color='k', linestyle=':', alpha=0.7, label='Frequency Step')
+    plt.ylabel('Frequency (Hz)')
+    plt.title('Frequency Estimation')
+    plt.grid(True)
+    plt.legend()
+
+    # Plot 3: dq components
+    plt.subplot(2, 2, 3)
+    plt.plot(t, res.vd, 'b-', label='Vd (d-axis)', linewidth=1)
+    plt.plot(t, res.vq, 'r-', label='Vq (q-axis)', linewidth=1)
+    plt.xlabel('Time')
+    plt.ylabel('Voltage')
+    plt.title('DQ Components')
+    plt.legend()
+    plt.grid(True)
+
+    # Plot 4: Phase error
+    plt.subplot(2, 2, 4)
+    plt.plot(t, res.error, 'r-', label='Phase Error (Vq)', linewidth=1)
+    plt.plot(t, res.pi_output, 'b-', label='PI output', linewidth=1)
+    plt.ylabel('Error')
+    plt.title('Phase Error Signal')
+    plt.legend()
+    plt.grid(True)
+
+    plt.tight_layout()
+    return _finish(plt, [fig], show)
+
+
+def plot_sogi_pll(res, f_in=50.0, show=True):
+    """Input and SOGI outputs, then frequency estimate and vq, as sogi-pll-v1.py."""
+    plt = _pyplot()
+    t = res.t
+
+    fig1 = plt.figure(figsize=(10, 6))
+    plt.subplot(2, 1, 1)
+    plt.plot(t, res.v_in, label="Input Voltage")
+    plt.title("SOGI-PLL Estimation")
+    plt.ylabel("Voltage (V)")
+    plt.xlim([0, 0.2])
+    plt.grid()
+
+    plt.subplot(2, 1, 2)
+    plt.plot(t, res.v_alpha, label="v_alpha", color='green')
+    plt.plot(t, res.v_beta, label="v_beta", color='blue')
+    plt.ylabel("v_alpha & v_beta")
+    plt.xlabel("Time (s)")
+    plt.xlim([0, 0.2])
+    plt.grid()
+    plt.legend()
+
+    fig2 = plt.figure(figsize=(10, 6))
+    plt.subplot(2, 1, 1)
+    plt.plot(t, res.f, label="Estimated Frequency", color='orange')
+    plt.axhline(f_in, color='gray', linestyle='--', label="Actual Frequency")
+    plt.ylabel("Frequency (Hz)")
+    plt.grid()
+    plt.legend()
+
+    plt.subplot(2, 1, 2)
+    plt.plot(t, res.vq, label="vq", color='green')
+    plt.ylabel("vq")
+    plt.xlabel("Time (s)")
+    plt.grid()
+
+    plt.tight_layout()
+    return _finish(plt, [fig1, fig2], show)
+
+
+def plot_dsogi_pll(res, show=True):
+    """Sequence amplitudes, frequency estimate and phase error of the DSOGI-PLL."""
+    plt = _pyplot()
+    t = res.t
+    fig = plt.figure(figsize=(10, 8))
+
+    plt.subplot(3, 1, 1)
+    plt.plot(t, res.amplitude_pos, label='Positive Sequence', color='b')
+    plt.plot(t, res.amplitude_neg, label='Negative Sequence', color='r')
+    if res.amplitude_actual is not None:
+        plt.plot(t, res.amplitude_actual, label='Actual Positive Sequence', color='gray', linestyle='--')
+    plt.ylabel('Amplitude')
+    plt.title('DSOGI Sequence Extraction')
+    plt.grid(True)
+    plt.legend()
+
+    plt.subplot(3, 1, 2)
+    plt.plot(t, res.f, label='Estimated Frequency', color='orange')
+    if res.f_actual is not None:
+        plt.plot(t, res.f_actual, label='Actual Frequency', color='gray', linestyle='--')
+    plt.ylabel('Frequency (Hz)')
+    plt.grid(True)
+    plt.legend()
+
+    if res.theta_actual is not None:
+        plt.subplot(3, 1, 3)
+        plt.plot(t, np.angle(np.exp(1j*(res.theta - res.theta_actual))), label='Phase Error', color='g')
+        plt.ylabel('Phase Error (rad)')
+        plt.grid(True)
+        plt.legend()
+    plt.xlabel('Time (s)')
+
+    plt.tight_layout()
+    return _finish(plt, [fig], show)
+
+
+def plot_monte_carlo(res, bins=50, show=True):
+    """Histograms of lock time (locked trials), steady-state frequency error and phase jitter."""
+    plt = _pyplot()
+    locked = res.locked
+    fig = plt.figure(figsize=(12, 4))
+
+    panels = [(res.lock_time[locked], 'Lock Time (s)'), (res.freq_error, 'Frequency Error (Hz)'),
+              (res.phase_jitter, 'Phase Jitter (rad)')]
+    for k, (values, label) in enumerate(panels):
+        plt.subplot(1, 3, k + 1)
+        plt.hist(values, bins=bins, color='b', alpha=0.7)
+        plt.xlabel(label)
+        plt.ylabel('Trials')
+        plt.grid(True)
+    plt.suptitle(f'{locked.sum()} of {len(locked)} trials locked')
+
+    plt.tight_layout()
+    return _finish(plt, [fig], show)
+
+
+def plot_sampled(time, sig, sample_time, samples, label='input signal', show=True):
+    """Oversampled signal with the samples taken from it, as signal_gen.py."""
+    plt = _pyplot()
+    fig = plt.figure()
+    plt.plot(time, sig, label='full signal', ds='steps')
+    plt.plot(sample_time, samples, label=label, ds='steps')
+    plt.legend()
+    return _finish(plt, [fig], show)
+
+
+def plot_filter(res, figures=('input', 'output'), show=True):
+    """
+    Filter scenario figures, in the order given
+
+        input       oversampled signal and the samples fed to the filter
+        output      filter output alone
+        combined    input samples and output on one axis
+    """
+    plt = _pyplot()
+    figs = []
+    for name in figures:
+        if name == 'input':
+            figs += plot_sampled(res.time, res.signal, res.sample_time, res.samples, show=False)
+            continue
+        figs.append(plt.figure())
+        if name == 'combined':
+            plt.plot(res.sample_time, res.samples, label='input signal', ds='steps')
+        elif name != 'output':
+            raise ValueError(f"unknown filter figure {name!r}")
+        plt.plot(res.sample_time, res.output, label='output signal', ds='steps')
+        plt.legend()
+    return _finish(plt, figs, show)
+
+
+def plot_bode(res, labels=True, show=True):
+    """Magnitude and phase over log(w), as the filter_design scripts."""
+    plt = _pyplot()
+    fig = plt.figure()
+
+    plt.subplot(2, 1, 1)
+    plt.grid()
+    if labels:
+        plt.title('Magnitude plot')
+        plt.xlabel('log(w)')
+        plt.ylabel('Mag in dB')
+    plt.semilogx(res.w, res.mag)
+
+    plt.subplot(2, 1, 2)
+    plt.grid()
+    if labels:
+        plt.title('Phase plot')
+        plt.xlabel('log(w)')
+        plt.ylabel('Phase in degrees')
+    plt.semilogx(res.w, res.phase)
+
+    if labels:
+        plt.tight_layout()
+    return _finish(plt, [fig], show)
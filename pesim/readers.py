@@ -0,0 +1,195 @@
+"""
+Waveform Readers
+Recorded waveforms read chunk by chunk with bounded memory, whatever the
+file size. Every reader has the same interface:
+
+    reader.fs            sample rate (Hz)
+    reader.channels      channel names
+    reader.t0            time of the first sample (s)
+    reader.num_samples   samples per channel, None when unknown (CSV)
+    reader.chunks(n)     yields float64 (m, num_channels) blocks, m <= n
+
+Formats:
+    .npy        (num_samples,) or (num_samples, channels) array, memory-mapped
+    .csv/.txt   one row per sample, optional header row and time column,
+                parsed a chunk of lines at a time
+    .cfg/.dat   COMTRADE (IEEE C37.111, 1991/1999/2013): analog channels
+                of ASCII, BINARY, BINARY32 or FLOAT32 data files, scaled
+                by the a*x + b factors of the .cfg; binary data files are
+                memory-mapped
+
+    reader = open_waveform('fault.cfg')
+    for block in reader.chunks(65536):
+        ...
+"""
+from itertools import islice
+import math
+import os
+
+import numpy as np
+
+
+class NpyReader:
+    """Memory-mapped .npy file (or an in-memory array), time along axis 0."""
+
+    def __init__(self, source, fs, channels=None, t0=0.0):
+        self.path = source if isinstance(source, (str, os.PathLike)) else None
+        data = np.load(source, mmap_mode='r') if self.path is not None else np.asarray(source)
+        self.data = data[:, None] if data.ndim == 1 else data
+        if self.data.ndim != 2:
+            raise ValueError(f"expected (num_samples,) or (num_samples, channels), got {data.shape}")
+        self.fs = float(fs)
+        self.t0 = float(t0)
+        self.num_samples = len(self.data)
+        self.channels = list(channels) if channels is not None else \
+            [str(i) for i in range(self.data.shape[1])]
+
+    def chunks(self, size=65536):
+        for start in range(0, self.num_samples, size):
+            yield np.array(self.data[start:start + size], dtype=float)
+
+
+class CsvReader:
+    """
+    Delimited text, one row per sample
+
+    header: first line holds the channel names, otherwise the channels are
+    named '0', '1', ... time_column: name or index (file column) of a time
+    column, excluded from the channels; without fs the rate is taken from
+    its first two rows (uniform sampling is assumed).
+    """
+
+    def __init__(self, path, fs=None, time_column=None, header=True, delimiter=',', skiprows=0):
+        self.path = path
+        self.delimiter = delimiter
+        self.skiprows = skiprows
+        self.header = header
+        self.num_samples = None
+
+        with open(path) as f:
+            lines = list(islice(f, skiprows + int(header) + 2))[skiprows:]
+        names = [s.strip() for s in lines[0].split(delimiter)] if header else None
+        first = np.loadtxt(lines[int(header):], delimiter=delimiter, ndmin=2)
+        names = names or [str(i) for i in range(first.shape[1])]
+
+        if time_column is not None:
+            time_column = names.index(time_column) if isinstance(time_column, str) else time_column
+        self.time_column = time_column
+        self.columns = [i for i in range(len(names)) if i != time_column]
+        # without a header the channels are numbered like those of an .npy file,
+        # 0, 1, ... over the data columns, whatever the time column
+        self.channels = [names[i] for i in self.columns] if header else \
+            [str(i) for i in range(len(self.columns))]
+
+        self.t0 = float(first[0, time_column]) if time_column is not None else 0.0
+        if fs is None:
+            if time_column is None or len(first) < 2:
+                raise ValueError("pass fs, or a time_column with at least two rows to infer it")
+            fs = 1.0/(first[1, time_column] - first[0, time_column])
+        self.fs = float(fs)
+
+    def chunks(self, size=65536):
+        with open(self.path) as f:
+            for _ in range(self.skiprows + int(self.header)):
+                next(f)
+            while True:
+                lines = list(islice(f, size))
+                if not lines:
+                    return
+                block = np.loadtxt(lines, delimiter=self.delimiter, ndmin=2)
+                yield block[:, self.columns]
+
+
+class ComtradeReader:
+    """
+    COMTRADE record, analog channels only
+
+    path: the .cfg file (or the .dat next to it). fs overrides the rate of
+    the .cfg, required when the record is timestamp-only (rate 0).
+    """
+
+    def __init__(self, path, fs=None, encoding='latin-1'):
+        stem, ext = os.path.splitext(path)
+        self.cfg_path = path if ext.lower() == '.cfg' else _sibling(stem, '.cfg')
+        self.dat_path = _sibling(os.path.splitext(self.cfg_path)[0], '.dat')
+
+        with open(self.cfg_path, encoding=encoding) as f:
+            lines = [line.strip() for line in f if line.strip()]
+        fields = [line.split(',') for line in lines]
+
+        self.station = fields[0][0]
+        self.revision = fields[0][2].strip() if len(fields[0]) > 2 else '1991'
+        counts = fields[1]
+        self.num_analog = int(counts[1].strip().rstrip('Aa'))
+        self.num_digital = int(counts[2].strip().rstrip('Dd'))
+
+        analog = fields[2:2 + self.num_analog]
+        self.channels = [a[1].strip() for a in analog]
+        self.units = [a[4].strip() for a in analog]
+        self.scale = np.array([float(a[5]) for a in analog])
+        self.offset = np.array([float(a[6]) for a in analog])
+
+        pos = 2 + self.num_analog + self.num_digital
+        self.line_frequency = float(fields[pos][0])
+        nrates = int(fields[pos + 1][0])
+        rates = [(float(r[0]), int(r[1])) for r in fields[pos + 2:pos + 2 + nrates]]
+        pos += 2 + nrates
+        self.start = lines[pos]
+        self.trigger = lines[pos + 1]
+        self.format = fields[pos + 2][0].strip().upper()
+        self.timemult = float(fields[pos + 3][0]) if len(fields) > pos + 3 else 1.0
+
+        if len({r for r, _ in rates}) > 1:
+            raise ValueError(f"{self.cfg_path}: {len(rates)} sampling rates, only single-rate records "
+                             "are supported")
+        fs = fs if fs is not None else (rates[0][0] if rates else 0.0)
+        if not fs:
+            raise ValueError(f"{self.cfg_path}: timestamp-only record, pass fs")
+        self.fs = float(fs)
+        self.t0 = 0.0
+
+        if self.format == 'ASCII':
+            self._record = None
+            self.num_samples = rates[-1][1] if rates else None
+        else:
+            analog_type = {'BINARY': '<i2', 'BINARY32': '<i4', 'FLOAT32': '<f4'}[self.format]
+            self._record = np.dtype([('n', '<u4'), ('timestamp', '<u4'),
+                                     ('analog', analog_type, (self.num_analog,)),
+                                     ('digital', '<u2', (math.ceil(self.num_digital/16),))])
+            self.num_samples = os.path.getsize(self.dat_path) // self._record.itemsize
+
+    def chunks(self, size=65536):
+        if self._record is not None:
+            data = np.memmap(self.dat_path, dtype=self._record, mode='r', shape=(self.num_samples,))
+            for start in range(0, self.num_samples, size):
+                yield data['analog'][start:start + size] * self.scale + self.offset
+            return
+        with open(self.dat_path) as f:
+            while True:
+                lines = list(islice(f, size))
+                if not lines:
+                    return
+                rows = np.loadtxt(lines, delimiter=',', ndmin=2, usecols=range(2, 2 + self.num_analog))
+                yield rows * self.scale + self.offset
+
+
+def _sibling(stem, ext):
+    # COMTRADE files come with lower or upper case extensions
+    for candidate in (stem + ext, stem + ext.upper()):
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"{stem + ext} not found")
+
+
+def open_waveform(path, fs=None, **kwargs):
+    """Reader for path chosen by its extension, keyword arguments go to the reader."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        if fs is None:
+            raise ValueError(".npy files carry no sample rate, pass fs")
+        return NpyReader(path, fs, **kwargs)
+    if ext in ('.cfg', '.dat'):
+        return ComtradeReader(path, fs, **kwargs)
+    if ext in ('.csv', '.txt'):
+        return CsvReader(path, fs, **kwargs)
+    raise ValueError(f"unknown waveform format {ext!r}, expected .npy, .csv, .txt, .cfg or .dat")
@@ -0,0 +1,287 @@
+"""
+Waveform Recorder
+
+Bounded-memory replacement for the Python lists the scripts append to on
+every step. Samples go through a preallocated staging chunk and are committed
+one chunk at a time to one of three stores:
+
+    linear     preallocated arrays of fixed capacity (default)
+    ring       keeps only the most recent 'capacity' samples
+    file       every chunk is written to <path>/<channel>.npy, memory use stays
+               at one chunk whatever the run length
+
+Options:
+    decimation   keep the first sample of every window of N raw samples
+    envelope     also keep min/max of every window (float channels)
+
+Bool channels (switching states) are stored as packed bits, 8 states per byte.
+
+    rec = Recorder({'time': 'f8', 'iL': 'f8', 'switch': '?'}, capacity=100000, decimation=10)
+    rec.extend(time=t_block, iL=iL_block, switch=sw_block)
+    data = rec.data()
+"""
+import json
+import os
+
+import numpy as np
+
+_HEADER_LEN = 256       # fixed .npy header size so it can be rewritten on close
+
+
+def _npy_header(dtype, shape):
+    # NPY format 1.0 header padded to a fixed length
+    header = repr({'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                   'fortran_order': False, 'shape': tuple(shape)})
+    pad = _HEADER_LEN - 10 - len(header) - 1
+    header = header + ' '*pad + '\n'
+    return b'\x93NUMPY\x01\x00' + np.uint16(len(header)).tobytes() + header.encode('latin1')
+
+
+class Recorder:
+    """Preallocated, optionally decimated / ring / file-backed waveform store."""
+
+    def __init__(self, channels, capacity=None, decimation=1, envelope=False, ring=False,
+                 path=None, chunk=65536):
+        """
+        channels: dict of name -> dtype ('?' for packed switching states)
+        capacity: number of decimated samples kept in memory (linear and ring)
+        path: directory for file mode, capacity is ignored there
+        chunk: staging size in samples, rounded up to a multiple of 8
+        """
+        if path is None and capacity is None:
+            raise ValueError("pass 'capacity' for an in-memory recorder or 'path' for file mode")
+        if ring and path is not None:
+            raise ValueError("ring mode keeps data in memory, it cannot be combined with 'path'")
+
+        self.decimation = int(decimation)
+        self.envelope = envelope
+        self.ring = ring
+        self.path = path
+        self.chunk = -(-int(chunk) // 8) * 8
+
+        self.dtypes = {name: np.dtype(dt) for name, dt in channels.items()}
+        self.bits = {name for name, dt in self.dtypes.items() if dt == np.bool_}
+
+        # stored channels: every input channel plus <name>_min / <name>_max envelopes
+        self.stored = dict(self.dtypes)
+        if envelope and self.decimation > 1:
+            for name, dt in self.dtypes.items():
+                if name not in self.bits:
+                    self.stored[name + '_min'] = dt
+                    self.stored[name + '_max'] = dt
+
+        self._stage = {name: np.empty(self.chunk, dtype=dt) for name, dt in self.stored.items()}
+        self._pos = 0                   # samples in the staging chunk
+        self.count = 0                  # decimated samples committed
+        self.dropped = 0                # samples overwritten in ring mode
+
+        # partial decimation window carried across extend() calls
+        self._fill = 0
+        self._first = {}
+        self._min = {}
+        self._max = {}
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._files = {}
+            for name, dt in self.stored.items():
+                f = open(os.path.join(path, name + '.npy'), 'wb')
+                f.write(_npy_header(np.uint8 if name in self.bits else dt, (0,)))
+                self._files[name] = f
+        else:
+            n_chunks = -(-int(capacity) // self.chunk)
+            self.capacity = n_chunks * self.chunk
+            self._store = {}
+            for name, dt in self.stored.items():
+                if name in self.bits:
+                    self._store[name] = np.empty((n_chunks, self.chunk//8), dtype=np.uint8)
+                else:
+                    self._store[name] = np.empty((n_chunks, self.chunk), dtype=dt)
+
+    # ---------------------------------------------------------------- input
+
+    def append(self, **values):
+        """Record one raw sample per channel (per-step loops)."""
+        if self.decimation == 1:
+            pos = self._pos
+            for name, v in values.items():
+                self._stage[name][pos] = v
+            self._pos = pos + 1
+            if self._pos == self.chunk:
+                self._commit()
+        else:
+            self.extend(**{name: np.asarray([v]) for name, v in values.items()})
+
+    def extend(self, **blocks):
+        """Record a block of raw samples per channel, every block the same length."""
+        n = len(next(iter(blocks.values())))
+        if n == 0:
+            return
+        dec = self.decimation
+        if dec == 1:
+            self._emit(blocks, n)
+            return
+
+        start = 0
+        if self._fill:
+            # complete the window left open by the previous call
+            need = min(dec - self._fill, n)
+            for name, b in blocks.items():
+                head = b[:need]
+                if name in self._min:
+                    self._min[name] = min(self._min[name], head.min())
+                    self._max[name] = max(self._max[name], head.max())
+            self._fill += need
+            start = need
+            if self._fill < dec:
+                return
+            self._close_window()
+
+        full = (n - start) // dec
+        if full:
+            stop = start + full*dec
+            out = {}
+            for name, b in blocks.items():
+                body = b[start:stop]
+                out[name] = body[::dec]
+                if self.envelope and dec > 1 and name not in self.bits:
+                    windows = body.reshape(full, dec)
+                    out[name + '_min'] = windows.min(axis=1)
+                    out[name + '_max'] = windows.max(axis=1)
+            self._emit(out, full)
+            start = stop
+
+        if start < n:
+            # open a new partial window
+            for name, b in blocks.items():
+                tail = b[start:]
+                self._first[name] = tail[0]
+                if self.envelope and name not in self.bits:
+                    self._min[name] = tail.min()
+                    self._max[name] = tail.max()
+            self._fill = n - start
+
+    def _close_window(self):
+        out = {name: np.asarray([v]) for name, v in self._first.items()}
+        for name in self._min:
+            out[name + '_min'] = np.asarray([self._min[name]])
+            out[name + '_max'] = np.asarray([self._max[name]])
+        self._first.clear()
+        self._min.clear()
+        self._max.clear()
+        self._fill = 0
+        self._emit(out, 1)
+
+    def _emit(self, values, n):
+        # copy decimated samples into the staging chunk, committing full chunks
+        done = 0
+        while done < n:
+            k = min(self.chunk - self._pos, n - done)
+            for name, v in values.items():
+                self._stage[name][self._pos:self._pos + k] = v[done:done + k]
+            self._pos += k
+            done += k
+            if self._pos == self.chunk:
+                self._commit()
+
+    # ---------------------------------------------------------------- storage
+
+    def _commit(self):
+        # write the staging chunk to the store, only the final chunk of a file may be partial
+        n = self._pos
+        if n == 0:
+            return
+        if self.path is not None:
+            for name, f in self._files.items():
+                data = self._stage[name][:n]
+                if name in self.bits:
+                    data = np.packbits(data)
+                f.write(data.tobytes())
+        else:
+            n_chunks = len(next(iter(self._store.values())))
+            slot = self.count // self.chunk
+            if slot >= n_chunks:
+                if not self.ring:
+                    raise OverflowError(f"recorder full ({self.capacity} samples), "
+                                        "use ring=True or file mode for long runs")
+                slot %= n_chunks
+                self.dropped += self.chunk
+            for name, store in self._store.items():
+                data = self._stage[name]
+                store[slot] = np.packbits(data) if name in self.bits else data
+        self.count += n
+        self._pos = 0
+
+    def flush(self):
+        """Close the open decimation window so its sample becomes visible."""
+        if self._fill:
+            self._close_window()
+
+    def close(self):
+        """Flush and finalize the files in file mode."""
+        self.flush()
+        if self.path is None or not self._files:
+            return
+        self._commit()
+        for name, f in self._files.items():
+            if name in self.bits:
+                shape, dt = (-(-self.count // 8),), np.uint8
+            else:
+                shape, dt = (self.count,), self.stored[name]
+            f.seek(0)
+            f.write(_npy_header(dt, shape))
+            f.close()
+        meta = {'count': self.count, 'decimation': self.decimation,
+                'channels': {name: np.dtype(dt).str for name, dt in self.stored.items()},
+                'bits': sorted(self.bits)}
+        with open(os.path.join(self.path, 'recorder.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        self._files = {}
+
+    def __len__(self):
+        n = self.count + self._pos - self.dropped
+        # in ring mode the staged samples also push out the oldest committed ones
+        return min(n, self.capacity) if self.ring else n
+
+    # ---------------------------------------------------------------- output
+
+    def data(self):
+        """
+        Recorded samples in chronological order, bool channels unpacked
+
+        In ring mode this is the most recent 'capacity' samples. File mode
+        closes the recorder and returns the memory-mapped files.
+        """
+        if self.path is not None:
+            self.close()
+            return load_recording(self.path)
+
+        self.flush()
+        n_chunks = len(next(iter(self._store.values())))
+        committed = self.count // self.chunk
+        if committed <= n_chunks:
+            order = list(range(committed))
+        else:
+            order = [(committed + k) % n_chunks for k in range(n_chunks)]
+
+        out = {}
+        for name, store in self._store.items():
+            parts = [store[order]]
+            if name in self.bits:
+                parts = [np.unpackbits(parts[0], axis=1).astype(bool)]
+            flat = np.concatenate([parts[0].ravel(), self._stage[name][:self._pos]])
+            out[name] = flat[-self.capacity:] if self.ring else flat
+        return out
+
+
+def load_recording(path):
+    """Load a file-mode recording; float channels are memory-mapped."""
+    with open(os.path.join(path, 'recorder.json')) as f:
+        meta = json.load(f)
+    out = {}
+    for name in meta['channels']:
+        arr = np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+        if name in meta['bits']:
+            arr = np.unpackbits(arr, count=meta['count']).astype(bool)
+        out[name] = arr
+    return out
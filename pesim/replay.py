@@ -0,0 +1,188 @@
+"""
+Waveform Replay
+Recorded grid waveforms streamed through the PLLs offline: a reader
+(pesim.readers) delivers the recording chunk by chunk, a Resampler brings
+it to the PLL rate, SrfPllStream (three phases, via Clarke) and
+SogiPllStream (one phase) run with their state carried across chunks, and a
+file-mode Recorder writes the estimated angle and frequency to .npy files
+chunk by chunk. Memory use is a few chunks whatever the recording size.
+
+    python -m pesim.replay fault.cfg out/ --phases VA VB VC --phase VA
+    python -m pesim.replay feeder.npy out/ --fs 20000 --decimation 10
+
+    data = replay(open_waveform('fault.cfg'), 'out/')
+    data['theta_srf'], data['f_sogi']       # memory-mapped results
+
+Output channels: t, then theta_<pll>, f_<pll> and amplitude_<pll> for every
+PLL run (srf, sogi); out/replay.json records the source, the rates and the
+voltage base.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from .dsp.resample import Resampler
+from .pll.stream import SogiPllStream, SrfPllStream
+from .readers import open_waveform
+from .recorder import Recorder
+from .transforms import clarke
+
+
+def _index(reader, key):
+    if isinstance(key, str) and key not in reader.channels and key.isdigit():
+        key = int(key)
+    if isinstance(key, str):
+        try:
+            return reader.channels.index(key)
+        except ValueError:
+            raise ValueError(f"no channel {key!r}, the recording has {', '.join(reader.channels)}") \
+                from None
+    if not 0 <= key < len(reader.channels):
+        raise ValueError(f"channel index {key} out of range, the recording has "
+                         f"{len(reader.channels)} channels")
+    return key
+
+
+def replay(reader, path, fs_pll=10000.0, pll=('srf', 'sogi'), phases=(0, 1, 2), phase=0, srf=None,
+           sogi=None, v_base=None, decimation=1, chunk=65536, progress=None):
+    """
+    Stream a recording through the PLLs, results written under path
+
+    reader: a pesim.readers reader. pll: PLLs to run, 'srf' on the three
+    channels 'phases' (names or indices of phases a, b, c), 'sogi' on the
+    single channel 'phase'. srf, sogi: keyword arguments of SrfPllStream /
+    SogiPllStream (gains, f_nom, feedforward, ...).
+    v_base: voltage divided out before the PLLs, whose gains are tuned for
+    1 pu inputs; default sqrt(2) times the RMS of the first chunk.
+    decimation: keep one PLL output sample of every 'decimation'.
+    progress: optional callback progress(samples read, total or None).
+    Returns the recording as memory-mapped arrays (Recorder file mode).
+    """
+    pll = tuple(pll)
+    unknown = set(pll) - {'srf', 'sogi'}
+    if unknown or not pll:
+        raise ValueError(f"pll must name 'srf' and/or 'sogi', got {pll!r}")
+    phase_cols = [_index(reader, key) for key in phases] if 'srf' in pll else []
+    if 'srf' in pll and len(phase_cols) != 3:
+        raise ValueError(f"the SRF-PLL needs three phase channels, got {phases!r}")
+    single_col = [_index(reader, phase)] if 'sogi' in pll else []
+    used = sorted(set(phase_cols + single_col))
+    phase_cols = [used.index(c) for c in phase_cols]
+    single_col = [used.index(c) for c in single_col]
+
+    resampler = Resampler(reader.fs, fs_pll)
+    fs_out = resampler.fs_out
+    streams = {}
+    if 'srf' in pll:
+        streams['srf'] = SrfPllStream(fs_out, chunk, **(srf or {}))
+    if 'sogi' in pll:
+        streams['sogi'] = SogiPllStream(fs_out, chunk, **(sogi or {}))
+
+    outputs = {'t': 'f8'}
+    for name in streams:
+        outputs.update({f'theta_{name}': 'f8', f'f_{name}': 'f8', f'amplitude_{name}': 'f8'})
+    rec = Recorder(outputs, path=path, decimation=decimation, chunk=chunk)
+
+    state = {'v_base': v_base, 'samples': 0}
+
+    def run(y):
+        if state['v_base'] is None and len(y):
+            state['v_base'] = float(np.sqrt(2*np.mean(np.square(y)))) or 1.0
+        for start in range(0, len(y), chunk):
+            block = y[start:start + chunk] / state['v_base']
+            n = len(block)
+            values = {'t': reader.t0 + (state['samples'] + np.arange(n))/fs_out}
+            for name, stream in streams.items():
+                if name == 'srf':
+                    out = stream.process(*clarke(block[:, phase_cols]))
+                else:
+                    out = stream.process(np.ascontiguousarray(block[:, single_col[0]]))
+                values[f'theta_{name}'] = out.theta
+                values[f'f_{name}'] = out.f
+                values[f'amplitude_{name}'] = out.amplitude * state['v_base']
+            rec.extend(**values)
+            state['samples'] += n
+
+    t_start = time.perf_counter()
+    read = 0
+    for block in reader.chunks(chunk):
+        run(resampler.process(block[:, used]))
+        read += len(block)
+        if progress is not None:
+            progress(read, reader.num_samples)
+    run(resampler.flush())
+    data = rec.data()
+
+    meta = {
+        'source': getattr(reader, 'path', None) or getattr(reader, 'cfg_path', None),
+        'channels': [reader.channels[c] for c in used],
+        'pll': list(streams),
+        'fs_in': reader.fs,
+        'fs_pll': fs_out,
+        'up': resampler.up,
+        'down': resampler.down,
+        'decimation': decimation,
+        'v_base': state['v_base'],
+        'samples_in': read,
+        'samples_pll': state['samples'],
+        'elapsed_s': time.perf_counter() - t_start,
+    }
+    with open(os.path.join(path, 'replay.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pesim.replay',
+                                     description='Replay a recorded waveform through the PLLs.')
+    parser.add_argument('source', help='.npy, .csv/.txt or COMTRADE .cfg/.dat recording')
+    parser.add_argument('out', help='output directory for the .npy results')
+    parser.add_argument('--fs', type=float, help='sample rate of the recording (required for .npy)')
+    parser.add_argument('--time-column', help='time column of a CSV file (name or index)')
+    parser.add_argument('--no-header', action='store_true',
+                        help='the CSV file has no header row, channels are named by index')
+    parser.add_argument('--fs-pll', type=float, default=10000.0, help='PLL sample rate (Hz)')
+    parser.add_argument('--pll', nargs='+', default=['srf', 'sogi'], choices=['srf', 'sogi'])
+    parser.add_argument('--phases', nargs=3, default=['0', '1', '2'], metavar='CH',
+                        help='channels of phases a, b, c (names or indices) for the SRF-PLL')
+    parser.add_argument('--phase', default='0', help='channel for the SOGI-PLL')
+    parser.add_argument('--v-base', type=float, help='voltage base, default from the first chunk')
+    parser.add_argument('--f-nom', type=float, default=50.0, help='nominal grid frequency (Hz)')
+    parser.add_argument('--decimation', type=int, default=1, help='keep one output sample of N')
+    parser.add_argument('--chunk', type=int, default=65536, help='samples per chunk')
+    parser.add_argument('--quiet', action='store_true', help='no progress output')
+    args = parser.parse_args(argv)
+
+    kwargs = {'header': False} if args.no_header else {}
+    if args.time_column is not None:
+        # a column index for header-less CSV files, otherwise a header name
+        time_column = args.time_column
+        kwargs['time_column'] = int(time_column) if time_column.isdigit() else time_column
+    reader = open_waveform(args.source, args.fs, **kwargs)
+
+    def progress(done, total):
+        share = f" ({done/total:.0%})" if total else ''
+        print(f"\r{done} samples{share}", end='', file=sys.stderr, flush=True)
+
+    data = replay(reader, args.out, args.fs_pll, args.pll, args.phases, args.phase,
+                  srf={'f_nom': args.f_nom}, sogi={'f_nom': args.f_nom}, v_base=args.v_base,
+                  decimation=args.decimation, chunk=args.chunk,
+                  progress=None if args.quiet else progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+        with open(os.path.join(args.out, 'replay.json')) as f:
+            meta = json.load(f)
+        print(f"{meta['samples_in']} samples at {meta['fs_in']:g} Hz -> {meta['samples_pll']} at "
+              f"{meta['fs_pll']:g} Hz in {meta['elapsed_s']:.2f} s")
+        for key, a in data.items():
+            if key != 't' and len(a):
+                print(f"  {key:18s} {len(a):12d}  last {a[-1]:.6g}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Reference Frame Transforms
+Clarke (abc -> alpha-beta-zero) and Park (alpha-beta -> dq) transforms as
+whole-array operations. The three phases sit on one axis (last by default)
+of an array of any shape, e.g. (num_steps, 3) or (num_steps, channels, 3);
+Park takes the angle with the shape of alpha/beta or broadcastable to it.
+
+Amplitude-invariant scaling, the convention of the PLL scripts:
+
+    alpha = (2a - b - c)/3      beta = (b - c)/sqrt(3)      zero = (a + b + c)/3
+    d =  alpha*cos(theta) + beta*sin(theta)
+    q = -alpha*sin(theta) + beta*cos(theta)
+
+so a balanced set a = V cos(theta), b = V cos(theta - 2pi/3), ... gives
+alpha = V cos(theta), beta = V sin(theta), d = V, q = 0.
+"""
+import numpy as np
+
+from .trig import get_backend
+
+SQRT3 = np.sqrt(3.0)
+SHIFTS = np.array([0.0, -2*np.pi/3, 2*np.pi/3])     # phase a, b, c of the positive sequence
+
+
+def clarke(vabc, axis=-1, zero=False):
+    """(alpha, beta) or (alpha, beta, zero) of the phases along 'axis'."""
+    a, b, c = np.moveaxis(np.asarray(vabc, dtype=float), axis, 0)
+    bc = b + c
+    alpha = (2*a - bc) * (1/3)
+    beta = (b - c) * (1/SQRT3)
+    if zero:
+        return alpha, beta, (a + bc) * (1/3)
+    return alpha, beta
+
+
+def inverse_clarke(alpha, beta, zero=0.0, axis=-1):
+    """Phase voltages stacked along 'axis' from alpha, beta and the zero sequence."""
+    alpha = np.asarray(alpha, dtype=float)
+    half_alpha = 0.5*alpha
+    beta_part = (SQRT3/2)*np.asarray(beta, dtype=float)
+    return np.stack([alpha + zero, beta_part - half_alpha + zero, -half_alpha - beta_part + zero],
+                    axis=axis)
+
+
+def park(alpha, beta, theta, trig=None):
+    """(d, q) of alpha-beta in the frame at angle theta; trig: sin/cos backend (pesim.trig)."""
+    if trig is None:
+        s, c = np.sin(theta), np.cos(theta)
+    else:
+        s, c = get_backend(trig).sincos(np.asarray(theta, dtype=float))
+    return alpha*c + beta*s, beta*c - alpha*s
+
+
+def inverse_park(d, q, theta, trig=None):
+    """(alpha, beta) of dq components in the frame at angle theta."""
+    if trig is None:
+        s, c = np.sin(theta), np.cos(theta)
+    else:
+        s, c = get_backend(trig).sincos(np.asarray(theta, dtype=float))
+    return d*c - q*s, d*s + q*c
+
+
+def abc_to_dq(vabc, theta, axis=-1, trig=None):
+    """Clarke then Park, returns (d, q)."""
+    alpha, beta = clarke(vabc, axis)
+    return park(alpha, beta, theta, trig)
+
+
+def dq_to_abc(d, q, theta, zero=0.0, axis=-1, trig=None):
+    """Inverse Park then inverse Clarke, phases stacked along 'axis'."""
+    alpha, beta = inverse_park(d, q, theta, trig)
+    return inverse_clarke(alpha, beta, zero, axis)
+
+
+def symmetrical_components(phasors, axis=-1):
+    """
+    (positive, negative, zero) sequence phasors of complex phase phasors
+
+    With the phase convention of SHIFTS, a balanced positive sequence set
+    V*exp(j*(phi + SHIFTS)) returns (V*exp(j*phi), 0, 0).
+    """
+    va, vb, vc = np.moveaxis(np.asarray(phasors, dtype=complex), axis, 0)
+    a = np.exp(2j*np.pi/3)
+    return (va + a*vb + a*a*vc)/3, (va + a*a*vb + a*vc)/3, (va + vb + vc)/3
@@ -0,0 +1,215 @@
+"""
+Trig Backends
+Sine/cosine providers for the Park transforms of the PLLs. The scripts call
+np.cos/np.sin on every sample, a microcontroller uses a lookup table or
+CORDIC instead. Running the PLL with the firmware's backend shows the phase
+error a given table size or iteration count costs before flashing.
+
+    exact       math.sin/math.cos (np.sin/np.cos for arrays)
+    lut         table of 'size' points over one turn, linear interpolation
+                (or nearest entry with interpolate=False)
+    cordic      fixed-point rotation-mode CORDIC, 'iterations' stages on
+                integers with 'frac_bits' fractional bits
+
+Every backend has sincos(theta) -> (sin, cos) for a float or an array, the
+array path is vectorized. get_backend() takes a backend, a name or a spec
+such as 'lut:1024' or 'cordic:16'; trig_report() measures error and
+throughput of a list of backends.
+"""
+import math
+import time
+
+import numpy as np
+
+TWO_PI = 2*math.pi
+
+
+class ExactTrig:
+    """Library sine and cosine, the reference."""
+    name = 'exact'
+
+    def sincos(self, theta, out=None):
+        if np.ndim(theta) == 0:
+            return math.sin(theta), math.cos(theta)
+        if out is None:
+            return np.sin(theta), np.cos(theta)
+        np.sin(theta, out=out[0])
+        np.cos(theta, out=out[1])
+        return out
+
+
+class LutTrig:
+    """Sine table over one turn, cosine read a quarter turn ahead."""
+
+    def __init__(self, size=256, interpolate=True):
+        if size < 4 or size % 4:
+            raise ValueError(f"LUT size must be a multiple of 4, got {size}")
+        self.size = int(size)
+        self.interpolate = interpolate
+        self.name = f"lut:{self.size}" + ('' if interpolate else ':nearest')
+        self.table = np.sin(np.arange(self.size + 1) * (TWO_PI/self.size))     # + wrap entry
+        self._list = self.table.tolist()
+        self._scale = self.size/TWO_PI
+        self._quarter = self.size//4
+
+    def sincos(self, theta, out=None):
+        if np.ndim(theta) == 0:
+            return self._sincos_scalar(theta)
+
+        x = np.asarray(theta) * self._scale
+        size, tab = self.size, self.table
+        if self.interpolate:
+            i = np.floor(x)
+            frac = x - i
+            i = i.astype(np.int64) % size
+            j = (i + self._quarter) % size
+            s = tab[i] + frac*(tab[i + 1] - tab[i])
+            c = tab[j] + frac*(tab[j + 1] - tab[j])
+        else:
+            i = np.rint(x).astype(np.int64) % size
+            s = tab[i]
+            c = tab[(i + self._quarter) % size]
+
+        if out is None:
+            return s, c
+        out[0][...] = s
+        out[1][...] = c
+        return out
+
+    def _sincos_scalar(self, theta):
+        x = theta * self._scale
+        tab, size = self._list, self.size
+        if self.interpolate:
+            i = math.floor(x)
+            frac = x - i
+            i %= size
+            j = (i + self._quarter) % size
+            return (tab[i] + frac*(tab[i + 1] - tab[i]),
+                    tab[j] + frac*(tab[j + 1] - tab[j]))
+        i = round(x) % size
+        return tab[i], tab[(i + self._quarter) % size]
+
+
+class CordicTrig:
+    """Rotation-mode CORDIC in fixed point, arithmetic right shifts as on an MCU."""
+
+    def __init__(self, iterations=16, frac_bits=16):
+        self.iterations = int(iterations)
+        self.frac_bits = int(frac_bits)
+        self.name = f"cordic:{self.iterations}"
+        one = 1 << self.frac_bits
+        self._one = one
+        self.atan = [int(round(math.atan(2.0**-i) * one)) for i in range(self.iterations)]
+        gain = 1.0
+        for i in range(self.iterations):
+            gain /= math.sqrt(1 + 2.0**(-2*i))
+        self.x0 = int(round(gain * one))            # start vector pre-scaled by 1/K
+        self._half_pi = int(round(math.pi/2 * one))
+        self._pi = int(round(math.pi * one))
+
+    def sincos(self, theta, out=None):
+        if np.ndim(theta) == 0:
+            return self._sincos_scalar(theta)
+
+        # reduce to [-pi, pi), then fold the left half plane into [-pi/2, pi/2]
+        t = np.asarray(theta, dtype=float)
+        t = t - TWO_PI*np.floor((t + math.pi)/TWO_PI)
+        z = np.rint(t * self._one).astype(np.int64)
+        flip = np.abs(z) > self._half_pi
+        z = np.where(flip, z - np.sign(z)*self._pi, z)
+
+        x = np.full(z.shape, self.x0, dtype=np.int64)
+        y = np.zeros(z.shape, dtype=np.int64)
+        for i, a in enumerate(self.atan):
+            d = np.where(z >= 0, 1, -1)
+            x, y = x - d*(y >> i), y + d*(x >> i)
+            z = z - d*a
+
+        sign = np.where(flip, -1.0, 1.0) / self._one
+        s = y * sign
+        c = x * sign
+        if out is None:
+            return s, c
+        out[0][...] = s
+        out[1][...] = c
+        return out
+
+    def _sincos_scalar(self, theta):
+        t = theta - TWO_PI*math.floor((theta + math.pi)/TWO_PI)
+        z = int(round(t * self._one))
+        flip = abs(z) > self._half_pi
+        if flip:
+            z -= self._pi if z > 0 else -self._pi
+
+        x, y = self.x0, 0
+        for i, a in enumerate(self.atan):
+            if z >= 0:
+                x, y, z = x - (y >> i), y + (x >> i), z - a
+            else:
+                x, y, z = x + (y >> i), y - (x >> i), z + a
+
+        scale = -1.0/self._one if flip else 1.0/self._one
+        return y * scale, x * scale
+
+
+def get_backend(spec=None):
+    """
+    Backend from an instance, None / 'exact', 'lut[:size[:nearest]]' or
+    'cordic[:iterations[:frac_bits]]'.
+    """
+    if spec is None:
+        return ExactTrig()
+    if not isinstance(spec, str):
+        return spec
+    name, *args = spec.split(':')
+    if name == 'exact':
+        return ExactTrig()
+    if name == 'lut':
+        size = int(args[0]) if args else 256
+        return LutTrig(size, interpolate=not (len(args) > 1 and args[1] == 'nearest'))
+    if name == 'cordic':
+        return CordicTrig(*(int(a) for a in args))
+    raise ValueError(f"unknown trig backend {spec!r}, use 'exact', 'lut:<size>' or 'cordic:<iterations>'")
+
+
+def trig_report(backends=('exact', 'lut:64', 'lut:256', 'lut:1024', 'cordic:12', 'cordic:16'),
+                num=200000, num_scalar=20000, seed=0):
+    """
+    Error and throughput of each backend on uniformly random angles in [0, 2*pi)
+
+    Errors are against np.sin/np.cos: max and rms of sin and cos, phase error
+    (rad) of the returned vector and its magnitude error. Throughput is
+    samples/s through the vectorized path and calls/s through the scalar
+    path used inside the per-sample PLL loops.
+    """
+    rng = np.random.default_rng(seed)
+    theta = rng.uniform(0.0, TWO_PI, num)
+    s_ref, c_ref = np.sin(theta), np.cos(theta)
+    scalars = theta[:num_scalar].tolist()
+
+    report = {}
+    for spec in backends:
+        trig = get_backend(spec)
+        s, c = trig.sincos(theta)
+        phase = np.arctan2(s*c_ref - c*s_ref, c*c_ref + s*s_ref)
+
+        t_start = time.perf_counter()
+        trig.sincos(theta)
+        t_vec = time.perf_counter() - t_start
+
+        sincos = trig.sincos
+        t_start = time.perf_counter()
+        for th in scalars:
+            sincos(th)
+        t_scalar = time.perf_counter() - t_start
+
+        report[trig.name] = {
+            'max_err_sin': float(np.max(np.abs(s - s_ref))),
+            'max_err_cos': float(np.max(np.abs(c - c_ref))),
+            'rms_err': float(np.sqrt(0.5*np.mean((s - s_ref)**2 + (c - c_ref)**2))),
+            'max_phase_err': float(np.max(np.abs(phase))),
+            'max_mag_err': float(np.max(np.abs(np.hypot(s, c) - 1.0))),
+            'vector_rate': num / t_vec,
+            'scalar_rate': num_scalar / t_scalar,
+        }
+    return report
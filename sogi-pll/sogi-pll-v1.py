@@ -4,9 +4,15 @@ Version: 1
 Author: Gautam
 Date: July 2025
 '''
+import os
+import sys
 
 import numpy as np
-import matplotlib.pyplot as plt
+
+# make the pesim package importable when running this script directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pesim.pll import noisy_sine, simulate_sogi_pll
 
 # simulation params
 fs = 10000        # sampling frequency (Hz)
@@ -18,123 +24,24 @@ num_steps = len(t)    # number of steps in sim
 
 # input signal
 f_in = 50.0      # input signal freq
-w_in = 2*np.pi*f_in     # angular freq (omega)
-
-# add harmonics and random noise
-v_in = np.sin(w_in*t) \
-       + 0.02 * np.sin(3*w_in*t) \
-       + 0.05 * np.random.normal(0, 1, len(t))
-
 
 # SOGI-PLL params
 k = 1.0                 # gain of SOGI
 w_nom = 2*np.pi*50      # nominal grid angular freq (omega)
 kp = 20     # PLL PI controller proportional gain
 ki = 5      # PLL PI controller integral gain
+# SOGI behaves like a band-pass filter centered at w_nom, it is not retuned
+# with w_est, that would constantly shift the center frequency of the filter
 
 
-# State variables
-v_alpha = 0.0
-v_beta = 0.0
-
-x1 = 0.0     # ~ v_alpha - SOGI output in-phase component
-x2 = 0.0     # ~ v-beta - SOGI output quadrature component
-
-theta_est = 0.0     # initializing estimated phase angle
-w_est = w_nom       # initializing estimated frequency (omega)
-
-vd = 0.0       # direct component
-vq = 0.0       # quadrature component
-vq_int = 0.0   # vq integrator
-
-# data storage arrays
-theta_log = []
-f_log = []
-vq_log = []
-v_alpha_log = []
-v_beta_log = []
-
-##############################################################
-# simulation loop
-##############################################################
-for n in range(num_steps):
-
-    vin = v_in[n]   # input voltage at each step
-
-    # ===== SOGI =====
-    # error input
-    e = vin - x1
-
-    # SOGI states
-    dx1 = w_nom * ( (k*e) - x2 )
-    dx2 = w_nom * x1
-    # SOGI behaves like a band-pass filter centered at w_nom
-    # w_est changes over time which would destabilize or detune the filter
-    # it would constantly shift the center frequency of the filter
-
-    x1 += dx1 * dt
-    x2 += dx2 * dt
-
-    v_alpha = x1
-    v_beta = x2
-
-    # ===== Park Transform =====
-    cos_theta = np.cos(theta_est)
-    sin_theta = np.sin(theta_est)
-    # in MCU implementation we use a lookup table here
-
-    vd = v_alpha*cos_theta + v_beta*sin_theta
-    vq = v_alpha*(-sin_theta) + v_beta*cos_theta
-
-    # ===== PLL PI Controller =====
-    vq_int += vq * dt   # vq integrator
-    
-    w_est = (kp*vq) + (ki*vq_int) + w_nom
-
-    theta_est += w_est * dt
-    # wrap theta_est to 0 to 2*pi
-    if theta_est > 2*np.pi:
-        theta_est -= 2*np.pi
-
-    # data logging
-    theta_log.append(theta_est)
-    f_log.append(w_est/(2*np.pi))
-    vq_log.append(vq)
-    v_alpha_log.append(v_alpha)
-    v_beta_log.append(v_beta)
-
-# ===== Plot results =====
-plt.figure(figsize=(10, 6))
-plt.subplot(2, 1, 1)
-plt.plot(t, v_in, label="Input Voltage")
-plt.title("SOGI-PLL Estimation")
-plt.ylabel("Voltage (V)")
-plt.xlim([0, 0.2])
-plt.grid()
-
-plt.subplot(2, 1, 2)
-plt.plot(t, v_alpha_log, label="v_alpha", color='green')
-plt.plot(t, v_beta_log, label="v_beta", color='blue')
-plt.ylabel("v_alpha & v_beta")
-plt.xlabel("Time (s)")
-plt.xlim([0, 0.2])
-plt.grid()
-plt.legend()
-
-
-plt.figure(figsize=(10, 6))
-plt.subplot(2, 1, 1)
-plt.plot(t, f_log, label="Estimated Frequency", color='orange')
-plt.axhline(f_in, color='gray', linestyle='--', label="Actual Frequency")
-plt.ylabel("Frequency (Hz)")
-plt.grid()
-plt.legend()
+if __name__ == '__main__':
+    # add harmonics and random noise
+    v_in = noisy_sine(t, f_in, harmonic3=0.02, noise=0.05)
 
-plt.subplot(2, 1, 2)
-plt.plot(t, vq_log, label="vq", color='green')
-plt.ylabel("vq")
-plt.xlabel("Time (s)")
-plt.grid()
+    # simulation loop, see pesim/pll/sogi.py
+    res = simulate_sogi_pll(v_in, dt, k, w_nom, kp, ki)
+    res.t = t
 
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+    # ===== Plot results =====
+    from pesim.plotting import plot_sogi_pll
+    plot_sogi_pll(res, f_in)
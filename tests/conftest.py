@@ -0,0 +1,5 @@
+import os
+import sys
+
+# make the pesim package importable when running pytest from anywhere
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,52 @@
+"""
+Benchmark suite: result layout, baseline comparison and the exit code
+"""
+import json
+
+import pytest
+
+from pesim import bench
+
+
+def _report(**rates):
+    return {'meta': {'commit': None},
+            'results': {name: {'samples_per_s': rate} for name, rate in rates.items()}}
+
+
+def test_compare_ratios_and_regressions():
+    current = _report(a=80.0, b=100.0, c=50.0, new=1.0)
+    baseline = _report(a=100.0, b=100.0, c=100.0, gone=1.0)
+    ratios, regressions = bench.compare(current, baseline, threshold=0.2)
+    assert ratios == {'a': 0.8, 'b': 1.0, 'c': 0.5}
+    assert regressions == ['c']
+    assert bench.compare(current, baseline, threshold=0.1)[1] == ['a', 'c']
+
+
+def test_run_benchmark_result_fields():
+    res = bench.run_benchmark('capacitor-filter', repeat=1)
+    assert res['samples'] == 300000 and res['simulated_s'] == 60.0
+    assert res['samples_per_s'] == pytest.approx(res['samples']/res['best_s'])
+    assert res['wall_per_simulated_s'] == pytest.approx(res['best_s']/60.0)
+    assert res['peak_memory_mb'] >= 0
+    with pytest.raises(ValueError):
+        bench.run_benchmark('no-such-kernel')
+
+
+def test_main_exits_1_on_a_regression(tmp_path, capsys):
+    out = tmp_path/'bench.json'
+    assert bench.main(['capacitor-filter', '--repeat', '1', '--out', str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert list(report['results']) == ['capacitor-filter']
+    assert report['meta']['repeat'] == 1
+
+    # a baseline ten times faster than anything this machine can do
+    fast = tmp_path/'fast.json'
+    report['results']['capacitor-filter']['samples_per_s'] *= 10
+    fast.write_text(json.dumps(report))
+    assert bench.main(['capacitor-filter', '--repeat', '1', '--baseline', str(fast)]) == 1
+    assert 'REGRESSION' in capsys.readouterr().out
+
+    # and one ten times slower passes
+    report['results']['capacitor-filter']['samples_per_s'] /= 100
+    fast.write_text(json.dumps(report))
+    assert bench.main(['capacitor-filter', '--repeat', '1', '--baseline', str(fast)]) == 0
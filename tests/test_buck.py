@@ -0,0 +1,290 @@
+"""
+Buck solvers against the forward Euler loop of the scripts
+
+Bit-identity where a solver claims it (switching pattern, compiled kernel,
+script ports), the stated tolerances everywhere else.
+"""
+import dataclasses
+
+import numpy as np
+import pytest
+
+from pesim.buck import (BuckParams, PIController, compare_with_euler, cross_validate, dense,
+                        dense_events, periodic_steady_state, run_closed_loop, simulate_closed_loop,
+                        simulate_edges, simulate_euler, simulate_events, simulate_open_loop,
+                        size_components, sweep_designs)
+from pesim.buck import kernel
+from pesim.buck.engine import _propagate_loop
+from pesim.recorder import Recorder
+from pesim.buck.model import pi_step
+from pesim.instrument import Instrument
+
+OPEN = BuckParams.design(24.0, 12.0, 2.0, 50e3)
+CLOSED = BuckParams.design(24.0, 18.0, 2.0, 50e3)
+CTRL = PIController(Vref=18.0)
+
+WAVEFORMS = ('iL', 'vc', 'switch')
+CONTROLLER = ('controller_output', 'error', 'duty')
+
+
+def _same(a, b, names):
+    return all(np.array_equal(getattr(a, name), getattr(b, name)) for name in names)
+
+
+def _euler(params, sim_time, dt=1e-7, duty=None, ctrl=None):
+    # simulation loop of buck_open_loop_sim.py / buck_closed_loop_sim_v2.py
+    Vin, L, C, R, Tsw = params.Vin, params.L, params.C, params.R, params.Tsw
+    num_steps = int(sim_time/dt)
+    controller_step = int(Tsw/dt)
+    iL_hist = np.empty(num_steps)
+    vc_hist = np.empty(num_steps)
+    sw_hist = np.empty(num_steps, dtype=bool)
+    iL = Vc = integral_error = 0.0
+    duty_cycle = duty if ctrl is None else ctrl.Vref/Vin
+    for i in range(num_steps):
+        t = i * dt
+        if ctrl is not None and i % controller_step == 0:
+            duty_cycle, _, _, integral_error, _ = pi_step(ctrl, Vin, ctrl.Vref, Vc, integral_error, Tsw)
+        switch_state = (t % Tsw) < (duty_cycle*Tsw)
+        diL_dt = ((Vin - Vc) if switch_state else -Vc) / L
+        dVc_dt = (iL - (Vc/R)) / C
+        iL = iL + (diL_dt * dt)
+        Vc = Vc + (dVc_dt * dt)
+        iL_hist[i] = iL
+        vc_hist[i] = Vc
+        sw_hist[i] = switch_state
+    return iL_hist, vc_hist, sw_hist
+
+
+# ---------------------------------------------------------------- engine
+
+def test_open_loop_switching_pattern_matches_euler():
+    _, _, sw = _euler(OPEN, 1e-3, duty=0.5)
+    res = simulate_open_loop(OPEN, 0.5, 1e-3)
+    assert np.array_equal(res.time, np.arange(10000) * 1e-7)
+    assert np.array_equal(res.switch, sw)
+
+
+def test_open_loop_exact_against_euler():
+    # exact propagation against Euler at 0.1 us, relative to the operating point
+    iL, vc, _ = _euler(OPEN, 1e-3, duty=0.5)
+    res = simulate_open_loop(OPEN, 0.5, 1e-3)
+    assert np.max(np.abs(res.iL - iL)) / 2.0 < 0.01
+    assert np.max(np.abs(res.vc - vc)) / 12.0 < 0.01
+
+
+def test_modal_recursion_matches_matrix_loop():
+    res = simulate_open_loop(OPEN, 0.5, 2e-4)
+    iL = np.empty(len(res.time))
+    vc = np.empty(len(res.time))
+    _propagate_loop(OPEN, 1e-7, res.switch, np.zeros(2), iL, vc)
+    np.testing.assert_allclose(res.iL, iL, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(res.vc, vc, rtol=0, atol=1e-9)
+
+
+def test_closed_loop_exact_against_euler():
+    iL, vc, _ = _euler(CLOSED, 1e-3, ctrl=CTRL)
+    res = simulate_closed_loop(CLOSED, CTRL, 1e-3)
+    assert np.max(np.abs(res.iL - iL)) / 2.0 < 0.01
+    assert np.max(np.abs(res.vc - vc)) / 18.0 < 0.01
+
+
+# ---------------------------------------------------------------- edges
+
+@pytest.mark.parametrize('params, kwargs', [(OPEN, {'duty': 0.5}), (CLOSED, {'ctrl': CTRL})])
+def test_reference_is_the_script_loop(params, kwargs):
+    res = simulate_euler(params, 1e-3, **kwargs)
+    iL, vc, sw = _euler(params, 1e-3, **kwargs)
+    assert np.array_equal(res.iL, iL)
+    assert np.array_equal(res.vc, vc)
+    assert np.array_equal(res.switch, sw)
+
+
+@pytest.mark.parametrize('params, kwargs', [(OPEN, {'duty': 0.5}), (CLOSED, {'ctrl': CTRL})])
+def test_edges_within_euler_tolerance(params, kwargs):
+    report = compare_with_euler(params, 1e-3, **kwargs)
+    assert report['ok'], report
+
+
+# ---------------------------------------------------------------- sweep
+
+def test_sweep_sizing_matches_design():
+    table = sweep_designs(Vin=[12.0, 24.0, 48.0], Iout=2.0, fsw=50e3, Vout=5.0, num_cycles=50)
+    for row in table:
+        p = BuckParams.design(row['Vin'], 5.0, 2.0, 50e3)
+        assert (row['L'], row['C'], row['R']) == (p.L, p.C, p.R)
+    L, C, R = size_components(np.array([24.0, 48.0]), 12.0, 2.0, 50e3)
+    assert (L[0], C, R) == (OPEN.L, OPEN.C, OPEN.R)
+
+
+def test_sweep_settling_time_independent_of_run_length():
+    kwargs = dict(Vin=[12.0, 24.0, 48.0], Iout=2.0, fsw=50e3, Vout=5.0)
+    short = sweep_designs(num_cycles=400, **kwargs)['settling_time']
+    long = sweep_designs(num_cycles=2000, **kwargs)['settling_time']
+    assert np.all(np.isfinite(short))
+    np.testing.assert_array_equal(short, long)
+    assert np.all(np.isnan(sweep_designs(num_cycles=5, **kwargs)['settling_time']))
+
+
+def test_sweep_rows_match_single_design_runs():
+    num_cycles, m = 300, 32
+    table = sweep_designs(Vin=[12.0, 24.0, 48.0], Iout=2.0, fsw=[50e3, 100e3, 50e3], Vout=5.0,
+                          num_cycles=num_cycles, samples_per_cycle=2*m)
+    for row in table:
+        p = BuckParams.design(row['Vin'], 5.0, 2.0, row['fsw'])
+        d = row['duty']
+        res = simulate_edges(p, num_cycles*p.Tsw, duty=d)
+        # the last cycle at the sweep's sample points, ON and OFF intervals apart
+        t0 = (num_cycles - 1)*p.Tsw
+        frac = np.arange(m)/m
+        iL, vc = dense(p, res, np.concatenate([t0 + frac*d*p.Tsw, t0 + (d + frac*(1 - d))*p.Tsw]))
+        assert row['vout_mean'] == pytest.approx(d*vc[:m].mean() + (1 - d)*vc[m:].mean(), rel=1e-9)
+        assert row['vout_ripple_pu'] == pytest.approx(np.ptp(vc)/5.0, rel=1e-9)
+        assert row['iL_ripple_pu'] == pytest.approx(np.ptp(iL)/2.0, rel=1e-9)
+
+
+# ---------------------------------------------------------------- kernel
+
+@pytest.mark.parametrize('backend', ['python', pytest.param('numba', marks=pytest.mark.skipif(
+    not kernel.HAVE_NUMBA, reason='numba not installed'))])
+def test_kernel_bit_identical_to_euler(backend):
+    step_after = 5000
+    controller_step = int(CLOSED.Tsw/1e-7)
+    vref = np.where(np.arange(50) * controller_step > step_after, 12.0, 18.0)
+    euler = simulate_euler(CLOSED, 1e-3, ctrl=CTRL, vref=vref)
+    res = kernel.simulate_kernel(CLOSED, CTRL, 1e-3, Vref_step=12.0, step_after=step_after,
+                                 backend=backend)
+    assert _same(res, euler, WAVEFORMS + CONTROLLER)
+
+
+def test_kernel_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        kernel.simulate_kernel(CLOSED, CTRL, 1e-4, backend='numab')
+
+
+# ---------------------------------------------------------------- events
+
+def test_events_without_dcm_match_edges():
+    edges = simulate_edges(CLOSED, 1e-3, ctrl=CTRL)
+    events = simulate_events(CLOSED, 1e-3, ctrl=CTRL, dcm=False)
+    np.testing.assert_allclose(events.duty, edges.duty, rtol=0, atol=1e-12)
+    t = np.linspace(0.0, 1e-3, 2001)[:-1]
+    for a, b in zip(dense_events(CLOSED, events, t), dense(CLOSED, edges, t)):
+        np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+
+
+def test_events_dcm_against_fine_euler():
+    # light load, iL reaches zero every cycle; Euler at 2 ns with the diode clamp
+    params = dataclasses.replace(OPEN, R=200.0)
+    sim_time, dt = 2e-4, 2e-9
+    events = simulate_events(params, sim_time, duty=0.5)
+    assert np.any(events.mode == 2)
+
+    n = int(sim_time/dt)
+    vc_ref = np.empty(n)
+    iL = Vc = 0.0
+    for i in range(n):
+        on = (i*dt) % params.Tsw < 0.5*params.Tsw
+        diL_dt = ((params.Vin - Vc) if on else -Vc) / params.L
+        dVc_dt = (iL - Vc/params.R) / params.C
+        iL = max(iL + diL_dt*dt, 0.0)
+        Vc = Vc + dVc_dt*dt
+        vc_ref[i] = Vc
+    _, vc = dense_events(params, events, (np.arange(n) + 1)*dt)
+    assert np.max(np.abs(vc - vc_ref)) < 0.01
+
+
+# ---------------------------------------------------------------- averaged
+
+@pytest.mark.parametrize('params, kwargs', [(OPEN, {'duty': 0.5}), (CLOSED, {'ctrl': CTRL})])
+def test_averaged_tracks_cycle_averages(params, kwargs):
+    report = cross_validate(params, 5e-3, **kwargs)
+    assert report['rel_vc'] < 0.05
+    assert report['rel_iL'] < 0.06
+    assert abs(report['final_vc']) < 0.05
+
+
+# ---------------------------------------------------------------- steady state
+
+def test_ccm_steady_state_matches_long_run():
+    ss = periodic_steady_state(OPEN, 0.5)
+    edges = simulate_edges(OPEN, 0.05, duty=0.5)
+    assert not ss.dcm
+    np.testing.assert_allclose(ss.x0, [edges.iL[-1], edges.vc[-1]], rtol=1e-9)
+
+
+def test_dcm_steady_state_matches_long_run():
+    params = dataclasses.replace(OPEN, R=200.0)
+    ss = periodic_steady_state(params, 0.5)
+    events = simulate_events(params, 0.2, duty=0.5)
+    assert ss.dcm
+    np.testing.assert_allclose(ss.x0, [events.iL[-1], events.vc[-1]], rtol=0, atol=1e-6)
+
+
+def test_sweep_steady_state_matches_simulated_run():
+    kwargs = dict(Vin=[12.0, 24.0], Iout=2.0, fsw=[50e3, 100e3], Vout=5.0, num_cycles=3000)
+    simulated = sweep_designs(**kwargs)
+    shooting = sweep_designs(settling=False, **kwargs)
+    np.testing.assert_allclose(shooting['vout_mean'], simulated['vout_mean'], rtol=1e-6)
+    np.testing.assert_allclose(shooting['vout_ripple_pu'], simulated['vout_ripple_pu'], rtol=1e-4)
+
+
+# ---------------------------------------------------------------- recorder
+
+def _recorder():
+    return Recorder({'time': 'f8', 'iL': 'f8', 'vc': 'f8', 'switch': '?'}, capacity=20000,
+                    chunk=1024)
+
+
+def test_recorded_open_loop_matches_arrays():
+    ref = simulate_open_loop(OPEN, 0.5, 1e-3)
+    rec = _recorder()
+    simulate_open_loop(OPEN, 0.5, 1e-3, recorder=rec, block=3000)
+    data = rec.data()
+    assert np.array_equal(data['time'], ref.time)
+    assert np.array_equal(data['switch'], ref.switch)
+    # blocks restart the modal recursion from the carried state, round-off only
+    np.testing.assert_allclose(data['iL'], ref.iL, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(data['vc'], ref.vc, rtol=0, atol=1e-12)
+
+
+def test_recorded_closed_loop_matches_arrays():
+    ref = simulate_closed_loop(CLOSED, CTRL, 1e-3)
+    rec = _recorder()
+    res = simulate_closed_loop(CLOSED, CTRL, 1e-3, recorder=rec)
+    data = rec.data()
+    assert _same(res, ref, CONTROLLER)
+    assert all(np.array_equal(data[name], getattr(ref, name)) for name in ('time',) + WAVEFORMS)
+
+
+# ---------------------------------------------------------------- script scenarios
+
+def test_reference_step_scenario_switches_after_half_the_run():
+    # buck_closed_loop_sim_v2.py: vref = 12 once i > num_steps/2 = 25000, which the
+    # controller first sees at its update on step 25200, cycle 126
+    res = run_closed_loop(sim_time=5e-3, Vref_step=12.0)
+    assert res.controller_time[126] == pytest.approx(25200e-7)
+    vc_seen = np.concatenate([[0.0], res.vc[199::200][:-1]])
+    vref_seen = res.error + vc_seen
+    np.testing.assert_allclose(vref_seen[:126], 18.0, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(vref_seen[126:], 12.0, rtol=0, atol=1e-12)
+    assert res.error[125] == 18.0 - res.vc[24999]
+    assert res.error[126] == 12.0 - res.vc[25199]
+
+
+# ---------------------------------------------------------------- instrumentation
+
+def test_instrumented_loops_unchanged():
+    inst = Instrument()
+    closed = simulate_closed_loop(CLOSED, CTRL, 1e-3, instrument=inst)
+    opened = simulate_open_loop(OPEN, 0.5, 1e-3, instrument=inst)
+    assert _same(closed, simulate_closed_loop(CLOSED, CTRL, 1e-3), WAVEFORMS + CONTROLLER)
+    assert _same(opened, simulate_open_loop(OPEN, 0.5, 1e-3), WAVEFORMS)
+    num_cycles = len(closed.error)
+    assert inst.counters['controller_updates'] == num_cycles
+    duty = closed.duty
+    assert inst.counters['duty_clamped'] == np.count_nonzero((duty == CTRL.duty_min) |
+                                                             (duty == CTRL.duty_max))
+    stages = inst.report()['stages']
+    assert stages['simulate_closed_loop/controller']['calls'] == num_cycles
+    assert stages['simulate_open_loop']['calls'] == 1
@@ -0,0 +1,34 @@
+"""
+Headless command line interface
+"""
+import sys
+
+import numpy as np
+import pytest
+
+from pesim import cli
+
+
+def test_scenario_dump_matches_direct_run(tmp_path):
+    path = str(tmp_path/'step.npz')
+    assert cli.main(['buck-closed-loop', '--set', 'sim_time=5e-4', '--set', 'Vref_step=12',
+                     '--out', path, '--quiet']) == 0
+    ref = cli.result_arrays(cli.run('buck-closed-loop', sim_time=5e-4, Vref_step=12))
+    with np.load(path) as data:
+        assert sorted(data.files) == sorted(ref)
+        for name, value in ref.items():
+            assert np.array_equal(data[name], value), name
+
+
+def test_every_scenario_loads():
+    for name in cli.SCENARIOS:
+        assert callable(cli.load(name))
+    with pytest.raises(ValueError):
+        cli.load('no-such-scenario')
+
+
+def test_headless_run_does_not_import_matplotlib(capsys):
+    loaded = 'matplotlib' in sys.modules
+    cli.main(['srf-pll', '--set', 't_sim=0.05'])
+    assert 'srf-pll' in capsys.readouterr().out
+    assert ('matplotlib' in sys.modules) == loaded
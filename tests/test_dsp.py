@@ -0,0 +1,161 @@
+"""
+Discrete filters and their design tools
+
+The array engines against the per-sample ISR loop of the dsp scripts,
+the frequency response against the analytic second-order peak.
+"""
+import numpy as np
+import pytest
+from scipy import signal
+
+from pesim.dsp import (DiscreteFilter, Harmonic, Resampler, SosFilter, Source, Tone, compile_filter,
+                       discrete_tf_filter, frequency_response, lc_coefficients, margins,
+                       run_lc_filter, run_sop_filter, sampled_signal, second_order_pole_tf,
+                       sop_coefficients, tf_filter)
+
+T_SAMPLE = 200e-6
+W0, ZETA = 1000.0, 0.1
+# |H| = 1/(2 zeta sqrt(1 - zeta^2)) at w0 sqrt(1 - 2 zeta^2)
+PEAK_DB = 20*np.log10(1/(2*ZETA*np.sqrt(1 - ZETA**2)))
+W_PEAK = W0*np.sqrt(1 - 2*ZETA**2)
+
+
+@pytest.fixture(scope='module')
+def samples():
+    return run_sop_filter(t_sample=T_SAMPLE).samples
+
+
+# ---------------------------------------------------------------- SOS engine
+
+@pytest.mark.parametrize('coefficients', [lc_coefficients(T_SAMPLE, 1e-3, 500e-6, 0.05),
+                                          sop_coefficients(T_SAMPLE, W0, ZETA)])
+def test_sos_engine_against_isr_loop(samples, coefficients):
+    ref = discrete_tf_filter(samples, *coefficients)
+    np.testing.assert_allclose(tf_filter(samples, *coefficients), ref, rtol=0,
+                               atol=1e-12*np.max(np.abs(ref)))
+
+
+def test_sos_blocks_match_one_shot(samples):
+    coefficients = sop_coefficients(T_SAMPLE, W0, ZETA)
+    whole = tf_filter(samples, *coefficients)
+    lp = SosFilter.from_tf(*coefficients)
+    blocks = np.concatenate([lp(samples[i:i + 333]) for i in range(0, len(samples), 333)])
+    assert np.array_equal(blocks, whole)
+
+
+def test_sos_channels_are_independent(samples):
+    coefficients = lc_coefficients(T_SAMPLE, 1e-3, 500e-6, 0.05)
+    y = tf_filter(np.stack([samples, 2*samples], axis=1), *coefficients)
+    assert np.array_equal(y[:, 0], tf_filter(samples, *coefficients))
+    assert np.array_equal(y[:, 1], tf_filter(2*samples, *coefficients))
+
+
+# ---------------------------------------------------------------- compiler
+
+def test_compile_filter_matches_bilinear():
+    df = compile_filter(second_order_pole_tf(W0, ZETA), T_SAMPLE)
+    num, den = signal.bilinear([W0**2], [1, 2*ZETA*W0, W0**2], 1/T_SAMPLE)
+    np.testing.assert_allclose(df.num, num/den[0], rtol=1e-12)
+    np.testing.assert_allclose(df.den, den/den[0], rtol=1e-12)
+    assert compile_filter(second_order_pole_tf(W0, ZETA), T_SAMPLE) is df
+
+
+def test_compile_filter_matches_hand_derived_lc():
+    L, C, R = 1e-3, 500e-6, 0.05
+    df = compile_filter(([1], [L*C, R*C, 1]), T_SAMPLE)
+    num, den = lc_coefficients(T_SAMPLE, L, C, R)
+    np.testing.assert_allclose(df.num, num, rtol=1e-12)
+    np.testing.assert_allclose(df.den, den, rtol=1e-12)
+
+
+def test_discrete_filter_is_an_sos_filter(samples):
+    df = compile_filter(second_order_pole_tf(W0, ZETA), T_SAMPLE)
+    assert isinstance(df, DiscreteFilter)
+    assert np.array_equal(df(samples), df.filter().process(samples))
+
+
+def test_prewarp_matches_continuous_response():
+    w_p = 2*np.pi*1000
+    df = compile_filter(second_order_pole_tf(W0, ZETA), T_SAMPLE, prewarp=w_p)
+    _, h_z = signal.freqz(df.num, df.den, worN=[w_p*T_SAMPLE])
+    _, h_s = signal.freqs([W0**2], [1, 2*ZETA*W0, W0**2], worN=[w_p])
+    assert abs(h_z[0] - h_s[0]) < 1e-12*abs(h_s[0])
+
+
+# ---------------------------------------------------------------- frequency response
+
+def test_analytic_second_order_peak():
+    sop = second_order_pole_tf(W0, ZETA)
+    assert 20*np.log10(abs(frequency_response(sop, w=[W_PEAK]).h[0, 0])) == pytest.approx(PEAK_DB)
+    m, = margins(frequency_response(sop))
+    assert m.peak_db == pytest.approx(PEAK_DB, abs=0.01)
+    assert m.w_peak == pytest.approx(W_PEAK, rel=0.01)
+
+
+def test_many_systems_match_signal_bode():
+    systems = [second_order_pole_tf(W0, z) for z in (0.05, 0.1, 0.7)]
+    w = np.logspace(1, 5, 200)
+    resp = frequency_response(systems, w=w)
+    for sys, mag, phase in zip(systems, resp.mag, resp.phase):
+        _, mag_ref, phase_ref = signal.bode(sys, w)
+        np.testing.assert_allclose(mag, mag_ref, atol=1e-9)
+        np.testing.assert_allclose(phase, phase_ref, atol=1e-9)
+
+
+def test_discrete_systems_bring_their_own_dt():
+    # the Tustin SOP peaks at the analytic value, only slightly shifted in frequency
+    df = compile_filter(second_order_pole_tf(W0, ZETA), 1e-5)
+    dlti = signal.dlti(df.num, df.den, dt=1e-5)
+    for system in (df, dlti):
+        m, = margins(frequency_response(system))
+        assert m.peak_db == pytest.approx(PEAK_DB, abs=0.02)
+    z_pair = frequency_response((df.num, df.den), w=[W_PEAK], dt=1e-5).h
+    assert np.array_equal(frequency_response(df, w=[W_PEAK]).h, z_pair)
+
+
+def test_mixed_sample_times_rejected():
+    a = compile_filter(second_order_pole_tf(W0, ZETA), 1e-5)
+    b = compile_filter(second_order_pole_tf(W0, ZETA), 2e-5)
+    with pytest.raises(ValueError):
+        frequency_response([a, b])
+    with pytest.raises(ValueError):
+        frequency_response([a, second_order_pole_tf(W0, ZETA)])
+    with pytest.raises(ValueError):
+        frequency_response(a, dt=2e-5)
+
+
+# ---------------------------------------------------------------- sources
+
+def test_source_samples_match_oversampled_grid():
+    source = Source(50.0, 325.0, components=[Tone(8000.0, 65.0)])
+    _, _, ts, xs = sampled_signal(0.4, 1e-6, T_SAMPLE, source)
+    t, x = source.sample(0.4, T_SAMPLE, t_step=1e-6)
+    assert np.array_equal(t, ts)
+    assert np.array_equal(x, xs)
+
+
+@pytest.mark.parametrize('run, coefficients', [
+    (run_lc_filter, lc_coefficients(T_SAMPLE, 0.001, 500e-6, 0.05)),
+    (run_sop_filter, sop_coefficients(T_SAMPLE, W0, ZETA))])
+def test_scenarios_feed_the_isr_samples(run, coefficients):
+    res = run(t_duration=0.1)
+    t, sig, ts, xs = sampled_signal(0.1, 1e-6, T_SAMPLE, res.make_signal)
+    assert np.array_equal(res.sample_time, ts)
+    assert np.array_equal(res.samples, xs)
+    assert np.array_equal(res.time, t)
+    assert np.array_equal(res.signal, sig)
+    ref = discrete_tf_filter(xs, *coefficients)
+    np.testing.assert_allclose(res.output, ref, rtol=0, atol=1e-12*np.max(np.abs(ref)))
+
+
+# ---------------------------------------------------------------- resampler
+
+@pytest.mark.parametrize('fs_in, fs_out', [(12800.0, 10000.0), (10000.0, 44100.0)])
+def test_resampler_blocks_match_resample_poly(fs_in, fs_out):
+    x = Source(50.0, 1.0, components=[Harmonic(5, 0.1)]).sample(0.2, 1/fs_in)[1]
+    x = np.stack([x, -x], axis=1)
+    rs = Resampler(fs_in, fs_out)
+    y = np.concatenate([rs.process(x[i:i + 500]) for i in range(0, len(x), 500)] + [rs.flush()])
+    ref = signal.resample_poly(x, rs.up, rs.down, axis=0)
+    assert y.shape == ref.shape
+    np.testing.assert_allclose(y, ref, rtol=0, atol=1e-12)
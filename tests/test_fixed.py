@@ -0,0 +1,113 @@
+"""
+Fixed-point emulation: Q formats, rounding, overflow counters, IIR filters and PLLs
+"""
+import math
+
+import numpy as np
+import pytest
+from scipy import signal
+
+from pesim.dsp import fixed_filter_report, fixed_iir
+from pesim.fixed_point import FixedPoint, QFormat, Q15, Q31, quantization_noise, to_float
+from pesim.pll import (frequency_step_signal, noisy_sine, simulate_sogi_pll_fixed,
+                       simulate_srf_pll_fixed)
+
+
+def test_qformat_fit_keeps_the_peak():
+    assert QFormat.fit([0.3, -0.9]) == Q15
+    fmt = QFormat.fit([1.5, -0.25], word=16)
+    assert str(fmt) == 'Q1.14'
+    assert fmt.max_value >= 1.5
+    # a peak that rounds past max_int loses one more fractional bit
+    assert QFormat.fit([1.0 - 2.0**-17]).frac == 14
+    assert (Q15.min_int, Q15.max_int) == (-32768, 32767)
+
+
+@pytest.mark.parametrize('rounding, expected', [('floor', [0, 1, 2, -1, -2]),
+                                                ('nearest', [1, 2, 3, 0, -1]),
+                                                ('convergent', [0, 2, 2, 0, -2])])
+def test_rounding_of_a_shift(rounding, expected):
+    fx = FixedPoint(rounding)
+    q = np.array([1, 3, 5, -1, -3])         # 0.5, 1.5, 2.5, -0.5, -1.5 after one shift
+    assert fx.requantize(q, 1, QFormat(16, 0), 'out').tolist() == expected
+
+
+def test_saturate_and_wrap_count_the_same_samples():
+    x = np.array([0.5, 1.2, -1.5, -0.25])
+    sat = FixedPoint(saturate=True)
+    wrap = FixedPoint(saturate=False)
+    qs = sat.quantize(x, Q15, 'input')
+    qw = wrap.quantize(x, Q15, 'input')
+    assert sat.overflows['input'] == wrap.overflows['input'] == 2
+    assert qs.tolist() == [16384, 32767, -32768, -8192]
+    assert qw.tolist() == [16384, 39322 - 65536, -49152 + 65536, -8192]
+    assert sat.quantize([1e30], Q15, 'huge').tolist() == [32767]
+    with pytest.raises(ValueError):
+        FixedPoint('truncate')
+
+
+def test_quantization_noise_of_a_q15_sine():
+    x = 0.9*np.sin(np.linspace(0, 20, 5000))
+    fx = FixedPoint()
+    noise = quantization_noise(x, to_float(fx.quantize(x, Q15), Q15))
+    assert noise['max'] <= Q15.lsb/2
+    # uniform rounding noise, lsb/sqrt(12)
+    assert noise['rms'] == pytest.approx(Q15.lsb/math.sqrt(12), rel=0.1)
+    assert quantization_noise(x, x)['snr_db'] == math.inf
+
+
+def test_fixed_iir_follows_the_float_filter():
+    num, den = signal.butter(2, 0.05)
+    u = np.random.default_rng(3).uniform(-0.9, 0.9, (4000, 3))
+    res = fixed_iir(u, num, den)
+    ref = signal.lfilter(num, den, u, axis=0)
+    assert res.output.shape == u.shape
+    assert res.noise['output']['snr_db'] > 45
+    assert np.max(np.abs(res.output - ref)) < 5e-3
+    assert sum(res.overflows.values()) == 0
+    assert res.formats['accumulator'].word == 40
+    single = fixed_iir(u[:, 1], num, den)
+    assert np.array_equal(single.raw['output'], res.raw['output'][:, 1])
+
+
+def test_filter_report_without_and_with_headroom():
+    report = fixed_filter_report()
+    assert set(report) == {'capacitor', 'lossy_capacitor', 'inductor', 'lossy_inductor', 'lc', 'sop'}
+    for name, res in report.items():
+        assert res.overflows['output'] == 0, name
+        assert res.noise['output']['snr_db'] > 40, name
+    tight = fixed_filter_report(headroom=0.5)
+    assert sum(res.overflows['output'] for res in tight.values()) > 0
+
+
+def test_fixed_srf_pll_tracks_the_float_loop():
+    dt = 1e-4
+    va, vb, _ = frequency_step_signal(np.arange(10000)*dt)
+    res = simulate_srf_pll_fixed(va, vb, dt)
+    assert res.overflows['integrator'] == 0 and res.overflows['frequency'] == 0
+    assert res.noise['theta']['max'] < 1e-2
+    assert res.noise['f']['rms'] < 0.2
+    assert res.output.theta_pll.shape == (10000, 1)
+
+
+def test_fixed_sogi_pll_tracks_the_float_loop():
+    dt = 1e-4
+    v = noisy_sine(np.arange(10000)*dt, rng=0)
+    res = simulate_sogi_pll_fixed(v, dt)
+    assert res.output.theta.shape == (10000,)
+    assert res.overflows['integrator'] == 0
+    assert res.noise['theta']['max'] < 1e-2
+    assert res.noise['v_alpha']['snr_db'] > 60
+
+
+def test_q31_pll_integrator_has_headroom():
+    # a 32-bit integrator in Q31 saturated through the frequency step and lost lock
+    dt = 1e-4
+    va, vb, _ = frequency_step_signal(np.arange(10000)*dt)
+    res = simulate_srf_pll_fixed(va, vb, dt, data=Q31)
+    assert res.formats['integrator'] == QFormat(48, 31)
+    assert res.overflows['integrator'] == 0 and res.overflows['frequency'] == 0
+    assert res.noise['theta']['max'] < 1e-2
+    assert simulate_srf_pll_fixed(va, vb, dt).formats['integrator'] == QFormat(32, 15)
+    with pytest.raises(ValueError):
+        simulate_srf_pll_fixed(va[:10], vb[:10], dt, data=Q31, acc_word=63)
@@ -0,0 +1,170 @@
+"""
+Recorder stores, waveform readers and the offline replay
+"""
+import numpy as np
+import pytest
+
+from pesim.pll import GridScenario, simulate_sogi_pll, simulate_srf_pll
+from pesim.readers import ComtradeReader, CsvReader, NpyReader, open_waveform
+from pesim.recorder import Recorder
+from pesim.replay import replay
+from pesim.transforms import clarke
+
+
+@pytest.fixture
+def blocks():
+    t = np.arange(10000)*1e-6
+    x = np.sin(2*np.pi*1000*t)
+    sw = (np.arange(10000) % 7) < 3
+    return t, x, sw
+
+
+def _feed(rec, t, x, sw, size=333):
+    for i in range(0, len(t), size):
+        rec.extend(time=t[i:i + size], x=x[i:i + size], switch=sw[i:i + size])
+
+
+CHANNELS = {'time': 'f8', 'x': 'f8', 'switch': '?'}
+
+
+# ---------------------------------------------------------------- recorder
+
+def test_linear_recorder_keeps_every_sample(blocks):
+    rec = Recorder(CHANNELS, capacity=20000, chunk=1024)
+    _feed(rec, *blocks)
+    data = rec.data()
+    assert len(rec) == len(blocks[0])
+    for name, ref in zip(('time', 'x', 'switch'), blocks):
+        assert np.array_equal(data[name], ref)
+
+
+def test_decimation_and_envelope(blocks):
+    t, x, sw = blocks
+    rec = Recorder(CHANNELS, capacity=2000, decimation=10, envelope=True, chunk=64)
+    _feed(rec, t, x, sw)
+    data = rec.data()
+    assert np.array_equal(data['x'], x[::10])
+    assert np.array_equal(data['x_min'], x.reshape(-1, 10).min(axis=1))
+    assert np.array_equal(data['x_max'], x.reshape(-1, 10).max(axis=1))
+    assert np.array_equal(data['switch'], sw[::10])
+
+
+def test_empty_blocks_leave_the_record_unchanged(blocks):
+    t, x, sw = blocks
+    for ring in (False, True):
+        rec = Recorder(CHANNELS, capacity=2000, decimation=10, envelope=True, ring=ring, chunk=64)
+        for i in range(0, 1000, 5):
+            rec.extend(time=t[i:i + 5], x=x[i:i + 5], switch=sw[i:i + 5])
+            rec.extend(time=t[:0], x=x[:0], switch=sw[:0])
+        data = rec.data()
+        assert np.array_equal(data['x'], x[:1000:10])
+        assert np.array_equal(data['x_min'], x[:1000].reshape(-1, 10).min(axis=1))
+
+
+def test_ring_keeps_the_latest_samples(blocks):
+    t, x, sw = blocks
+    for n in (500, 3000, 10000):
+        rec = Recorder(CHANNELS, capacity=2048, ring=True, chunk=1024)
+        _feed(rec, t[:n], x[:n], sw[:n])
+        assert len(rec) == min(n, 2048)
+        data = rec.data()
+        assert len(rec) == len(data['time'])
+        assert np.array_equal(data['x'], x[:n][-2048:])
+        assert np.array_equal(data['switch'], sw[:n][-2048:])
+
+
+def test_file_mode_round_trip(blocks, tmp_path):
+    t, x, sw = blocks
+    rec = Recorder(CHANNELS, path=str(tmp_path/'run'), chunk=1024)
+    _feed(rec, t, x, sw)
+    data = rec.data()
+    assert np.array_equal(data['time'], t)
+    assert np.array_equal(data['switch'], sw)
+
+
+# ---------------------------------------------------------------- readers and replay
+
+CFG = """station,rec,1999
+3,3A,0D
+1,VA,a,,V,0.02,0.5,0,-32767,32767,1,1,P
+2,VB,b,,V,0.02,0.5,0,-32767,32767,1,1,P
+3,VC,c,,V,0.02,0.5,0,-32767,32767,1,1,P
+50
+1
+{fs},{n}
+01/01/2026,00:00:00.000000
+01/01/2026,00:00:00.000000
+{fmt}
+1
+"""
+
+
+@pytest.fixture(scope='module')
+def grid():
+    return GridScenario(50.0, 325.0).unbalance(0.05).generate(0.3, 1e-4).vabc
+
+
+def _read(reader, size=1000):
+    return np.concatenate(list(reader.chunks(size)))
+
+
+def test_npy_and_csv_readers(grid, tmp_path):
+    np.save(tmp_path/'rec.npy', grid)
+    reader = open_waveform(str(tmp_path/'rec.npy'), fs=1e4)
+    assert isinstance(reader, NpyReader) and reader.num_samples == len(grid)
+    assert np.array_equal(_read(reader, 777), grid)
+
+    t = np.arange(len(grid))*1e-4 + 2.0
+    path = tmp_path/'rec.csv'
+    np.savetxt(path, np.column_stack([t, grid]), delimiter=',', header='time,va,vb,vc',
+               comments='', fmt='%.17g')
+    reader = CsvReader(str(path), time_column='time')
+    assert reader.channels == ['va', 'vb', 'vc']
+    assert reader.fs == pytest.approx(1e4) and reader.t0 == 2.0
+    assert np.array_equal(_read(reader, 777), grid)
+    with pytest.raises(ValueError):
+        CsvReader(str(path))
+
+
+def test_csv_without_header_and_numeric_time_column(tmp_path):
+    t = np.arange(100)*1e-4
+    cols = np.stack([np.sin(t), t, np.cos(t)], axis=1)
+    path = tmp_path/'rec.csv'
+    np.savetxt(path, cols, delimiter=',')
+    reader = CsvReader(str(path), time_column=1, header=False)
+    assert reader.channels == ['0', '1']
+    assert reader.fs == pytest.approx(1e4)
+    data = np.concatenate(list(reader.chunks(size=30)))
+    np.testing.assert_allclose(data, cols[:, [0, 2]], rtol=1e-15)
+
+
+@pytest.mark.parametrize('fmt', ['ASCII', 'BINARY', 'FLOAT32'])
+def test_comtrade_scaling(grid, tmp_path, fmt):
+    n = len(grid)
+    raw = np.rint((grid - 0.5)/0.02)
+    (tmp_path/'rec.cfg').write_text(CFG.format(fs=10000, n=n, fmt=fmt))
+    if fmt == 'ASCII':
+        rows = np.column_stack([np.arange(1, n + 1), np.arange(n)*100, raw])
+        np.savetxt(tmp_path/'rec.dat', rows, delimiter=',', fmt='%d')
+    else:
+        record = np.dtype([('n', '<u4'), ('timestamp', '<u4'),
+                           ('analog', '<i2' if fmt == 'BINARY' else '<f4', (3,))])
+        data = np.zeros(n, dtype=record)
+        data['n'] = np.arange(1, n + 1)
+        data['analog'] = raw
+        data.tofile(tmp_path/'rec.dat')
+    reader = open_waveform(str(tmp_path/'rec.cfg'))
+    assert isinstance(reader, ComtradeReader)
+    assert reader.channels == ['VA', 'VB', 'VC'] and reader.fs == 10000.0
+    np.testing.assert_allclose(_read(reader), raw*0.02 + 0.5, rtol=1e-12)
+
+
+def test_replay_matches_the_batch_loops(grid, tmp_path):
+    np.save(tmp_path/'rec.npy', grid/325.0)
+    data = replay(NpyReader(str(tmp_path/'rec.npy'), 1e4), str(tmp_path/'out'), fs_pll=1e4,
+                  v_base=1.0, chunk=1000)
+    alpha, beta = clarke(grid/325.0)
+    assert np.array_equal(data['theta_srf'], simulate_srf_pll(alpha, beta, 1e-4).theta_pll)
+    assert np.array_equal(data['theta_sogi'], simulate_sogi_pll(grid[:, 0]/325.0, 1e-4).theta)
+    np.testing.assert_allclose(data['t'], np.arange(len(grid))/1e4, rtol=0, atol=1e-12)
+    assert (tmp_path/'out'/'replay.json').exists()
@@ -0,0 +1,68 @@
+"""
+Process-pool sweep executor: results independent of the worker layout
+"""
+import numpy as np
+import pytest
+
+from pesim.buck import BuckParams, PIController, simulate_closed_loop
+from pesim.buck.cases import closed_loop_case, closed_loop_outputs
+from pesim.parallel import SharedArray, case_rng, run_cases
+
+PARAMS = BuckParams.design(24.0, 18.0, 2.0, 50e3)
+CASES = [{'params': PARAMS, 'ctrl': PIController(Vref=v), 'sim_time': 2e-4, 'vref_noise': 0.5}
+         for v in (12.0, 15.0, 18.0, 20.0, 16.0)]
+
+
+@pytest.fixture(scope='module')
+def inline():
+    return run_cases(closed_loop_case, CASES, closed_loop_outputs(CASES[0]), workers=0, seed=7)
+
+
+def test_shared_array_attach_sees_the_same_memory():
+    owner = SharedArray((3, 4), 'f8')
+    try:
+        owner.array[:] = np.arange(12.0).reshape(3, 4)
+        view = SharedArray.attach(owner.spec())
+        view.array[1, 2] = -1.0
+        assert owner.array[1, 2] == -1.0
+        assert np.array_equal(view.array, owner.array)
+        view.close()
+    finally:
+        owner.close()
+
+
+def test_case_rng_is_the_spawned_sequence():
+    spawned = np.random.SeedSequence(7).spawn(5)
+    for i, ss in enumerate(spawned):
+        assert np.array_equal(case_rng(7, i).random(4), np.random.default_rng(ss).random(4))
+
+
+def test_inline_run_matches_direct_simulation(inline):
+    for i, case in enumerate(CASES):
+        num_cycles = len(inline['duty'][i])
+        vref = case['ctrl'].Vref + 0.5*case_rng(7, i).standard_normal(num_cycles)
+        ref = simulate_closed_loop(PARAMS, case['ctrl'], case['sim_time'], vref=vref)
+        for name in ('iL', 'vc', 'switch', 'controller_output', 'error', 'duty'):
+            assert np.array_equal(inline[name][i], getattr(ref, name)), name
+
+
+@pytest.mark.parametrize('workers, chunksize', [(1, None), (2, 1), (3, 2)])
+def test_results_do_not_depend_on_workers_or_chunks(inline, workers, chunksize):
+    res = run_cases(closed_loop_case, CASES, closed_loop_outputs(CASES[0]), workers=workers,
+                    chunksize=chunksize, seed=7)
+    for name, value in inline.items():
+        assert np.array_equal(res[name], value), name
+
+
+def test_seed_controls_the_noise(inline):
+    again = run_cases(closed_loop_case, CASES, closed_loop_outputs(CASES[0]), workers=0, seed=7)
+    other = run_cases(closed_loop_case, CASES, closed_loop_outputs(CASES[0]), workers=0, seed=8)
+    assert np.array_equal(again['vc'], inline['vc'])
+    assert not np.array_equal(other['vc'], inline['vc'])
+
+
+def test_progress_reaches_the_case_count():
+    calls = []
+    run_cases(closed_loop_case, CASES, closed_loop_outputs(CASES[0]), workers=0, chunksize=2, seed=1,
+              progress=lambda done, total, elapsed: calls.append((done, total)))
+    assert calls == [(2, 5), (4, 5), (5, 5)]
@@ -0,0 +1,358 @@
+"""
+PLL loops against the script loops they were ported from
+"""
+import numpy as np
+import pytest
+
+from pesim.instrument import Instrument
+from pesim.pll.montecarlo import METRICS
+from pesim.pll import (DsogiPll, GridScenario, SogiPllState, SogiPllStream, SrfPllState,
+                       SrfPllStream, frequency_step_signal, monte_carlo_pll, noisy_sine,
+                       simulate_dsogi_pll, simulate_sogi_pll, simulate_sogi_pll_batch,
+                       simulate_srf_pll, simulate_srf_pll_batch, simulate_three_phase_srf_pll)
+from pesim.parallel import case_rng
+from pesim.pll import stream
+from pesim.transforms import (abc_to_dq, clarke, dq_to_abc, inverse_clarke,
+                              symmetrical_components)
+
+DT = 1e-4
+BACKENDS = ['python', pytest.param('numba', marks=pytest.mark.skipif(
+    not stream.HAVE_NUMBA, reason='numba not installed'))]
+
+SRF_HIST = ('theta_pll', 'w_pll', 'f_pll', 'vd', 'vq', 'error', 'pi_output')
+SOGI_HIST = ('theta', 'f', 'vq', 'v_alpha', 'v_beta')
+
+
+def _srf_script(va, vb, dt, kp=225, ki=10000):
+    # PLL main loop of srf-pll-v2.py
+    theta_pll = 0
+    integral_error = 0
+    theta_pll_hist = np.zeros(len(va))
+    f_pll_hist = np.zeros(len(va))
+    for k in range(len(va)):
+        cos_theta = np.cos(theta_pll)
+        sin_theta = np.sin(theta_pll)
+        vq = (-va[k] * sin_theta) + (vb[k] * cos_theta)
+        error = vq
+        integral_error = integral_error + (error * dt)
+        pi_output = (kp * error) + (ki * integral_error)
+        w_pll = pi_output
+        theta_pll = theta_pll + (w_pll * dt)
+        if theta_pll > (2 * np.pi):
+            theta_pll = theta_pll - (2 * np.pi)
+        theta_pll_hist[k] = theta_pll
+        f_pll_hist[k] = w_pll / (2 * np.pi)
+    return theta_pll_hist, f_pll_hist
+
+
+def _sogi_script(v_in, dt, k=1.0, w_nom=2*np.pi*50, kp=20, ki=5):
+    # simulation loop of sogi-pll-v1.py
+    x1 = x2 = theta_est = vq_int = 0.0
+    theta_log = []
+    f_log = []
+    for n in range(len(v_in)):
+        e = v_in[n] - x1
+        dx1 = w_nom * ((k*e) - x2)
+        dx2 = w_nom * x1
+        x1 += dx1 * dt
+        x2 += dx2 * dt
+        cos_theta = np.cos(theta_est)
+        sin_theta = np.sin(theta_est)
+        vq = x1*(-sin_theta) + x2*cos_theta
+        vq_int += vq * dt
+        w_est = (kp*vq) + (ki*vq_int) + w_nom
+        theta_est += w_est * dt
+        if theta_est > 2*np.pi:
+            theta_est -= 2*np.pi
+        theta_log.append(theta_est)
+        f_log.append(w_est/(2*np.pi))
+    return np.array(theta_log), np.array(f_log)
+
+
+@pytest.fixture(scope='module')
+def srf_input():
+    va, vb, _ = frequency_step_signal(np.arange(10000) * DT)
+    return va, vb
+
+
+@pytest.fixture(scope='module')
+def sogi_input():
+    return noisy_sine(np.arange(6000) * DT, rng=1)
+
+
+# ---------------------------------------------------------------- ports
+
+def test_srf_matches_script_loop(srf_input):
+    res = simulate_srf_pll(*srf_input, DT)
+    theta, f = _srf_script(*srf_input, DT)
+    assert np.array_equal(res.theta_pll, theta)
+    assert np.array_equal(res.f_pll, f)
+
+
+def test_sogi_matches_script_loop(sogi_input):
+    res = simulate_sogi_pll(sogi_input, DT)
+    theta, f = _sogi_script(sogi_input, DT)
+    assert np.array_equal(res.theta, theta)
+    assert np.array_equal(res.f, f)
+
+
+# ---------------------------------------------------------------- batches
+
+@pytest.mark.parametrize('feedforward', [False, True])
+def test_srf_batch_bit_identical_per_channel(srf_input, feedforward):
+    va, vb = srf_input
+    kp = np.array([225.0, 150.0, 300.0])
+    wnom = 2*np.pi*np.array([50.0, 60.0, 50.0])
+    batch = simulate_srf_pll_batch(np.stack([va]*3, axis=1), np.stack([vb]*3, axis=1), DT, kp=kp,
+                                   wnom=wnom, feedforward=feedforward)
+    for j in range(3):
+        ref = simulate_srf_pll(va, vb, DT, kp=kp[j], wnom=wnom[j], feedforward=feedforward)
+        for name in SRF_HIST:
+            assert np.array_equal(getattr(batch, name)[:, j], getattr(ref, name)), name
+
+
+def test_srf_batch_in_chunks(srf_input):
+    va, vb = (x[:, None] for x in srf_input)
+    whole = simulate_srf_pll_batch(va, vb, DT)
+    state = SrfPllState.zeros(1)
+    theta = np.concatenate([simulate_srf_pll_batch(va[i:i + 1500], vb[i:i + 1500], DT, state=state,
+                                                   record=('theta_pll',)).theta_pll
+                            for i in range(0, len(va), 1500)])
+    assert np.array_equal(theta, whole.theta_pll)
+    assert np.array_equal(state.w_pll, whole.w_pll[-1])
+    # w_pll is output only, resuming without it gives the same run
+    state = SrfPllState(theta_pll=np.zeros(1), integral_error=np.zeros(1))
+    first = simulate_srf_pll_batch(va[:1500], vb[:1500], DT, state=state)
+    state.w_pll = None
+    rest = simulate_srf_pll_batch(va[1500:], vb[1500:], DT, state=state)
+    assert np.array_equal(np.concatenate([first.theta_pll, rest.theta_pll]), whole.theta_pll)
+
+
+# ---------------------------------------------------------------- streams
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_sogi_stream_block_by_block(sogi_input, backend):
+    ref = simulate_sogi_pll(sogi_input, DT)
+    pll = SogiPllStream(1/DT, 1024, backend=backend)
+    theta, f = [], []
+    for i in range(0, len(sogi_input), 1000):
+        out = pll.process(sogi_input[i:i + 1000])
+        theta.append(out.theta.copy())
+        f.append(out.f.copy())
+    assert np.array_equal(np.concatenate(theta), ref.theta)
+    assert np.array_equal(np.concatenate(f), ref.f)
+    assert pll.latency()['blocks'] == 6
+
+
+def test_sogi_stream_reuses_its_buffers(sogi_input):
+    pll = SogiPllStream(1/DT, 1024, backend='python')
+    first = pll.process(sogi_input[:512])
+    second = pll.process(sogi_input[512:1024])
+    assert first.theta is second.theta
+    with pytest.raises(ValueError):
+        pll.process(sogi_input[:2000])
+    pll.reset()
+    again = pll.process(sogi_input[:512]).theta.copy()
+    assert np.array_equal(again, simulate_sogi_pll(sogi_input[:512], DT).theta)
+
+
+def test_stream_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        SogiPllStream(1/DT, 1024, backend='jit')
+
+
+# ---------------------------------------------------------------- grid events
+
+def _cycle_mean(x, sig, f0=50.0):
+    # mean over the last whole fundamental cycles
+    n = int(round(len(sig.t)*DT*f0))*int(round(1/(f0*DT)))
+    return np.mean(x[-n:])
+
+
+def test_grid_frequency_step_matches_the_script_signal():
+    t = np.arange(0, 1.0, DT)
+    va, vb, _ = frequency_step_signal(t)
+    sig = GridScenario(50.0).frequency_step(0.5, 50.0).generate(1.0, DT)
+    np.testing.assert_allclose(sig.va, va, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(sig.vb, vb, rtol=0, atol=1e-9)
+    assert np.array_equal(sig.f, np.where(t >= 0.5, 100.0, 50.0))
+
+
+def test_grid_angle_integrates_steps_and_ramps_off_the_grid():
+    t0, t1, df = 0.20005, 0.30012, 7.0
+    sig = GridScenario(50.0).frequency_step(0.10003, -3.0).frequency_ramp(t0, t1, df).generate(0.5, DT)
+    t = sig.t
+    ramp = np.clip(t - t0, 0, t1 - t0)**2/(2*(t1 - t0)) + np.maximum(t - t1, 0)
+    theta = 2*np.pi*(50.0*t - 3.0*np.maximum(t - 0.10003, 0) + df*ramp)
+    err = np.angle(np.exp(1j*(sig.theta - theta)))
+    assert np.max(np.abs(err)) < 1e-9
+    assert sig.f[-1] == pytest.approx(54.0)
+
+
+def test_grid_phase_jump_and_sag():
+    sig = (GridScenario(50.0, 2.0).phase_jump(0.1, np.pi/6).sag(0.12, 0.15, 0.4)
+           .generate(0.2, DT))
+    ref = GridScenario(50.0, 2.0).generate(0.2, DT)
+    jump = np.angle(np.exp(1j*(sig.theta - ref.theta)))
+    np.testing.assert_allclose(jump, np.where(sig.t >= 0.1, np.pi/6, 0.0), atol=1e-12)
+    amp = np.where((sig.t >= 0.12) & (sig.t < 0.15), 1.2, 2.0)
+    assert np.array_equal(sig.amplitude, amp)
+    np.testing.assert_allclose(np.hypot(sig.va, sig.vb), amp, rtol=1e-12)
+    np.testing.assert_allclose(sig.vabc.sum(axis=1), 0.0, atol=1e-12)
+
+
+def test_grid_unbalance_and_harmonic_sequences():
+    sig = (GridScenario(50.0).unbalance(0.05, 0.3).harmonic(5, 0.03).harmonic(3, 0.02)
+           .generate(0.2, DT))
+    v = sig.va + 1j*sig.vb
+    # negative sequence and 5th harmonic seen from frames rotating with them
+    assert _cycle_mean(v*np.exp(1j*sig.theta), sig) == pytest.approx(0.05*np.exp(0.3j), abs=1e-9)
+    assert _cycle_mean(v*np.exp(5j*sig.theta), sig) == pytest.approx(0.03, abs=1e-9)
+    assert _cycle_mean(v*np.exp(-1j*sig.theta), sig) == pytest.approx(1.0, abs=1e-9)
+    # the 3rd is zero sequence, absent from alpha-beta and equal in every phase
+    v0 = sig.vabc.sum(axis=1)/3
+    np.testing.assert_allclose(v0, 0.02*np.cos(3*sig.theta), atol=1e-12)
+    assert np.array_equal(sig.v, sig.vabc[:, 0])
+
+
+# ---------------------------------------------------------------- instrumentation
+
+def test_instrumented_loops_unchanged(srf_input, sogi_input):
+    inst = Instrument()
+    srf = simulate_srf_pll(*srf_input, DT, instrument=inst)
+    sogi = simulate_sogi_pll(sogi_input, DT, instrument=inst)
+    ref_srf = simulate_srf_pll(*srf_input, DT)
+    ref_sogi = simulate_sogi_pll(sogi_input, DT)
+    assert all(np.array_equal(getattr(srf, n), getattr(ref_srf, n)) for n in SRF_HIST)
+    assert all(np.array_equal(getattr(sogi, n), getattr(ref_sogi, n)) for n in SOGI_HIST)
+    assert inst.counters['controller_updates'] == len(sogi_input) + len(srf_input[0])
+    stages = inst.report()['stages']
+    assert stages['simulate_srf_pll/trig']['calls'] == len(srf_input[0])
+    assert stages['simulate_sogi_pll/plant']['calls'] == len(sogi_input)
+
+
+# ---------------------------------------------------------------- three phase
+
+def test_clarke_round_trip_and_three_phase_path():
+    sig = GridScenario(50.0, 1.0).phase_unbalance((1.0, 0.9, 0.95)).generate(0.2, DT)
+    alpha, beta, zero = clarke(sig.vabc, zero=True)
+    np.testing.assert_allclose(inverse_clarke(alpha, beta, zero), sig.vabc, rtol=0, atol=1e-12)
+    res = simulate_three_phase_srf_pll(sig.vabc, DT)
+    ref = simulate_srf_pll(alpha, beta, DT)
+    assert np.array_equal(res.theta_pll, ref.theta_pll)
+
+
+def test_balanced_set_maps_to_constant_dq():
+    sig = GridScenario(50.0, 2.0).unbalance(0.1, 0.4).generate(0.1, DT)
+    d, q = abc_to_dq(sig.vabc, sig.theta)
+    # positive sequence on d, the negative one rotates at twice the grid angle
+    np.testing.assert_allclose(d, 2.0 + 0.2*np.cos(2*sig.theta - 0.4), atol=1e-12)
+    np.testing.assert_allclose(q, -0.2*np.sin(2*sig.theta - 0.4), atol=1e-12)
+    np.testing.assert_allclose(dq_to_abc(d, q, sig.theta), sig.vabc, atol=1e-12)
+    pos, neg, zero = symmetrical_components(np.exp(1j*np.array([0.0, -2*np.pi/3, 2*np.pi/3])))
+    assert abs(pos - 1) < 1e-15 and abs(neg) < 1e-15 and abs(zero) < 1e-15
+
+
+# ---------------------------------------------------------------- DSOGI
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_dsogi_tracks_positive_sequence(backend):
+    sig = GridScenario(50.0, 1.0).unbalance(0.2).generate(1.0, DT)
+    res = simulate_dsogi_pll(sig.vabc, DT, backend=backend)
+    tail = slice(-2000, None)
+    # the loop stores the angle after its update, one step ahead of the input
+    err = np.angle(np.exp(1j*(res.theta - sig.theta - 2*np.pi*sig.f*DT)))
+    assert np.max(np.abs(err[tail])) < 1e-3
+    assert np.max(np.abs(res.f[tail] - 50.0)) < 1e-2
+    assert np.max(np.abs(res.amplitude_pos[tail] - 1.0)) < 1e-3
+    assert np.max(np.abs(res.amplitude_neg[tail] - 0.2)) < 1e-3
+
+
+def test_dsogi_blocks_and_backends_agree():
+    sig = GridScenario(50.0, 1.0).unbalance(0.1).generate(0.3, DT)
+    alpha, beta = clarke(sig.vabc)
+    ref = DsogiPll(1/DT, backend='python').run(alpha, beta)
+    blocks = DsogiPll(1/DT, block=777).run(alpha, beta)
+    assert np.array_equal(blocks.theta, ref.theta)
+    assert np.array_equal(blocks.amplitude_neg, ref.amplitude_neg)
+
+
+def test_dsogi_properties_are_copies():
+    pll = DsogiPll(1/DT, 2)
+    theta, f = pll.theta, pll.frequency
+    theta[:] = 1.0
+    f[:] = 0.0
+    assert np.array_equal(pll.theta, [0.0, 0.0])
+    assert np.array_equal(pll.frequency, [50.0, 50.0])
+    with pytest.raises(ValueError):
+        DsogiPll(1/DT, 2, backend='jit')
+
+
+# ---------------------------------------------------------------- SRF stream
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_srf_stream_block_by_block(srf_input, backend):
+    va, vb = srf_input
+    ref = simulate_srf_pll(va, vb, DT)
+    pll = SrfPllStream(1/DT, 1024, backend=backend)
+    theta, f, vd = [], [], []
+    for i in range(0, len(va), 700):
+        out = pll.process(va[i:i + 700], vb[i:i + 700])
+        theta.append(out.theta.copy())
+        f.append(out.f.copy())
+        vd.append(out.amplitude.copy())
+    assert np.array_equal(np.concatenate(theta), ref.theta_pll)
+    assert np.array_equal(np.concatenate(f), ref.f_pll)
+    assert np.array_equal(np.concatenate(vd), ref.vd)
+
+
+# ---------------------------------------------------------------- Monte Carlo
+
+def test_sogi_batch_bit_identical_per_channel(sogi_input):
+    v = np.stack([sogi_input, -sogi_input], axis=1)
+    state = SogiPllState.zeros(2)
+    parts = [simulate_sogi_pll_batch(v[i:i + 1000], DT, state=state) for i in range(0, len(v), 1000)]
+    for j in range(2):
+        ref = simulate_sogi_pll(v[:, j], DT)
+        for name in SOGI_HIST:
+            got = np.concatenate([getattr(p, name)[:, j] for p in parts])
+            assert np.array_equal(got, getattr(ref, name)), name
+
+
+MC = dict(trials=20, seed=3, t_sim=0.3, steady=0.05)
+
+
+@pytest.fixture(scope='module')
+def mc_inline():
+    return monte_carlo_pll('srf', batch=16, **MC)
+
+
+@pytest.mark.parametrize('batch, workers', [(7, 0), (20, 0), (7, 2)])
+def test_monte_carlo_independent_of_batch_and_workers(mc_inline, batch, workers):
+    mc = monte_carlo_pll('srf', batch=batch, workers=workers, **MC)
+    for name in ('f_in', 'phase0', 'harmonic_mag') + METRICS:
+        assert np.array_equal(getattr(mc, name), getattr(mc_inline, name), equal_nan=True), name
+
+
+def test_monte_carlo_draws_follow_the_trial_generators(mc_inline):
+    for i in (0, 13):
+        rng = case_rng(MC['seed'], i)
+        assert mc_inline.f_in[i] == 50.0 + rng.uniform(-2.0, 2.0)
+        assert mc_inline.phase0[i] == rng.uniform(0.0, 2*np.pi)
+    other = monte_carlo_pll('srf', batch=16, **dict(MC, seed=4))
+    assert not np.array_equal(other.f_in, mc_inline.f_in)
+    with pytest.raises(ValueError):
+        monte_carlo_pll('pq', trials=1)
+
+
+def test_monte_carlo_summary_counts_unlocked_trials():
+    # the default scenario locks; the SOGI-PLL misses lock at larger offsets
+    assert monte_carlo_pll(trials=8, seed=0).locked.all()
+    mc = monte_carlo_pll('sogi', trials=16, seed=0, t_sim=0.5, steady=0.05)
+    locked = mc.locked
+    assert 0 < locked.sum() < len(locked)
+    summary = mc.summary()
+    assert summary['locked'] == locked.mean()
+    assert summary['freq_error']['mean'] == mc.freq_error.mean()
+    assert summary['phase_jitter']['p95'] == np.percentile(mc.phase_jitter, 95)
+    assert summary['lock_time']['mean'] == mc.lock_time[locked].mean()
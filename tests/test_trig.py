@@ -0,0 +1,80 @@
+"""
+Sine/cosine backends: error bounds and scalar/vector agreement
+"""
+import math
+
+import numpy as np
+import pytest
+
+from pesim.pll import frequency_step_signal, simulate_srf_pll, simulate_srf_pll_batch
+from pesim.trig import CordicTrig, ExactTrig, LutTrig, get_backend, trig_report
+
+THETA = np.random.default_rng(0).uniform(-20.0, 20.0, 20000)
+
+
+def _max_error(trig, theta=THETA):
+    s, c = trig.sincos(theta)
+    return max(np.max(np.abs(s - np.sin(theta))), np.max(np.abs(c - np.cos(theta))))
+
+
+@pytest.mark.parametrize('size', [64, 256, 1024])
+def test_interpolated_lut_error_bound(size):
+    # linear interpolation error of sin over a step h is at most h**2/8
+    h = 2*math.pi/size
+    assert _max_error(LutTrig(size)) <= h*h/8 + 1e-12
+
+
+@pytest.mark.parametrize('size', [64, 256])
+def test_nearest_lut_error_bound(size):
+    assert _max_error(LutTrig(size, interpolate=False)) <= math.pi/size + 1e-12
+
+
+@pytest.mark.parametrize('iterations, frac_bits', [(12, 16), (16, 16), (20, 24)])
+def test_cordic_error_bound(iterations, frac_bits):
+    # residual angle of the last stage plus one lsb of rounding per stage
+    bound = 2.0**-(iterations - 1) + (iterations + 2)*2.0**-frac_bits
+    assert _max_error(CordicTrig(iterations, frac_bits)) <= bound
+
+
+@pytest.mark.parametrize('spec', ['exact', 'lut:256', 'lut:256:nearest', 'cordic:16'])
+def test_scalar_and_vector_paths_agree(spec):
+    trig = get_backend(spec)
+    s, c = trig.sincos(THETA[:2000])
+    scalar = np.array([trig.sincos(float(th)) for th in THETA[:2000]])
+    assert np.array_equal(scalar[:, 0], s)
+    assert np.array_equal(scalar[:, 1], c)
+    out = (np.empty(2000), np.empty(2000))
+    trig.sincos(THETA[:2000], out=out)
+    assert np.array_equal(out[0], s) and np.array_equal(out[1], c)
+
+
+def test_backend_specs():
+    assert isinstance(get_backend(None), ExactTrig)
+    assert get_backend('lut:1024').size == 1024
+    assert not get_backend('lut:64:nearest').interpolate
+    cordic = get_backend('cordic:20:24')
+    assert (cordic.iterations, cordic.frac_bits) == (20, 24)
+    trig = LutTrig(128)
+    assert get_backend(trig) is trig
+    with pytest.raises(ValueError):
+        get_backend('taylor')
+    with pytest.raises(ValueError):
+        LutTrig(90)
+
+
+def test_report_errors_follow_the_table_size():
+    report = trig_report(('lut:64', 'lut:1024', 'cordic:16'), num=10000, num_scalar=1000)
+    assert report['lut:1024']['max_err_sin'] < report['lut:64']['max_err_sin']
+    assert report['lut:64']['max_phase_err'] < 2e-3
+    assert all(r['vector_rate'] > 0 and r['scalar_rate'] > 0 for r in report.values())
+
+
+def test_pll_with_a_fine_table_tracks_the_exact_loop():
+    dt = 1e-4
+    va, vb, _ = frequency_step_signal(np.arange(10000)*dt)
+    ref = simulate_srf_pll(va, vb, dt)
+    lut = simulate_srf_pll(va, vb, dt, trig='lut:4096')
+    err = np.angle(np.exp(1j*(lut.theta_pll - ref.theta_pll)))
+    assert np.max(np.abs(err)) < 1e-4
+    batch = simulate_srf_pll_batch(va[:, None], vb[:, None], dt, trig='lut:4096')
+    assert np.array_equal(batch.theta_pll[:, 0], lut.theta_pll)